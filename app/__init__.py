@@ -32,6 +32,50 @@ def create_app(config_class=Config):
     db.init_app(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
+
+    from app.metrics import metrics, cache_collector, circuit_collector
+    metrics.init_app(app)
+
+    from app.rate_limit import rate_limiter
+    rate_limiter.init_app(app)
+
+    from app.places_client import places_client
+    places_client.init_app(app)
+
+    from app.cache import place_details_cache, text_search_cache, user_cache
+    place_details_cache.init_app(app)
+    text_search_cache.init_app(app)
+    user_cache.init_app(app)
+
+    from app.search_jobs import search_job_runner
+    search_job_runner.init_app(app)
+
+    from app.image_cache import image_cache
+    image_cache.init_app(app)
+
+    from app import lead_search
+    lead_search.init_app(app)
+
+    from app.stripe_events import stripe_event_worker
+    stripe_event_worker.init_app(app)
+
+    from app.price_catalog import price_catalog
+    price_catalog.init_app(app)
+
+    from app.password_hashing import password_hasher
+    password_hasher.init_app(app)
+
+    from app.enrichment import website_enricher
+    website_enricher.init_app(app)
+
+    from app.lead_refresh import lead_refresher
+    lead_refresher.init_app(app)
+
+    metrics.collectors = [
+        cache_collector({'place_details': place_details_cache, 'text_search': text_search_cache,
+                         'user': user_cache, 'image': image_cache, 'website_enrichment': website_enricher}),
+        circuit_collector(places_client),
+    ]
     
     # Configure CORS: Add your frontend development and production URLs
     # Example: "http://localhost:5174" could be your new commercial frontend dev port
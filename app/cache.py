@@ -0,0 +1,353 @@
+# app/cache.py
+# Caching helpers shared by the search routes.
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from app import db
+from app.models import PlaceDetailsCacheEntry, User
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe in-process LRU cache where every entry expires `ttl` seconds after it was set."""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[0] < time.monotonic():
+                if entry is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data), "maxsize": self.maxsize}
+
+
+class PlaceDetailsCache:
+    """Two-tier cache for Google Place Details results, keyed on (place_id, fields).
+
+    The first tier is a per-process TTLCache. The second is the PlaceDetailsCacheEntry
+    table, so every gunicorn worker sees what the others already fetched. Both tiers
+    honour the same TTL (PLACE_DETAILS_CACHE_TTL). Failures in the durable tier are
+    logged and treated as misses; the cache must never break a search. Expired rows are
+    deleted by set_many at most every PLACE_DETAILS_CACHE_PURGE_INTERVAL seconds, and by
+    `flask purge-place-details-cache`.
+    """
+
+    def __init__(self, app=None):
+        self.memory = TTLCache()
+        self.ttl = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.purge_interval = 3600
+        self._next_purge = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('PLACE_DETAILS_CACHE_TTL', 86400)
+        self.memory = TTLCache(maxsize=app.config.get('PLACE_DETAILS_CACHE_SIZE', 5000), ttl=self.ttl)
+        self.purge_interval = app.config.get('PLACE_DETAILS_CACHE_PURGE_INTERVAL', 3600)
+        app.extensions['place_details_cache'] = self
+
+        @app.cli.command('purge-place-details-cache')
+        def purge_place_details_cache_command():
+            """Delete expired rows from the durable Place Details cache."""
+            deleted = self.purge_expired()
+            db.session.commit()
+            click.echo(f"Deleted {deleted} expired Place Details cache row(s).")
+
+    @property
+    def enabled(self):
+        return self.ttl > 0
+
+    def _count(self, db_hits=0, misses=0):
+        with self._lock:
+            self.db_hits += db_hits
+            self.misses += misses
+
+    def get_many(self, place_ids, fields):
+        """Returns {place_id: details result dict} for every id found in either tier."""
+        if not self.enabled:
+            return {}
+        found = {}
+        remaining = []
+        for place_id in set(place_ids):
+            cached = self.memory.get((place_id, fields))
+            if cached is not None:
+                found[place_id] = cached
+            else:
+                remaining.append(place_id)
+        if not remaining:
+            return found
+
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+        try:
+            rows = db.session.query(PlaceDetailsCacheEntry.place_id, PlaceDetailsCacheEntry.payload).filter(
+                PlaceDetailsCacheEntry.fields == fields,
+                PlaceDetailsCacheEntry.place_id.in_(remaining),
+                PlaceDetailsCacheEntry.fetched_at >= cutoff,
+            ).all()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.warning(f"Place details cache read failed, treating as miss: {e}")
+            rows = []
+        for place_id, payload in rows:
+            result = json.loads(payload)
+            self.memory.set((place_id, fields), result)
+            found[place_id] = result
+        self._count(db_hits=len(rows), misses=len(remaining) - len(rows))
+        return found
+
+    def set_many(self, results_by_place_id, fields):
+        """Stores {place_id: details result dict} in both tiers with a single commit. A due purge of
+        expired rows runs afterwards in its own transaction, so it can't cost the new rows."""
+        if not self.enabled or not results_by_place_id:
+            return
+        for place_id, result in results_by_place_id.items():
+            self.memory.set((place_id, fields), result)
+
+        now = datetime.utcnow()
+        try:
+            existing = {entry.place_id: entry for entry in PlaceDetailsCacheEntry.query.filter(
+                PlaceDetailsCacheEntry.fields == fields,
+                PlaceDetailsCacheEntry.place_id.in_(list(results_by_place_id)),
+            )}
+            for place_id, result in results_by_place_id.items():
+                entry = existing.get(place_id)
+                if entry is None:
+                    entry = PlaceDetailsCacheEntry(place_id=place_id, fields=fields)
+                    db.session.add(entry)
+                entry.payload = json.dumps(result)
+                entry.fetched_at = now
+            db.session.commit()
+        except SQLAlchemyError as e:
+            # Usually another worker inserted the same place first; the in-process tier still has it.
+            db.session.rollback()
+            current_app.logger.warning(f"Place details cache write failed: {e}")
+            return
+
+        if self._purge_due():
+            try:
+                self.purge_expired()
+                db.session.commit()
+            except SQLAlchemyError as e:
+                # Typically a lock timeout against another writer; the next due purge catches up.
+                db.session.rollback()
+                current_app.logger.warning(f"Place details cache purge failed: {e}")
+
+    def _purge_due(self):
+        # At most once per purge_interval per process; concurrent purges by other workers are harmless.
+        with self._lock:
+            if time.monotonic() < self._next_purge:
+                return False
+            self._next_purge = time.monotonic() + self.purge_interval
+            return True
+
+    def purge_expired(self):
+        """Deletes durable rows past the TTL (uncommitted). Returns how many."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+        return PlaceDetailsCacheEntry.query.filter(PlaceDetailsCacheEntry.fetched_at < cutoff).delete(synchronize_session=False)
+
+    def stats(self):
+        memory = self.memory.stats()
+        return {"memory_hits": memory["hits"], "db_hits": self.db_hits, "misses": self.misses,
+                "memory_size": memory["size"], "ttl": self.ttl}
+
+
+place_details_cache = PlaceDetailsCache()
+
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one: the first caller runs `fn`,
+    everyone else arriving before it finishes waits and gets the same result (or exception)."""
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class TextSearchCache:
+    """Short-lived cache of assembled text-search result lists, keyed on the normalized query.
+
+    Misses go through a SingleFlight, so N identical searches arriving together cost one
+    upstream page loop (page-token sleeps included) instead of N.
+    """
+
+    def __init__(self, app=None):
+        self.memory = TTLCache()
+        self.flight = SingleFlight()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.memory = TTLCache(maxsize=app.config.get('TEXT_SEARCH_CACHE_SIZE', 512),
+                               ttl=app.config.get('TEXT_SEARCH_CACHE_TTL', 300))
+        app.extensions['text_search_cache'] = self
+
+    @staticmethod
+    def normalize(query):
+        return " ".join(query.lower().split())
+
+    def peek(self, query):
+        """Cached results for `query`, or None. Does not start a fetch."""
+        return self.memory.get(self.normalize(query))
+
+    def store(self, query, results):
+        if self.memory.ttl > 0:
+            self.memory.set(self.normalize(query), results)
+
+    def get_or_fetch(self, query, fetch):
+        """Returns the cached results for `query`, or calls `fetch()` once for all concurrent callers."""
+        key = self.normalize(query)
+        cached = self.memory.get(key)
+        if cached is not None:
+            return cached
+
+        def fetch_and_store():
+            results = fetch()
+            self.store(query, results)
+            return results
+        return self.flight.do(key, fetch_and_store)
+
+    def stats(self):
+        return {**self.memory.stats(), "coalesced": self.flight.coalesced}
+
+
+text_search_cache = TextSearchCache()
+
+
+class UserCache:
+    """Per-process cache behind login_manager.user_loader.
+
+    Holds plain column snapshots (never ORM instances, which are bound to a request's
+    session). On a hit the snapshot is rebuilt into a User and merged into the current
+    session with load=False, which attaches it without a SELECT. Any flushed UPDATE or
+    DELETE of a User (tier, Stripe ids, password, ...) invalidates that user here, again
+    after commit. Other worker processes catch up within USER_CACHE_TTL seconds.
+    """
+
+    def __init__(self, app=None):
+        self.memory = TTLCache()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.memory = TTLCache(maxsize=app.config.get('USER_CACHE_SIZE', 10000), ttl=app.config.get('USER_CACHE_TTL', 30))
+        app.extensions['user_cache'] = self
+
+    def load(self, user_id):
+        if self.memory.ttl <= 0:
+            return db.session.get(User, user_id)
+        snapshot = self.memory.get(user_id)
+        if snapshot is None:
+            user = db.session.get(User, user_id)
+            if user is not None:
+                self.memory.set(user_id, {column.key: getattr(user, column.key) for column in User.__table__.columns})
+            return user
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    def invalidate(self, user_id):
+        self.memory.delete(user_id)
+
+    def stats(self):
+        return self.memory.stats()
+
+
+user_cache = UserCache()
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_cached_user(mapper, connection, target):
+    user_cache.invalidate(target.id)
+    # A concurrent request may re-cache the pre-commit row; drop it again once this commits.
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('invalidated_user_ids', set()).add(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_users(session):
+    for user_id in session.info.pop('invalidated_user_ids', ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_users(session):
+    session.info.pop('invalidated_user_ids', None)
@@ -0,0 +1,367 @@
+# app/enrichment.py
+# Website enrichment: crawls a lead's website (home page, plus one contact/about page when the
+# home page has no address) and pulls out contact emails and social profile links.
+import ipaddress
+import json
+import re
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from urllib.parse import unquote, urljoin, urlparse
+
+import click
+import requests
+from requests.adapters import HTTPAdapter
+from sqlalchemy import and_, or_, update
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from app import db
+from app.cache import SingleFlight, TTLCache
+from app.metrics import metrics
+from app.models import SavedLead
+
+EMAIL_RE = re.compile(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,24}')
+HREF_RE = re.compile(r'href\s*=\s*["\']([^"\'#][^"\']*)["\']', re.IGNORECASE)
+# Things that look like emails but aren't: retina image names (logo@2x.png), asset hashes, placeholders
+NOT_EMAIL_SUFFIXES = ('.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.css', '.js')
+PLACEHOLDER_EMAIL_DOMAINS = ('example.com', 'domain.com', 'email.com', 'yourdomain.com', 'sentry.io', 'wixpress.com')
+SOCIAL_HOSTS = {
+    'facebook.com': 'facebook', 'instagram.com': 'instagram', 'linkedin.com': 'linkedin', 'twitter.com': 'twitter',
+    'x.com': 'twitter', 'youtube.com': 'youtube', 'tiktok.com': 'tiktok', 'yelp.com': 'yelp', 'pinterest.com': 'pinterest',
+}
+CONTACT_PAGE_HINTS = ('contact', 'about', 'impressum')
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain')
+MAX_REDIRECTS = 3
+MAX_EMAILS = 5
+# Failures worth retrying soon: cached for ENRICH_RETRY_TTL only, and never stamped on a saved lead
+TRANSIENT_STATUSES = ('TIMEOUT', 'HOST_BUSY', 'REQUEST_FAILED', 'DNS_ERROR', 'HTTP_429')
+
+
+class EnrichmentError(Exception):
+    """A page could not be fetched; `status` goes into the result (e.g. TIMEOUT, BLOCKED_HOST)."""
+
+    def __init__(self, status, message=''):
+        super().__init__(message or status)
+        self.status = status
+
+
+def _is_public(address):
+    return ipaddress.ip_address(address.split('%', 1)[0]).is_global
+
+
+class _PublicPeerMixin:
+    # The host check in fetch_page resolves the name once; urllib3 resolves it again to connect, and a
+    # rebinding DNS server can answer 127.0.0.1 the second time. So the connected peer is checked too,
+    # before a single byte of the request is sent.
+    def _new_conn(self):
+        sock = super()._new_conn()
+        peer = sock.getpeername()[0]
+        if not _is_public(peer):
+            sock.close()
+            raise EnrichmentError('BLOCKED_HOST', f"{self.host} connected to non-public address {peer}")
+        return sock
+
+
+class _PublicHTTPConnection(_PublicPeerMixin, HTTPConnection):
+    pass
+
+
+class _PublicHTTPSConnection(_PublicPeerMixin, HTTPSConnection):
+    pass
+
+
+class _PublicHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _PublicHTTPConnection
+
+
+class _PublicHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _PublicHTTPSConnection
+
+
+class PublicOnlyAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections refuse to talk to private, loopback or link-local peers."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': _PublicHTTPConnectionPool, 'https': _PublicHTTPSConnectionPool}
+
+
+def is_transient(status):
+    return status in TRANSIENT_STATUSES or status.startswith('HTTP_5')
+
+
+def site_key(url):
+    """Cache key for a website: its host without a leading www., or None if it isn't an http(s) URL."""
+    if not url:
+        return None
+    if '://' not in url:
+        url = 'http://' + url
+    parsed = urlparse(url.strip())
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        return None
+    host = parsed.hostname.lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def extract_contacts(html, page_url):
+    """(emails, social_links, candidate contact page URLs) found in one page's HTML."""
+    emails = []
+    for match in EMAIL_RE.findall(unquote(html)):
+        email = match.lower().strip('.')
+        if email.endswith(NOT_EMAIL_SUFFIXES) or email.split('@', 1)[1] in PLACEHOLDER_EMAIL_DOMAINS:
+            continue
+        if email not in emails:
+            emails.append(email)
+    social_links, contact_pages = {}, []
+    page_host = site_key(page_url)
+    for href in HREF_RE.findall(html):
+        href = href.strip()
+        if href.lower().startswith(('mailto:', 'tel:', 'javascript:')):
+            continue
+        absolute = urljoin(page_url, href)
+        host = site_key(absolute)
+        if host is None:
+            continue
+        network = SOCIAL_HOSTS.get(host) or SOCIAL_HOSTS.get(host.split('.', 1)[-1])
+        if network:
+            path = urlparse(absolute).path.strip('/')
+            # Skip share/intent buttons and bare home-page links; keep the first real profile per network.
+            if path and not path.startswith(('sharer', 'share', 'intent', 'dialog', 'plugins')):
+                social_links.setdefault(network, absolute.split('?', 1)[0])
+        elif host == page_host and any(hint in urlparse(absolute).path.lower() for hint in CONTACT_PAGE_HINTS):
+            if absolute not in contact_pages:
+                contact_pages.append(absolute)
+    return emails, social_links, contact_pages
+
+
+class WebsiteEnricher:
+    """Concurrent, cached crawler behind lead enrichment.
+
+    ENRICH_MAX_WORKERS bounds pages in flight per process, ENRICH_PER_HOST_LIMIT bounds them per
+    host. Every page gets short timeouts and at most ENRICH_MAX_BYTES of body, so one slow or huge
+    site can't hold a worker. Results are cached per site for ENRICH_CACHE_TTL (transient failures
+    such as timeouts for ENRICH_RETRY_TTL only), and concurrent lookups of the same site share one
+    crawl. Hosts that resolve to private, loopback or link-local addresses are refused unless
+    ENRICH_ALLOW_PRIVATE_HOSTS is set, both before the request and again on the connected socket
+    (see PublicOnlyAdapter).
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.cache = TTLCache()
+        self.flight = SingleFlight()
+        self.session = None
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._host_slots = {}
+        self._host_slots_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        self.app = app
+        self.max_workers = max(1, config.get('ENRICH_MAX_WORKERS', 16))
+        self.per_host_limit = max(1, config.get('ENRICH_PER_HOST_LIMIT', 2))
+        self.timeout = (config.get('ENRICH_CONNECT_TIMEOUT', 3), config.get('ENRICH_READ_TIMEOUT', 5))
+        self.max_bytes = config.get('ENRICH_MAX_BYTES', 262144)
+        self.max_pages = max(1, config.get('ENRICH_MAX_PAGES', 2))
+        self.allow_private_hosts = config.get('ENRICH_ALLOW_PRIVATE_HOSTS', False)
+        self.cache = TTLCache(maxsize=config.get('ENRICH_CACHE_SIZE', 5000), ttl=config.get('ENRICH_CACHE_TTL', 604800))
+        self.retry_ttl = config.get('ENRICH_RETRY_TTL', 600)
+        self.session = requests.Session()
+        adapter = (HTTPAdapter if self.allow_private_hosts else PublicOnlyAdapter)(pool_connections=self.max_workers, pool_maxsize=self.per_host_limit, pool_block=False)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['User-Agent'] = config.get('ENRICH_USER_AGENT') or 'LeadDawgBot/1.0 (+contact enrichment)'
+        self.session.headers['Accept'] = 'text/html,application/xhtml+xml;q=0.9,*/*;q=0.1'
+        app.extensions['website_enricher'] = self
+
+        @app.cli.command('enrich-saved-leads')
+        @click.option('--batch-size', default=50, show_default=True, help='Leads crawled per batch.')
+        @click.option('--limit', default=0, help='Stop after this many leads (0 = all due).')
+        @click.option('--force', is_flag=True, help='Re-crawl leads enriched within ENRICH_CACHE_TTL.')
+        def enrich_saved_leads_command(batch_size, limit, force):
+            """Fill email/social_links on saved leads that have a website."""
+            enriched = enrich_saved_leads(batch_size=batch_size, limit=limit or None, force=force,
+                                          progress=lambda count: click.echo(f"...{count} lead(s) enriched"))
+            click.echo(f"Enriched {enriched} saved lead(s).")
+
+    @property
+    def executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='enrich')
+            return self._executor
+
+    @contextmanager
+    def _host_slot(self, host):
+        # {host: [semaphore, users]}; an entry lives only while someone holds or waits for it, so
+        # crawling millions of sites doesn't leave a semaphore behind for each.
+        with self._host_slots_lock:
+            entry = self._host_slots.get(host)
+            if entry is None:
+                entry = self._host_slots[host] = [threading.BoundedSemaphore(self.per_host_limit), 0]
+            entry[1] += 1
+        try:
+            if not entry[0].acquire(timeout=self.timeout[1]):
+                raise EnrichmentError('HOST_BUSY', f"Too many requests in flight to {host}")
+            try:
+                yield
+            finally:
+                entry[0].release()
+        finally:
+            with self._host_slots_lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._host_slots[host]
+
+    def _check_host(self, host):
+        if self.allow_private_hosts:
+            return
+        try:
+            addresses = {info[4][0] for info in socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)}
+        except (socket.gaierror, UnicodeError):
+            raise EnrichmentError('DNS_ERROR', f"Cannot resolve {host}")
+        if not addresses or not all(_is_public(address) for address in addresses):
+            raise EnrichmentError('BLOCKED_HOST', f"{host} is not a public address")
+
+    def fetch_page(self, url):
+        """Returns (final_url, text) for an HTML page, reading at most max_bytes. Redirects are followed
+        by hand (up to MAX_REDIRECTS) so every hop gets the host check and per-host limit."""
+        for _ in range(MAX_REDIRECTS + 1):
+            host = urlparse(url).hostname
+            self._check_host(host)
+            with self._host_slot(host):
+                with metrics.time_upstream('website', 'fetch') as call:
+                    try:
+                        with self.session.get(url, stream=True, timeout=self.timeout, allow_redirects=False) as response:
+                            call.status = response.status_code
+                            if response.is_redirect and response.headers.get('Location'):
+                                url = urljoin(url, response.headers['Location'])
+                                if urlparse(url).scheme not in ('http', 'https'):
+                                    raise EnrichmentError('BAD_REDIRECT', url)
+                                continue
+                            if response.status_code >= 400:
+                                raise EnrichmentError(f"HTTP_{response.status_code}")
+                            content_type = response.headers.get('Content-Type', 'text/html').split(';', 1)[0].strip().lower()
+                            if content_type not in HTML_CONTENT_TYPES:
+                                raise EnrichmentError('NOT_HTML', content_type)
+                            body = bytearray()
+                            for chunk in response.iter_content(chunk_size=16384):
+                                body.extend(chunk)
+                                if len(body) >= self.max_bytes:
+                                    del body[self.max_bytes:]
+                                    break
+                            return url, body.decode(response.encoding or 'utf-8', errors='replace')
+                    except requests.exceptions.Timeout:
+                        call.status = 'timeout'
+                        raise EnrichmentError('TIMEOUT', url)
+                    except requests.exceptions.RequestException as e:
+                        call.status = 'error'
+                        raise EnrichmentError('REQUEST_FAILED', str(e))
+        raise EnrichmentError('TOO_MANY_REDIRECTS', url)
+
+    def crawl(self, website):
+        """Uncached crawl of one site. Always returns a result dict; failures are reported in 'status'."""
+        url = website.strip() if '://' in website else 'http://' + website.strip()
+        result = {'website': website, 'site': site_key(url), 'status': 'OK', 'emails': [], 'social_links': {}, 'pages_fetched': 0}
+        to_visit = [url]
+        try:
+            while to_visit and result['pages_fetched'] < self.max_pages:
+                final_url, html = self.fetch_page(to_visit.pop(0))
+                result['pages_fetched'] += 1
+                emails, social_links, contact_pages = extract_contacts(html, final_url)
+                result['emails'].extend(email for email in emails if email not in result['emails'])
+                for network, link in social_links.items():
+                    result['social_links'].setdefault(network, link)
+                if result['emails']:
+                    break # Got what we came for; the contact page would only cost another request
+                if result['pages_fetched'] == 1:
+                    to_visit = contact_pages[:1]
+        except EnrichmentError as e:
+            if result['pages_fetched'] == 0: # A failed contact page still leaves home-page results
+                result['status'] = e.status
+        # Prefer addresses on the site's own domain (info@acme.com over someone@gmail.com)
+        site = result['site'] or ''
+        result['emails'] = sorted(result['emails'], key=lambda email: not email.endswith('@' + site))[:MAX_EMAILS]
+        return result
+
+    def lookup(self, website):
+        """Cached crawl of `website`; concurrent lookups of the same site share one crawl."""
+        key = site_key(website)
+        if key is None:
+            return {'website': website, 'site': None, 'status': 'INVALID_URL', 'emails': [], 'social_links': {}, 'pages_fetched': 0}
+        cached = self.cache.get(key)
+        if cached is not None:
+            return {**cached, 'website': website, 'pages_fetched': 0}
+
+        def crawl_and_store():
+            result = self.crawl(website)
+            self.cache.set(key, result, ttl=self.retry_ttl if is_transient(result['status']) else None)
+            return result
+        return self.flight.do(key, crawl_and_store)
+
+    def submit(self, website):
+        """Future for lookup(website) on the shared enrichment pool."""
+        return self.executor.submit(metrics.bind(self.lookup), website)
+
+    def enrich_many(self, websites):
+        """{website: result} for each distinct website, crawled concurrently on the shared pool."""
+        futures = {website: self.submit(website) for website in dict.fromkeys(w for w in websites if w)}
+        return {website: future.result() for website, future in futures.items()}
+
+    def stats(self):
+        return {**self.cache.stats(), "coalesced": self.flight.coalesced}
+
+
+website_enricher = WebsiteEnricher()
+
+
+def apply_to_record(record, result):
+    # Fills a search-result card (see routes._build_place_record) from an enrichment result.
+    record['email'] = result['emails'][0] if result['emails'] else None
+    record['emails'] = result['emails']
+    record['social_links'] = result['social_links']
+    record['enrichment_status'] = result['status']
+    return record
+
+
+def enrich_saved_leads(conditions=(), batch_size=50, limit=None, force=False, progress=None):
+    """Crawls the websites of saved leads matching `conditions` (SQLAlchemy clauses; all leads if
+    empty) in id order, `batch_size` at a time, and writes email/social_links/enriched_at back with
+    one bulk UPDATE per batch. Leads enriched within ENRICH_CACHE_TTL are skipped unless `force`.
+    Leads whose crawl failed transiently (timeouts, busy hosts, 5xx) are left untouched, so the next
+    run retries them. updated_at is written back unchanged: enrichment is not a user edit. Returns
+    leads enriched."""
+    conditions = [SavedLead.website_at_save.isnot(None), SavedLead.website_at_save != '', *conditions]
+    if not force:
+        cutoff = datetime.utcnow() - timedelta(seconds=website_enricher.cache.ttl)
+        conditions.append(or_(SavedLead.enriched_at.is_(None), SavedLead.enriched_at < cutoff))
+    enriched, seen, last_id = 0, 0, 0
+    while limit is None or seen < limit:
+        take = batch_size if limit is None else min(batch_size, limit - seen)
+        rows = db.session.execute(
+            db.select(SavedLead.id, SavedLead.website_at_save, SavedLead.updated_at)
+            .where(and_(SavedLead.id > last_id, *conditions)).order_by(SavedLead.id).limit(take)).all()
+        if not rows:
+            break
+        results = website_enricher.enrich_many(row.website_at_save for row in rows)
+        now = datetime.utcnow()
+        done = [(row, results[row.website_at_save]) for row in rows if not is_transient(results[row.website_at_save]['status'])]
+        if done:
+            db.session.execute(update(SavedLead), [
+                {'id': row.id, 'email': (result['emails'] or [None])[0],
+                 'social_links': json.dumps(result['social_links']) if result['social_links'] else None,
+                 'enriched_at': now, 'updated_at': row.updated_at}
+                for row, result in done])
+            db.session.commit()
+        enriched += len(done)
+        seen += len(rows)
+        last_id = rows[-1].id
+        if progress:
+            progress(enriched)
+    return enriched
@@ -0,0 +1,179 @@
+# app/image_cache.py
+# Disk cache for /api/search/image-proxy. Photos are stored once per content hash and
+# indexed by (photo reference, size), so every worker on the box shares the same files.
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+
+class DiskImageCache:
+    """Content-addressed, size-capped image cache on local disk.
+
+    Layout under IMAGE_CACHE_DIR:
+        keys/<sha256 of cache key>.json   -> {"sha256", "content_type", "size"}
+        blobs/<sha[:2]>/<sha>              -> the image bytes
+
+    Blob mtimes are bumped on every hit; when the cache grows past IMAGE_CACHE_MAX_BYTES
+    the least recently used blobs are removed until it is back under 90% of the cap, along
+    with the keys pointing at them. A key whose blob went missing anyway (evicted by another
+    worker mid-sweep) reads as a miss and is removed.
+    """
+
+    def __init__(self, app=None):
+        self.directory = None
+        self.max_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._total_bytes = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.directory = app.config.get('IMAGE_CACHE_DIR') or os.path.join(app.instance_path, 'image_cache')
+        self.max_bytes = app.config.get('IMAGE_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+        self._total_bytes = None
+        app.extensions['image_cache'] = self
+
+    @property
+    def enabled(self):
+        return bool(self.directory) and self.max_bytes > 0
+
+    @staticmethod
+    def make_key(photo_reference, maxwidth=None, maxheight=None):
+        raw = f"{photo_reference}|w={maxwidth or ''}|h={maxheight or ''}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _key_path(self, key):
+        return os.path.join(self.directory, 'keys', f"{key}.json")
+
+    def _blob_path(self, sha256):
+        return os.path.join(self.directory, 'blobs', sha256[:2], sha256)
+
+    def get(self, key):
+        """Returns {"path", "sha256", "content_type", "size", "mtime"} for a cached image, or None."""
+        if not self.enabled:
+            return None
+        try:
+            with open(self._key_path(key)) as f:
+                meta = json.load(f)
+            blob_path = self._blob_path(meta['sha256'])
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(blob_path) # LRU bump
+            stat = os.stat(blob_path)
+        except OSError:
+            self._remove_key_file(self._key_path(key))
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return {**meta, 'path': blob_path, 'mtime': stat.st_mtime}
+
+    def put_stream(self, key, chunks, content_type):
+        """Writes `chunks` to disk while hashing them, without holding the image in memory.
+        Returns the same dict as get()."""
+        blob_root = os.path.join(self.directory, 'blobs')
+        os.makedirs(blob_root, exist_ok=True)
+        os.makedirs(os.path.join(self.directory, 'keys'), exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=blob_root, prefix='.incoming-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    if chunk:
+                        digest.update(chunk)
+                        size += len(chunk)
+                        f.write(chunk)
+            sha256 = digest.hexdigest()
+            blob_path = self._blob_path(sha256)
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            if os.path.exists(blob_path):
+                # Same photo under another key (or size): keep the stored copy, and don't count it twice
+                os.remove(tmp_path)
+                os.utime(blob_path)
+                added = 0
+            else:
+                os.replace(tmp_path, blob_path) # Atomic; identical content from another worker just overwrites
+                added = size
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        meta = {'sha256': sha256, 'content_type': content_type, 'size': size}
+        fd, tmp_key_path = tempfile.mkstemp(dir=os.path.join(self.directory, 'keys'), prefix='.incoming-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_key_path, self._key_path(key))
+        self._account(added)
+        return {**meta, 'path': blob_path, 'mtime': os.stat(blob_path).st_mtime}
+
+    def _iter_blobs(self):
+        blob_root = os.path.join(self.directory, 'blobs')
+        for dirpath, _, filenames in os.walk(blob_root):
+            for name in filenames:
+                if name.startswith('.incoming-'):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _account(self, added_bytes):
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._iter_blobs())
+            else:
+                self._total_bytes += added_bytes
+            if self._total_bytes <= self.max_bytes:
+                return
+            # Re-measure from disk: other workers write here too.
+            blobs = sorted(self._iter_blobs(), key=lambda blob: blob[2])
+            total = sum(size for _, size, _ in blobs)
+            target = int(self.max_bytes * 0.9)
+            for path, size, _ in blobs:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+            self._total_bytes = total
+            self._remove_dangling_keys()
+
+    def _remove_dangling_keys(self):
+        # Keys whose blob is gone, whichever worker evicted it
+        keys_root = os.path.join(self.directory, 'keys')
+        for entry in os.scandir(keys_root):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                with open(entry.path) as f:
+                    sha256 = json.load(f)['sha256']
+            except (OSError, ValueError, KeyError):
+                continue
+            if not os.path.exists(self._blob_path(sha256)):
+                self._remove_key_file(entry.path)
+
+    @staticmethod
+    def _remove_key_file(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "bytes": self._total_bytes, "max_bytes": self.max_bytes}
+
+
+image_cache = DiskImageCache()
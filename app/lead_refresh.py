@@ -0,0 +1,137 @@
+# app/lead_refresh.py
+# Background refresh of SavedLead snapshots (name/address/phone/website_at_save) from Google
+# Place Details, so pipelines don't go stale. Run it from cron: `flask refresh-stale-leads`.
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import and_, tuple_, update
+
+from app import db
+from app.cache import place_details_cache
+from app.metrics import metrics
+from app.models import SavedLead
+from app.places_client import TokenBucket
+
+# SavedLead snapshot column -> Place Details field
+SNAPSHOT_FIELDS = {
+    'name_at_save': 'name',
+    'address_at_save': 'formatted_address',
+    'phone_at_save': 'formatted_phone_number',
+    'website_at_save': 'website',
+}
+# Place ids Google no longer knows; the lead is marked checked so it isn't asked about again every run
+GONE_STATUSES = ('NOT_FOUND', 'INVALID_REQUEST')
+
+
+class LeadRefresher:
+    """Walks stale saved leads (updated_at older than LEAD_REFRESH_MAX_AGE_DAYS) oldest first, in
+    keyset order on (updated_at, id), LEAD_REFRESH_BATCH_SIZE leads at a time.
+
+    Each batch's place ids are looked up once for every user: stale leads of other users with the
+    same place are refreshed in the same pass. Details come from the Place Details cache when it has
+    them, otherwise from LEAD_REFRESH_WORKERS threads throttled to LEAD_REFRESH_QPS, on top of the
+    shared Places QPS budget, so interactive searches keep most of it. Only snapshot columns whose
+    value changed are written, in bulk; updated_at is the snapshot clock, so every checked lead gets it.
+
+    Resumable by construction: a refreshed lead leaves the stale window, so a killed or
+    LEAD_REFRESH_MAX_PLACES-limited run simply continues with the next invocation. Transient
+    lookup failures leave the lead stale and it is retried next run.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.max_age = timedelta(days=app.config.get('LEAD_REFRESH_MAX_AGE_DAYS', 30))
+        self.batch_size = app.config.get('LEAD_REFRESH_BATCH_SIZE', 200)
+        self.max_workers = max(1, app.config.get('LEAD_REFRESH_WORKERS', 4))
+        self.qps = app.config.get('LEAD_REFRESH_QPS', 5)
+        self.max_places = app.config.get('LEAD_REFRESH_MAX_PLACES', 0)
+        app.extensions['lead_refresher'] = self
+
+        @app.cli.command('refresh-stale-leads')
+        @click.option('--max-places', default=None, type=int, help='Stop after this many upstream lookups (default LEAD_REFRESH_MAX_PLACES; 0 = no limit).')
+        @click.option('--max-age-days', default=None, type=float, help='Override LEAD_REFRESH_MAX_AGE_DAYS.')
+        def refresh_stale_leads_command(max_places, max_age_days):
+            """Refresh saved-lead snapshots older than the threshold from Google Place Details."""
+            stats = self.run(max_places=max_places, max_age=timedelta(days=max_age_days) if max_age_days is not None else None,
+                             progress=lambda stats: click.echo(f"...{stats}"))
+            click.echo(f"Lead refresh finished: {stats}")
+
+    def run(self, max_places=None, max_age=None, progress=None):
+        """One pass over the stale window. Returns counters (leads checked/changed, places fetched, ...)."""
+        max_places = self.max_places if max_places is None else max_places
+        cutoff = datetime.utcnow() - (max_age or self.max_age)
+        bucket = TokenBucket(self.qps, max(1, self.qps)) if self.qps else None
+        stats = {'leads_checked': 0, 'leads_changed': 0, 'places_fetched': 0, 'places_cached': 0, 'places_gone': 0, 'places_failed': 0}
+        position = None # (updated_at, id) of the last lead seen
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='lead-refresh') as executor:
+            while not max_places or stats['places_fetched'] < max_places:
+                stale = SavedLead.updated_at < cutoff
+                if position is not None:
+                    # Rows before the position that are still stale failed this run; don't spin on them.
+                    stale = and_(stale, tuple_(SavedLead.updated_at, SavedLead.id) > position)
+                batch = db.session.execute(db.select(SavedLead.place_id_google, SavedLead.updated_at, SavedLead.id).where(stale)
+                                           .order_by(SavedLead.updated_at, SavedLead.id).limit(self.batch_size)).all()
+                if not batch:
+                    break
+                position = (batch[-1].updated_at, batch[-1].id)
+                place_ids = list(dict.fromkeys(row.place_id_google for row in batch))
+                if max_places:
+                    place_ids = place_ids[:max_places - stats['places_fetched']] if stats['places_fetched'] < max_places else []
+                self._refresh_places(place_ids, cutoff, executor, bucket, stats)
+                if progress:
+                    progress(dict(stats))
+        return stats
+
+    def _refresh_places(self, place_ids, cutoff, executor, bucket, stats):
+        from app.routes import PLACE_DETAILS_FIELDS, _request_place_details # Deferred: app.routes imports half the app
+
+        def fetch(place_id):
+            if bucket is not None:
+                bucket.acquire(max_wait=3600)
+            return _request_place_details(place_id)
+
+        details = {place_id: {'status': 'OK', 'result': result} for place_id, result in place_details_cache.get_many(place_ids, PLACE_DETAILS_FIELDS).items()}
+        stats['places_cached'] += len(details)
+        to_fetch = [place_id for place_id in place_ids if place_id not in details]
+        fetched = dict(zip(to_fetch, executor.map(metrics.bind(fetch), to_fetch)))
+        stats['places_fetched'] += len(to_fetch)
+        place_details_cache.set_many({place_id: result['result'] for place_id, result in fetched.items()
+                                      if result.get('status') == 'OK' and 'result' in result}, PLACE_DETAILS_FIELDS)
+        details.update(fetched)
+
+        checked = {}
+        for place_id, result in details.items():
+            if result.get('status') == 'OK' and 'result' in result: checked[place_id] = result['result']
+            elif result.get('status') in GONE_STATUSES: checked[place_id] = None; stats['places_gone'] += 1
+            else: stats['places_failed'] += 1
+        if not checked:
+            return
+        # Every stale lead of these places, whoever saved it
+        leads = db.session.execute(db.select(SavedLead.id, SavedLead.place_id_google, *(getattr(SavedLead, column) for column in SNAPSHOT_FIELDS))
+                                   .where(SavedLead.place_id_google.in_(list(checked)), SavedLead.updated_at < cutoff)).all()
+        now = datetime.utcnow()
+        changes_by_columns, unchanged_ids = {}, []
+        for lead in leads:
+            place = checked[lead.place_id_google]
+            # Only non-empty Google values overwrite; a missing field never blanks a snapshot.
+            changes = {column: place[field] for column, field in SNAPSHOT_FIELDS.items()
+                       if place and place.get(field) and place[field] != getattr(lead, column)}
+            if changes: changes_by_columns.setdefault(tuple(sorted(changes)), []).append({'id': lead.id, 'updated_at': now, **changes})
+            else: unchanged_ids.append(lead.id)
+        for rows in changes_by_columns.values(): # executemany needs the same keys on every row
+            db.session.execute(update(SavedLead), rows)
+            stats['leads_changed'] += len(rows)
+        if unchanged_ids:
+            db.session.execute(update(SavedLead).where(SavedLead.id.in_(unchanged_ids)).values(updated_at=now)
+                               .execution_options(synchronize_session=False))
+        db.session.commit()
+        stats['leads_checked'] += len(leads)
+
+
+lead_refresher = LeadRefresher()
@@ -0,0 +1,119 @@
+# app/lead_search.py
+# Full-text search over a user's saved leads (name, address, notes).
+#
+# SQLite: an FTS5 table (rowid = saved_lead.id) kept in sync by triggers on saved_lead. Each row
+#         also carries an owner_token (u<user_id>) so the MATCH itself narrows to one user's leads.
+# Postgres: a GIN index on the tsvector expression below, queried with to_tsquery/ts_rank.
+# Anything else: unindexed case-insensitive substring matching, newest first. Correct, but a scan.
+#           Also used on SQLite while the FTS table is missing (database not yet migrated).
+import re
+
+import click
+from flask import current_app
+from sqlalchemy import DDL, and_, event, or_, text
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.models import SavedLead
+
+FTS_TABLE = 'saved_lead_fts'
+
+SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name_at_save, address_at_save, user_notes, owner_token,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')""",
+    f"""CREATE TRIGGER IF NOT EXISTS saved_lead_fts_ai AFTER INSERT ON saved_lead BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name_at_save, address_at_save, user_notes, owner_token)
+        VALUES (new.id, new.name_at_save, new.address_at_save, new.user_notes, 'u' || new.user_id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS saved_lead_fts_ad AFTER DELETE ON saved_lead BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS saved_lead_fts_au AFTER UPDATE OF user_id, name_at_save, address_at_save, user_notes ON saved_lead BEGIN
+        UPDATE {FTS_TABLE} SET name_at_save = new.name_at_save, address_at_save = new.address_at_save,
+            user_notes = new.user_notes, owner_token = 'u' || new.user_id
+        WHERE rowid = old.id;
+    END""",
+]
+
+POSTGRES_TSVECTOR = ("to_tsvector('simple', coalesce(name_at_save, '') || ' ' || coalesce(address_at_save, '') "
+                     "|| ' ' || coalesce(user_notes, ''))")
+POSTGRES_DDL = [f"CREATE INDEX IF NOT EXISTS ix_saved_lead_fulltext ON saved_lead USING gin ({POSTGRES_TSVECTOR})"]
+
+for statement in SQLITE_DDL:
+    event.listen(SavedLead.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+for statement in POSTGRES_DDL:
+    event.listen(SavedLead.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+
+
+def search_terms(query):
+    # Free text -> word tokens. Everything else (quotes, operators, column filters) is dropped,
+    # so user input can never be interpreted as FTS syntax.
+    return re.findall(r'\w+', query.lower())[:16]
+
+
+def search_leads(user_id, query, limit=20, offset=0):
+    """Returns (rows, has_more) for `user_id`'s leads matching every term in `query` (the last
+    term as a prefix), best match first. Rows are SavedLead instances."""
+    terms = search_terms(query)
+    if not terms:
+        return [], False
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        # Terms are restricted to the text columns; owner_token pins the match to this user.
+        text_match = ' AND '.join(f'"{term}"' for term in terms[:-1]) + (' AND ' if len(terms) > 1 else '') + f'"{terms[-1]}"*'
+        match = f'owner_token : "u{int(user_id)}" AND {{name_at_save address_at_save user_notes}} : ({text_match})'
+        # bm25 column weights: name, address, notes, owner_token
+        ranked = text(f"""SELECT rowid AS id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match
+                          ORDER BY bm25({FTS_TABLE}, 10.0, 4.0, 2.0, 0.0) LIMIT :limit OFFSET :offset""")
+        params = {'match': match, 'limit': limit + 1, 'offset': offset}
+    elif dialect == 'postgresql':
+        ranked = text(f"""SELECT id FROM saved_lead WHERE user_id = :user_id AND {POSTGRES_TSVECTOR} @@ to_tsquery('simple', :tsquery)
+                          ORDER BY ts_rank({POSTGRES_TSVECTOR}, to_tsquery('simple', :tsquery)) DESC, id DESC LIMIT :limit OFFSET :offset""")
+        params = {'user_id': user_id, 'tsquery': ' & '.join(terms[:-1] + [f'{terms[-1]}:*']), 'limit': limit + 1, 'offset': offset}
+    else:
+        ranked, params = _substring_query(user_id, terms, limit, offset), {}
+    try:
+        ids = [row.id for row in db.session.execute(ranked, params)]
+    except OperationalError as e:
+        # A SQLite database from before this feature that hasn't had `flask db upgrade` yet: no FTS table.
+        if dialect != 'sqlite' or FTS_TABLE not in str(e.orig): raise
+        db.session.rollback()
+        current_app.logger.warning(f"{FTS_TABLE} is missing, falling back to substring lead search; run 'flask db upgrade'")
+        ids = [row.id for row in db.session.execute(_substring_query(user_id, terms, limit, offset))]
+    has_more = len(ids) > limit
+    ids = ids[:limit]
+    by_id = {lead.id: lead for lead in SavedLead.query.filter(SavedLead.id.in_(ids), SavedLead.user_id == user_id)}
+    return [by_id[lead_id] for lead_id in ids if lead_id in by_id], has_more
+
+
+def _substring_query(user_id, terms, limit, offset):
+    # Unindexed fallback: every term must appear in name, address or notes (case-insensitive), newest first.
+    columns = (SavedLead.name_at_save, SavedLead.address_at_save, SavedLead.user_notes)
+    return (db.select(SavedLead.id).where(SavedLead.user_id == user_id,
+                                           and_(*(or_(*(column.icontains(term, autoescape=True) for column in columns)) for term in terms)))
+            .order_by(SavedLead.id.desc()).limit(limit + 1).offset(offset))
+
+
+def rebuild_index():
+    """Creates the index objects if they are missing (databases created before this feature)
+    and, on SQLite, repopulates the FTS table from saved_lead."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_DDL:
+            db.session.execute(text(statement))
+        db.session.execute(text(f"DELETE FROM {FTS_TABLE}"))
+        db.session.execute(text(f"""INSERT INTO {FTS_TABLE}(rowid, name_at_save, address_at_save, user_notes, owner_token)
+                                    SELECT id, name_at_save, address_at_save, user_notes, 'u' || user_id FROM saved_lead"""))
+    elif dialect == 'postgresql':
+        for statement in POSTGRES_DDL:
+            db.session.execute(text(statement))
+    db.session.commit()
+
+
+def init_app(app):
+    @app.cli.command('rebuild-lead-search-index')
+    def rebuild_lead_search_index_command():
+        """Create/refresh the saved-lead full-text index."""
+        rebuild_index()
+        click.echo("Saved-lead search index rebuilt.")
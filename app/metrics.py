@@ -0,0 +1,268 @@
+# app/metrics.py
+# Lightweight in-process instrumentation: route latency, upstream (Google Places / Stripe) call
+# timing, SQL count/time per request, cache hit ratios, all exposed in Prometheus text format.
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34)).replace(chr(10), " ")}"'
+               for key, value in labels)
+    return '{' + ','.join(escaped) + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name, self.help_text, self.label_names = name, help_text, tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(zip(self.label_names, key))} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help_text, self.label_names = name, help_text, tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {} # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                labels = list(zip(self.label_names, key))
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f'{self.name}_bucket{_format_labels(labels + [("le", repr(bound))])} {count}')
+                lines.append(f'{self.name}_bucket{_format_labels(labels + [("le", "+Inf")])} {series[-1]}')
+                lines.append(f'{self.name}_sum{_format_labels(labels)} {series[-2]}')
+                lines.append(f'{self.name}_count{_format_labels(labels)} {series[-1]}')
+        return lines
+
+
+class RequestBreakdown:
+    """Where one request's time went. Shared (via contextvars) with helper threads started with bind()."""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.upstream = {} # "service.operation" -> [calls, seconds]
+        self.waits = {} # e.g. page_token -> seconds
+        self._lock = threading.Lock()
+
+    def add_sql(self, seconds):
+        with self._lock:
+            self.sql_count += 1
+            self.sql_time += seconds
+
+    def add_upstream(self, key, seconds):
+        with self._lock:
+            entry = self.upstream.setdefault(key, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def add_wait(self, key, seconds):
+        with self._lock:
+            self.waits[key] = self.waits.get(key, 0.0) + seconds
+
+    def as_dict(self):
+        return {'total_ms': round((time.perf_counter() - self.started_at) * 1000, 1),
+                'sql_queries': self.sql_count, 'sql_ms': round(self.sql_time * 1000, 1),
+                'upstream': {key: {'calls': calls, 'ms': round(seconds * 1000, 1)} for key, (calls, seconds) in sorted(self.upstream.items())},
+                'waits_ms': {key: round(seconds * 1000, 1) for key, seconds in sorted(self.waits.items())}}
+
+
+_current_breakdown = contextvars.ContextVar('leaddawg_request_breakdown', default=None)
+
+
+class Metrics:
+    """Registry + Flask/SQLAlchemy hooks. init_app() is called from create_app."""
+
+    def __init__(self, app=None):
+        self.request_duration = Histogram('leaddawg_http_request_duration_seconds', 'Time to produce a response (headers, for streamed responses).',
+                                          ('method', 'route', 'status'))
+        self.upstream_duration = Histogram('leaddawg_upstream_request_duration_seconds', 'Calls to Google Places and Stripe.',
+                                           ('service', 'operation', 'status'))
+        self.wait_duration = Histogram('leaddawg_wait_seconds', 'Deliberate waits, e.g. Google page-token delays.', ('reason',))
+        self.sql_duration = Histogram('leaddawg_sql_query_duration_seconds', 'Individual SQL statement time.',
+                                      buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0))
+        self.sql_per_request = Histogram('leaddawg_sql_queries_per_request', 'SQL statements issued per HTTP request.', ('route',),
+                                         buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100))
+        self.slow_requests = Counter('leaddawg_slow_requests_total', 'Requests over SLOW_REQUEST_THRESHOLD_MS.', ('route',))
+        self.collectors = [] # callables returning extra exposition lines at scrape time
+        self.slow_threshold = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        threshold_ms = app.config.get('SLOW_REQUEST_THRESHOLD_MS')
+        self.slow_threshold = threshold_ms / 1000.0 if threshold_ms else None
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        if not getattr(self, '_sql_hooked', False):
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            self._sql_hooked = True
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+        app.extensions['metrics'] = self
+
+    # --- Request hooks ---
+    def _before_request(self):
+        breakdown = RequestBreakdown()
+        g._metrics_breakdown = breakdown
+        g._metrics_token = _current_breakdown.set(breakdown)
+
+    def _after_request(self, response):
+        breakdown = g.get('_metrics_breakdown')
+        if breakdown is None:
+            return response
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        elapsed = time.perf_counter() - breakdown.started_at
+        self.request_duration.observe(elapsed, method=request.method, route=route, status=response.status_code)
+        self.sql_per_request.observe(breakdown.sql_count, route=route)
+        if self.slow_threshold is not None and elapsed >= self.slow_threshold:
+            self.slow_requests.inc(route=route)
+            current_app.logger.warning(f"Slow request {request.method} {route} -> {response.status_code}: {breakdown.as_dict()}")
+        return response
+
+    def _teardown_request(self, exc=None):
+        token = g.pop('_metrics_token', None)
+        if token is not None:
+            try:
+                _current_breakdown.reset(token)
+            except ValueError:
+                pass # Streamed response finished in a different context
+
+    # --- SQL hooks ---
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_metrics_query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('_metrics_query_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        self.sql_duration.observe(elapsed)
+        breakdown = _current_breakdown.get()
+        if breakdown is not None:
+            breakdown.add_sql(elapsed)
+
+    # --- Upstream / waits ---
+    @contextmanager
+    def time_upstream(self, service, operation):
+        """Times a Google/Stripe call. Set `call.status` inside the block (defaults to 'ok', or 'error' on exception)."""
+        call = type('UpstreamCall', (), {'status': 'ok'})()
+        start = time.perf_counter()
+        try:
+            yield call
+        except Exception:
+            call.status = 'error' if call.status == 'ok' else call.status
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.upstream_duration.observe(elapsed, service=service, operation=operation, status=call.status)
+            breakdown = _current_breakdown.get()
+            if breakdown is not None:
+                breakdown.add_upstream(f"{service}.{operation}", elapsed)
+
+    def record_wait(self, reason, seconds):
+        self.wait_duration.observe(seconds, reason=reason)
+        breakdown = _current_breakdown.get()
+        if breakdown is not None:
+            breakdown.add_wait(reason, seconds)
+
+    @staticmethod
+    def bind(fn):
+        """Wraps `fn` so it runs in a copy of the caller's context; use when handing work to a thread
+        pool, so upstream/SQL time from helper threads lands in the request's breakdown."""
+        ctx = contextvars.copy_context()
+        return lambda *args, **kwargs: ctx.copy().run(fn, *args, **kwargs)
+
+    # --- Exposition ---
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in (self.request_duration, self.upstream_duration, self.wait_duration, self.sql_duration,
+                       self.sql_per_request, self.slow_requests):
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+    def metrics_view(self):
+        token = current_app.config.get('METRICS_AUTH_TOKEN')
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+
+def cache_collector(caches):
+    """Exposition lines for cache hit/miss counts and hit ratios; `caches` maps a name to an object with stats()."""
+    def collect():
+        lines = ['# HELP leaddawg_cache_hits_total Cache hits.', '# TYPE leaddawg_cache_hits_total counter',
+                 '# HELP leaddawg_cache_misses_total Cache misses.', '# TYPE leaddawg_cache_misses_total counter',
+                 '# HELP leaddawg_cache_hit_ratio Hits / (hits + misses) since process start.', '# TYPE leaddawg_cache_hit_ratio gauge']
+        for name, cache in caches.items():
+            stats = cache.stats()
+            hits = stats.get('hits', stats.get('memory_hits', 0) + stats.get('db_hits', 0))
+            misses = stats.get('misses', 0)
+            label = _format_labels([('cache', name)])
+            lines.append(f'leaddawg_cache_hits_total{label} {hits}')
+            lines.append(f'leaddawg_cache_misses_total{label} {misses}')
+            lines.append(f'leaddawg_cache_hit_ratio{label} {hits / (hits + misses) if hits + misses else 0}')
+        return lines
+    return collect
+
+
+def circuit_collector(places_client):
+    """Per Places endpoint, one gauge for each breaker state (closed/open/half-open): 1 for the
+    current state, 0 for the others, so every series exists from the first scrape on."""
+    def collect():
+        lines = ['# HELP leaddawg_places_circuit_state Circuit breaker state per Google Places endpoint.',
+                 '# TYPE leaddawg_places_circuit_state gauge']
+        for endpoint, breaker in sorted(places_client.breakers.items()):
+            current = breaker.state
+            for state in breaker.STATES:
+                lines.append(f'leaddawg_places_circuit_state{_format_labels([("endpoint", endpoint), ("state", state)])} {int(state == current)}')
+        return lines
+    return collect
+
+
+metrics = Metrics()
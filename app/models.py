@@ -1,12 +1,14 @@
 # app/models.py
 from app import db, login_manager
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.password_hashing import password_hasher
 from flask_login import UserMixin
 from datetime import datetime # Import datetime for timestamps
+import json
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    from app.cache import user_cache # Deferred: app.cache imports this module
+    return user_cache.load(int(user_id))
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -21,22 +23,46 @@ class User(UserMixin, db.Model):
     # Relationship to SavedLead (one-to-many: one User has many SavedLeads)
     saved_leads = db.relationship('SavedLead', backref='owner', lazy='dynamic')
 
+    # Both run on the password hashing process pool and may raise PasswordHasherBusy
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
 
     def __repr__(self):
         return f'<User {self.username}>'
 
 class SavedLead(db.Model):
+    __table_args__ = (
+        # Keyset pagination of a user's pipeline: WHERE user_id = ? [AND user_status = ?] ORDER BY saved_at DESC, id DESC
+        db.Index('ix_saved_lead_user_saved_at_id', 'user_id', 'saved_at', 'id'),
+        db.Index('ix_saved_lead_user_status_saved_at_id', 'user_id', 'user_status', 'saved_at', 'id'),
+        # Stale-snapshot walk of the background refresh (app/lead_refresh.py): WHERE updated_at < ? ORDER BY updated_at, id
+        db.Index('ix_saved_lead_updated_at_id', 'updated_at', 'id'),
+        # A user saves each Google place at most once; backs the dedupe in single and bulk saves. An index rather
+        # than a table constraint, like migration 0002 creates it (SQLite can't add a constraint in place).
+        db.Index('uq_saved_lead_user_place', 'user_id', 'place_id_google', unique=True),
+    )
+
+    # Columns a client may ask for with ?fields= on the leads list
+    SERIALIZABLE_FIELDS = ('id', 'place_id_google', 'name_at_save', 'address_at_save', 'phone_at_save', 'website_at_save',
+                           'user_status', 'user_notes', 'saved_at', 'updated_at', 'user_id', 'email', 'social_links', 'enriched_at')
+
     id = db.Column(db.Integer, primary_key=True)
     place_id_google = db.Column(db.String(255), nullable=False, index=True) # Google's Place ID
     name_at_save = db.Column(db.String(255), nullable=False)
     address_at_save = db.Column(db.String(500)) # Address can be long
     phone_at_save = db.Column(db.String(50))
     website_at_save = db.Column(db.String(500))
+
+    # Filled by website enrichment (app/enrichment.py), not by the user
+    email = db.Column(db.String(255))
+    social_links = db.Column(db.Text) # JSON object, e.g. {"facebook": "https://facebook.com/acme"}
+    enriched_at = db.Column(db.DateTime)
     
     user_status = db.Column(db.String(50), default='New', nullable=False) # e.g., New, Contacted, Booked
     user_notes = db.Column(db.Text) # For longer notes from the user
@@ -62,5 +88,84 @@ class SavedLead(db.Model):
             'user_notes': self.user_notes,
             'saved_at': self.saved_at.isoformat() + 'Z' if self.saved_at else None, # ISO format with Z for UTC
             'updated_at': self.updated_at.isoformat() + 'Z' if self.updated_at else None,
-            'user_id': self.user_id
-        }
\ No newline at end of file
+            'user_id': self.user_id,
+            'email': self.email,
+            'social_links': json.loads(self.social_links) if self.social_links else {},
+            'enriched_at': self.enriched_at.isoformat() + 'Z' if self.enriched_at else None
+        }
+
+    @staticmethod
+    def row_to_dict(row, fields):
+        # Same shape as to_dict() for a projected (non-ORM) row that has at least `fields` as attributes
+        result = {}
+        for field in fields:
+            value = getattr(row, field)
+            if isinstance(value, datetime): value = value.isoformat() + 'Z'
+            elif field == 'social_links': value = json.loads(value) if value else {}
+            result[field] = value
+        return result
+
+class PlaceDetailsCacheEntry(db.Model):
+    # Durable tier of the Place Details cache (see app/cache.py), shared by every worker process.
+    __tablename__ = 'place_details_cache'
+    __table_args__ = (db.UniqueConstraint('place_id', 'fields', name='uq_place_details_cache_place_fields'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    place_id = db.Column(db.String(255), nullable=False, index=True) # Google's Place ID
+    fields = db.Column(db.String(500), nullable=False) # Comma-separated Place Details field mask
+    payload = db.Column(db.Text, nullable=False) # JSON of the Details "result" object
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<PlaceDetailsCacheEntry {self.place_id}>'
+
+
+class SearchJob(db.Model):
+    # A background /api/search/places run (see app/search_jobs.py). Lives in the DB so any worker can report on it.
+    id = db.Column(db.String(36), primary_key=True) # uuid4 hex
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True, index=True) # None for anonymous searches
+    query = db.Column(db.String(500), nullable=False)
+    status = db.Column(db.String(20), default='queued', nullable=False) # queued, running, completed, failed
+    places_found = db.Column(db.Integer, default=0, nullable=False) # Text-search hits seen so far
+    places_done = db.Column(db.Integer, default=0, nullable=False) # Of those, how many are enriched
+    results = db.Column(db.Text) # JSON list of enriched places, in search order
+    error_message = db.Column(db.Text)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<SearchJob {self.id} {self.status}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'query': self.query,
+            'status': self.status,
+            'places_found': self.places_found,
+            'places_done': self.places_done,
+            'places': json.loads(self.results) if self.results else [],
+            'error_message': self.error_message,
+            'created_at': self.created_at.isoformat() + 'Z' if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() + 'Z' if self.updated_at else None,
+            'finished_at': self.finished_at.isoformat() + 'Z' if self.finished_at else None
+        }
+
+
+class StripeEvent(db.Model):
+    # Idempotency record + work queue for Stripe webhooks (see app/stripe_events.py). One row per Stripe event id.
+    id = db.Column(db.String(255), primary_key=True) # Stripe event id, e.g. evt_...
+    type = db.Column(db.String(100), nullable=False, index=True)
+    payload = db.Column(db.Text, nullable=False) # Raw, signature-verified event JSON
+    status = db.Column(db.String(20), default='pending', nullable=False, index=True) # pending, processing, processed, dead
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text)
+    next_attempt_at = db.Column(db.DateTime, nullable=True) # Retry backoff: a pending event isn't claimed before this
+
+    received_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    processed_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<StripeEvent {self.id} {self.type} {self.status}>'
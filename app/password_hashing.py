@@ -0,0 +1,115 @@
+# app/password_hashing.py
+# Runs Werkzeug's memory-hard password hashing on a small process pool instead of the request
+# thread, with a cap on queued work so a login storm is shed quickly instead of piling up.
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PasswordHasherBusy(Exception):
+    """Too many hash/verify operations are queued (or one timed out, or the pool crashed); callers should answer 503."""
+
+
+def _hash_method_of(pwhash):
+    # "scrypt:32768:8:1$salt$hash" -> "scrypt:32768:8:1"
+    return (pwhash or '').split('$', 1)[0]
+
+
+class PasswordHasher:
+    """Bounded process pool for generate_password_hash / check_password_hash.
+
+    PASSWORD_HASH_WORKERS processes (0 = hash inline, as before) serve at most
+    PASSWORD_HASH_MAX_PENDING operations at once per web process; anything beyond that
+    raises PasswordHasherBusy immediately. A slot is held until its operation actually
+    finishes, so a timed-out hash still counts against the cap. The pool is per web
+    process: under gunicorn the host runs workers x PASSWORD_HASH_WORKERS hashers, so keep
+    it at 1 or 2. PASSWORD_HASH_METHOD is passed straight to Werkzeug, and hashes made with
+    any other method are flagged by needs_rehash(). If a pool process dies, the pool is thrown
+    away and the next operation starts a fresh one.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.method = 'scrypt:32768:8:1'
+        self.method_prefix = self.method
+        self.workers = 0
+        self.timeout = 10
+        self._slots = None
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.method = app.config.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+        self.method_prefix = _hash_method_of(generate_password_hash('probe', self.method))
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', 1)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', 10)
+        max_pending = app.config.get('PASSWORD_HASH_MAX_PENDING') or max(1, self.workers) * 4
+        self._slots = threading.BoundedSemaphore(max_pending)
+        app.extensions['password_hasher'] = self
+
+    @property
+    def executor(self):
+        # Created on first use (after any gunicorn fork). "spawn" children don't inherit our threads or
+        # locks; they do re-import __main__, which is why run.py builds the app only outside them.
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def _discard_executor(self, executor, error):
+        # A dead child (OOM kill, segfault) breaks the whole pool for good: every later submit raises
+        # BrokenProcessPool. Drop it so the next operation builds a new one; other threads that saw the
+        # same failure find it already gone.
+        with self._executor_lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+        if self.app is not None:
+            self.app.logger.error(f"Password hashing pool broke, starting a new one on next use: {error}")
+
+    def _run(self, fn, *args):
+        if self._slots is None or self.workers <= 0:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy("Password hashing queue is full")
+        executor = self.executor
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException as e:
+            self._slots.release()
+            if isinstance(e, BrokenProcessPool):
+                self._discard_executor(executor, e)
+                raise PasswordHasherBusy("Password hashing pool is restarting") from e
+            raise
+        # The slot goes back when the work is done (or cancelled), not when we stop waiting for it.
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel() # Only succeeds while still queued; a running hash keeps its slot until it ends
+            raise PasswordHasherBusy("Password hashing timed out")
+        except BrokenProcessPool as e:
+            self._discard_executor(executor, e)
+            raise PasswordHasherBusy("Password hashing pool is restarting") from e
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        if not pwhash:
+            return False
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        return _hash_method_of(pwhash) != self.method_prefix
+
+
+password_hasher = PasswordHasher()
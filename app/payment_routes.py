@@ -4,8 +4,13 @@ from flask_login import login_required, current_user
 import stripe # Ensure stripe is available (initialized in __init__.py)
 import os
 
-from app.models import User # To update user tier
+from app.models import User, StripeEvent # To update user tier
 from app import db # To commit database changes
+from app.stripe_events import stripe_event_worker
+from app.price_catalog import price_catalog
+from app.metrics import metrics
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
 
 payments_bp = Blueprint('payments', __name__, url_prefix='/api/payments')
 
@@ -20,7 +25,10 @@ print(f"--- PAYMENT_ROUTES.PY LOADED: PRO ID = '{PRICE_ID_PRO_MONTHLY}', AGENCY
 
 # --- Helper to map Price ID to your internal tier name ---
 def get_tier_from_price_id(price_id):
-    # This function uses the module-level variables defined above
+    # Served from the in-memory price catalog; the module-level variables are the fallback
+    tier_name = price_catalog.tier_for(price_id)
+    if tier_name:
+        return tier_name
     if price_id == PRICE_ID_PRO_MONTHLY:
         return 'pro'
     elif price_id == PRICE_ID_AGENCY_MONTHLY:
@@ -66,23 +74,17 @@ def create_checkout_session():
     FRONTEND_URL = os.getenv('FRONTEND_URL') or current_app.config.get('FRONTEND_URL') or 'http://localhost:5174' 
     # Prioritize os.getenv for FRONTEND_URL if it might be set differently than app.config for some reason
 
+    # Validate against the cached catalog instead of a stripe.Price.retrieve round trip.
+    # If Stripe hasn't answered the catalog load yet, Session.create below still rejects bad prices.
+    catalog_price = price_catalog.get(selected_stripe_price_id)
+    if catalog_price and catalog_price['type'] is not None and catalog_price['type'] != 'recurring':
+        current_app.logger.error(f"Price ID '{selected_stripe_price_id}' is NOT a recurring price. It's type: {catalog_price['type']}")
+        return jsonify(error={'message': 'Selected plan is not a subscription.'}), 400
+    if catalog_price and catalog_price['active'] is False:
+        current_app.logger.error(f"Price ID '{selected_stripe_price_id}' is NOT active.")
+        return jsonify(error={'message': 'Selected plan is not active.'}), 400
+
     try:
-          # --- NEW DEBUG STEP: TRY TO RETRIEVE THE PRICE DIRECTLY ---
-        try:
-            current_app.logger.info(f"Attempting to retrieve Price object from Stripe with ID: '{selected_stripe_price_id}'")
-            retrieved_price = stripe.Price.retrieve(selected_stripe_price_id)
-            current_app.logger.info(f"Successfully retrieved Price object: {retrieved_price.id}, Active: {retrieved_price.active}, Type: {retrieved_price.type}, Recurring: {retrieved_price.recurring}")
-            if retrieved_price.type != 'recurring':
-                current_app.logger.error(f"Price ID '{selected_stripe_price_id}' is NOT a recurring price. It's type: {retrieved_price.type}")
-                # return jsonify(error={'message': 'Selected plan is not a subscription.'}), 400 # Optionally stop here
-            if not retrieved_price.active:
-                current_app.logger.error(f"Price ID '{selected_stripe_price_id}' is NOT active.")
-                # return jsonify(error={'message': 'Selected plan is not active.'}), 400 # Optionally stop here
-
-        except stripe.error.StripeError as e_retrieve:
-            current_app.logger.error(f"Failed to retrieve Price object '{selected_stripe_price_id}' from Stripe directly: {e_retrieve}")
-            # This error might be the same "No such price" error, confirming the ID is the issue with Stripe
-        
         checkout_session_params = {
             'line_items': [{'price': selected_stripe_price_id, 'quantity': 1}],
             'mode': 'subscription',
@@ -102,7 +104,8 @@ def create_checkout_session():
             checkout_session_params['customer_email'] = current_user.email
 
         current_app.logger.info(f"STRIPE API CALL PARAMS: Attempting to use Price ID: '{selected_stripe_price_id}' for line_items.")
-        checkout_session = stripe.checkout.Session.create(**checkout_session_params)
+        with metrics.time_upstream('stripe', 'checkout.session.create'):
+            checkout_session = stripe.checkout.Session.create(**checkout_session_params)
         
         current_app.logger.info(f"Created Stripe Checkout Session ID: {checkout_session.id} for User ID: {current_user.id}")
         return jsonify({'id': checkout_session.id})
@@ -119,11 +122,106 @@ def create_checkout_session():
         current_app.logger.error(f"Unexpected error in create_checkout_session: {e}", exc_info=True)
         return jsonify(error={'message': 'An unexpected server error occurred.'}), 500
 
-# ... (Keep the stripe_webhook function exactly as it was in the last version you provided,
-#      as its internal logic for get_tier_from_price_id using the module-level PRICE_ID_PRO_MONTHLY
-#      and PRICE_ID_AGENCY_MONTHLY was correct.) ...
+# --- Stripe event handlers ---
+# Run by the background worker in app/stripe_events.py, never in the webhook request itself.
+# `event` is the verified event JSON as plain dicts. Handlers must be safe to run twice.
+def _find_user_for_customer(customer_id):
+    return User.query.filter_by(stripe_customer_id=customer_id).first() if customer_id else None
+
+def handle_checkout_session_completed(event):
+    session = event['data']['object']
+    current_app.logger.info(f"Processing checkout.session.completed for session: {session.get('id')}")
+    user_id_str = session.get('client_reference_id')
+    if not user_id_str and session.get('metadata'):
+        user_id_str = session['metadata'].get('user_id')
+    if not user_id_str:
+        current_app.logger.warning(f"Webhook: client_reference_id or metadata.user_id missing in checkout.session.completed: {session.get('id')}")
+        return
+    try:
+        user_id = int(user_id_str)
+    except ValueError:
+        current_app.logger.error(f"Webhook: Invalid user_id format '{user_id_str}' from session {session.get('id')}.")
+        return
+    user = db.session.get(User, user_id)
+    if not user:
+        current_app.logger.error(f"Webhook: User not found for ID {user_id_str} from session {session.get('id')}.")
+        return
+    stripe_customer_id = session.get('customer')
+    stripe_subscription_id = session.get('subscription')
+    selected_price_id = (session.get('metadata') or {}).get('selected_price_id')
+    tier_name = (get_tier_from_price_id(selected_price_id) if selected_price_id else None) or 'pro'
+    user.tier = tier_name
+    if stripe_customer_id: user.stripe_customer_id = stripe_customer_id
+    if stripe_subscription_id: user.stripe_subscription_id = stripe_subscription_id
+    db.session.commit()
+    current_app.logger.info(f"User ID {user.id} ({user.username}) subscription activated/updated to tier: {tier_name}.")
+
+def handle_invoice_payment_succeeded(event):
+    # Renewal paid: keep the tier in line with the billed price and extend the paid-through date.
+    invoice = event['data']['object']
+    user = _find_user_for_customer(invoice.get('customer'))
+    if not user:
+        current_app.logger.warning(f"Webhook: No user for customer {invoice.get('customer')} on invoice {invoice.get('id')}.")
+        return
+    lines = (invoice.get('lines') or {}).get('data') or []
+    period_ends = [line['period']['end'] for line in lines if (line.get('period') or {}).get('end')]
+    if period_ends:
+        paid_until = datetime.utcfromtimestamp(max(period_ends))
+        if not user.subscription_active_until or paid_until > user.subscription_active_until:
+            user.subscription_active_until = paid_until
+    for line in lines:
+        price_id = (line.get('price') or {}).get('id') or ((line.get('pricing') or {}).get('price_details') or {}).get('price')
+        tier_name = get_tier_from_price_id(price_id)
+        if tier_name:
+            user.tier = tier_name
+            break
+    if invoice.get('subscription'): user.stripe_subscription_id = invoice['subscription']
+    db.session.commit()
+    current_app.logger.info(f"Invoice {invoice.get('id')} paid for user ID {user.id}; tier {user.tier}, active until {user.subscription_active_until}.")
+
+def handle_invoice_payment_failed(event):
+    # Stripe keeps retrying the charge (dunning); access is only removed on customer.subscription.deleted.
+    invoice = event['data']['object']
+    user = _find_user_for_customer(invoice.get('customer'))
+    current_app.logger.warning(f"Invoice {invoice.get('id')} payment failed for customer {invoice.get('customer')} "
+                               f"(user ID {user.id if user else 'unknown'}), attempt {invoice.get('attempt_count')}.")
+
+def handle_price_updated(event):
+    # Keeps the in-memory price catalog current in this process; other processes pick it up on their next refresh.
+    price = event['data']['object']
+    if price_catalog.update_from_stripe_object(price):
+        current_app.logger.info(f"Price catalog updated from {event['type']} for {price.get('id')}.")
+
+def handle_customer_subscription_deleted(event):
+    subscription = event['data']['object']
+    user = _find_user_for_customer(subscription.get('customer'))
+    if not user:
+        current_app.logger.warning(f"Webhook: No user for customer {subscription.get('customer')} on subscription {subscription.get('id')}.")
+        return
+    if user.stripe_subscription_id and user.stripe_subscription_id != subscription.get('id'):
+        # An old subscription ended after the user had already moved to a new one.
+        current_app.logger.info(f"Ignoring deletion of superseded subscription {subscription.get('id')} for user ID {user.id}.")
+        return
+    user.tier = 'free'
+    user.stripe_subscription_id = None
+    user.subscription_active_until = None
+    db.session.commit()
+    current_app.logger.info(f"Subscription {subscription.get('id')} ended; user ID {user.id} downgraded to free.")
+
+STRIPE_EVENT_HANDLERS = {
+    'checkout.session.completed': handle_checkout_session_completed,
+    'invoice.payment_succeeded': handle_invoice_payment_succeeded,
+    'invoice.payment_failed': handle_invoice_payment_failed,
+    'customer.subscription.deleted': handle_customer_subscription_deleted,
+    'price.updated': handle_price_updated,
+    'price.deleted': handle_price_updated,
+}
+
+
 @payments_bp.route('/webhook', methods=['POST'])
 def stripe_webhook():
+    # Fast path only: verify, record (idempotently, keyed by event id) and acknowledge.
+    # The DB work happens in app/stripe_events.py, so retries and bursts never hold a request worker.
     payload_str = request.data.decode('utf-8') 
     sig_header = request.headers.get('Stripe-Signature')
     endpoint_secret = current_app.config.get('STRIPE_WEBHOOK_SECRET')
@@ -146,39 +244,18 @@ def stripe_webhook():
         current_app.logger.error(f"Webhook general construction error: {e}")
         return jsonify(error=str(e)), 400
 
-    if event['type'] == 'checkout.session.completed':
-        session = event['data']['object']
-        current_app.logger.info(f"Processing checkout.session.completed for session: {session.id}")
-        user_id_str = session.get('client_reference_id')
-        if not user_id_str and 'metadata' in session and session['metadata']:
-            user_id_str = session['metadata'].get('user_id')
-        if user_id_str:
-            try:
-                user_id = int(user_id_str)
-                user = User.query.get(user_id)
-                if user:
-                    stripe_customer_id = session.get('customer')
-                    stripe_subscription_id = session.get('subscription')
-                    selected_price_id = session.get('metadata', {}).get('selected_price_id')
-                    tier_name = get_tier_from_price_id(selected_price_id) if selected_price_id else 'pro' 
-                    user.tier = tier_name 
-                    if stripe_customer_id: user.stripe_customer_id = stripe_customer_id
-                    if stripe_subscription_id: user.stripe_subscription_id = stripe_subscription_id
-                    db.session.commit()
-                    current_app.logger.info(f"User ID {user.id} ({user.username}) subscription activated/updated to tier: {tier_name}.")
-                else:
-                    current_app.logger.error(f"Webhook: User not found for ID {user_id_str} from session {session.id}.")
-            except ValueError:
-                current_app.logger.error(f"Webhook: Invalid user_id format '{user_id_str}' from session {session.id}.")
-            except Exception as e:
-                current_app.logger.error(f"Webhook: DB error updating user after checkout.session.completed: {e}")
-                db.session.rollback()
-        else:
-            current_app.logger.warning(f"Webhook: client_reference_id or metadata.user_id missing in checkout.session.completed: {session.id}")
-    elif event['type'] == 'invoice.payment_succeeded': # ... (as before)
-        pass 
-    elif event['type'] == 'invoice.payment_failed': # ... (as before)
-        pass
-    elif event['type'] == 'customer.subscription.deleted': # ... (as before)
-        pass
-    return jsonify(received=True), 200
\ No newline at end of file
+    try:
+        db.session.add(StripeEvent(id=event['id'], type=event['type'], payload=payload_str))
+        db.session.commit()
+    except IntegrityError:
+        # Replay/retry of an event we already have: acknowledge so Stripe stops resending it.
+        db.session.rollback()
+        current_app.logger.info(f"Duplicate Stripe event {event['id']} ignored.")
+        return jsonify(received=True, duplicate=True), 200
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Webhook: failed to record event {event['id']}: {e}")
+        return jsonify(error="Failed to record event"), 500 # Stripe will retry
+
+    stripe_event_worker.notify()
+    return jsonify(received=True), 200
@@ -0,0 +1,196 @@
+# app/places_client.py
+# Shared HTTP client for the Google Places web service: one keep-alive connection pool per
+# process, per-endpoint timeouts, jittered retries, a QPS token bucket and a circuit breaker.
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.metrics import metrics
+from app.rate_limit import rate_limiter
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class PlacesCircuitOpenError(requests.exceptions.RequestException):
+    """Raised without calling Google while the breaker for an endpoint is open."""
+
+
+class PlacesRateLimitedError(requests.exceptions.RequestException):
+    """Raised when no QPS token frees up within the allowed wait."""
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self, tokens=1):
+        """Takes `tokens` if available. Returns 0 on success, otherwise the seconds until they would be."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0
+            return (tokens - self.tokens) / self.rate
+
+    def acquire(self, max_wait):
+        """Blocks up to `max_wait` seconds for a token. Returns False if none became available."""
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait_for = self.try_acquire()
+            if wait_for == 0:
+                return True
+            if time.monotonic() + wait_for > deadline:
+                return False
+            time.sleep(wait_for)
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and rejects calls for `reset_timeout`
+    seconds. After that one trial call is let through (half-open); its outcome closes or re-opens it."""
+
+    STATES = ('closed', 'open', 'half-open')
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if time.monotonic() - self.opened_at >= self.reset_timeout else 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def release(self):
+        # The call never reached Google (e.g. we throttled it ourselves); let another trial through.
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class PlacesClient:
+    """Thread-safe Places HTTP client. Endpoints are named 'textsearch', 'details' and 'photo';
+    each gets its own read timeout and circuit breaker, and all share the QPS budget."""
+
+    ENDPOINTS = ('textsearch', 'details', 'photo')
+
+    def __init__(self, app=None):
+        self.session = None
+        self.breakers = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        pool_size = config.get('PLACES_HTTP_POOL_SIZE') or max(10, config.get('PLACES_DETAILS_MAX_WORKERS', 8) * 2)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=False)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        connect_timeout = config.get('PLACES_CONNECT_TIMEOUT', 3.05)
+        self.timeouts = {
+            'textsearch': (connect_timeout, config.get('PLACES_TEXTSEARCH_TIMEOUT', 10)),
+            'details': (connect_timeout, config.get('PLACES_DETAILS_TIMEOUT', 8)),
+            'photo': (connect_timeout, config.get('PLACES_PHOTO_TIMEOUT', 15)),
+        }
+        self.max_retries = config.get('PLACES_MAX_RETRIES', 2)
+        self.backoff_base = config.get('PLACES_RETRY_BACKOFF', 0.2)
+        self.max_rate_wait = config.get('PLACES_RATE_LIMIT_MAX_WAIT', 5)
+        self.bucket = TokenBucket(config.get('PLACES_QPS', 50), config.get('PLACES_QPS_BURST'))
+        self.breakers = {endpoint: CircuitBreaker(config.get('PLACES_CIRCUIT_FAILURES', 5), config.get('PLACES_CIRCUIT_RESET', 30))
+                         for endpoint in self.ENDPOINTS}
+        app.extensions['places_client'] = self
+
+    def _backoff(self, attempt):
+        # "Full jitter": sleep a random amount up to base * 2^attempt.
+        time.sleep(random.uniform(0, self.backoff_base * (2 ** attempt)))
+
+    def get(self, endpoint, url, params=None, stream=False):
+        """GET with retries on connection errors, timeouts and 429/5xx. Returns the final Response
+        (callers still call raise_for_status); raises RequestException subclasses on failure."""
+        breaker = self.breakers[endpoint]
+        if not breaker.allow():
+            raise PlacesCircuitOpenError(f"Google Places {endpoint} circuit is open; failing fast")
+        settled = False # Once the breaker has recorded an outcome; otherwise a half-open trial must be released
+        try:
+            for attempt in range(self.max_retries + 1):
+                wait_started = time.perf_counter()
+                acquired = self.bucket.acquire(self.max_rate_wait)
+                waited = time.perf_counter() - wait_started
+                if waited > 0.001:
+                    metrics.record_wait('places_qps', waited)
+                if not acquired:
+                    raise PlacesRateLimitedError(f"Google Places QPS budget exhausted for {endpoint}")
+                over_budget = rate_limiter.charge_upstream()
+                if over_budget:
+                    raise PlacesRateLimitedError(f"Google Places {endpoint} call refused: {over_budget}")
+                try:
+                    with metrics.time_upstream('places', endpoint) as call:
+                        response = self.session.get(url, params=params, stream=stream, timeout=self.timeouts[endpoint])
+                        call.status = response.status_code
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                    if attempt < self.max_retries:
+                        self._backoff(attempt); continue
+                    breaker.record_failure(); settled = True
+                    raise
+                if response.status_code in RETRYABLE_STATUS_CODES:
+                    if attempt < self.max_retries:
+                        response.close(); self._backoff(attempt); continue
+                    breaker.record_failure(); settled = True
+                    return response
+                breaker.record_success(); settled = True
+                return response
+        finally:
+            if not settled:
+                # Throttled by us, a malformed URL, a broken body... Google's health is unknown, so
+                # neither outcome is recorded, but a half-open trial must not stay claimed forever.
+                breaker.release()
+
+    def get_json(self, endpoint, url, params=None):
+        response = self.get(endpoint, url, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    def stats(self):
+        return {endpoint: breaker.state for endpoint, breaker in self.breakers.items()}
+
+
+places_client = PlacesClient()
@@ -0,0 +1,90 @@
+# app/price_catalog.py
+# In-memory catalog of our Stripe subscription Prices, so checkout can validate a plan
+# without a stripe.Price.retrieve round trip on every request.
+import threading
+import time
+
+import stripe
+
+from app.metrics import metrics
+
+
+class PriceCatalog:
+    """Maps our configured Stripe Price IDs to their plan tier plus the Stripe metadata we check
+    at checkout (active, type, recurring interval, amount).
+
+    Loaded in a background thread at startup, refreshed in the background once older than
+    PRICE_CATALOG_REFRESH_INTERVAL, and patched in place from price.* webhook events.
+    Until Stripe has answered, prices are known by tier only and checkout lets Stripe decide.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.prices = {}
+        self.loaded_at = None
+        self.refresh_interval = 3600
+        self._lock = threading.Lock()
+        self._refreshing = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.refresh_interval = app.config.get('PRICE_CATALOG_REFRESH_INTERVAL', 3600)
+        plans = {
+            app.config.get('STRIPE_PRICE_ID_PRO_MONTHLY'): ('pro', "Pro Monthly Plan"),
+            app.config.get('STRIPE_PRICE_ID_AGENCY_MONTHLY'): ('agency', "Agency Monthly Plan"),
+        }
+        self.prices = {price_id: {'id': price_id, 'tier': tier, 'name': name, 'active': None, 'type': None, 'recurring': None}
+                       for price_id, (tier, name) in plans.items() if price_id}
+        self.loaded_at = None
+        app.extensions['price_catalog'] = self
+        if app.config.get('STRIPE_SECRET_KEY') and not app.config.get('TESTING'):
+            self.refresh_async()
+
+    def get(self, price_id):
+        self.refresh_if_stale()
+        return self.prices.get(price_id)
+
+    def tier_for(self, price_id):
+        entry = self.prices.get(price_id)
+        return entry['tier'] if entry else None
+
+    def refresh_if_stale(self):
+        if self.loaded_at is None or time.monotonic() - self.loaded_at >= self.refresh_interval:
+            self.refresh_async()
+
+    def refresh_async(self):
+        with self._lock:
+            if self._refreshing or not self.prices:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, name='price-catalog', daemon=True).start()
+
+    def _refresh(self):
+        try:
+            for price_id in list(self.prices):
+                with metrics.time_upstream('stripe', 'price.retrieve'):
+                    price = stripe.Price.retrieve(price_id)
+                self.update_from_stripe_object(price)
+            self.loaded_at = time.monotonic()
+        except stripe.error.StripeError as e:
+            self.app.logger.error(f"Price catalog refresh failed: {e}")
+            self.loaded_at = time.monotonic() - self.refresh_interval + 60 # Try again in a minute
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def update_from_stripe_object(self, price):
+        """Applies a Stripe Price (API object or webhook dict). Prices we don't sell are ignored."""
+        entry = self.prices.get(price.get('id'))
+        if entry is None:
+            return False
+        recurring = price.get('recurring')
+        self.prices[entry['id']] = {**entry, 'active': price.get('active'), 'type': price.get('type'),
+                                    'recurring': {'interval': recurring.get('interval')} if recurring else None,
+                                    'unit_amount': price.get('unit_amount'), 'currency': price.get('currency')}
+        return True
+
+
+price_catalog = PriceCatalog()
@@ -0,0 +1,280 @@
+# app/rate_limit.py
+# Tier-aware rate limiting for the search API, plus per-user and global budgets for upstream
+# Google Places calls. Token buckets live in a small SQLite file shared by every worker process.
+import contextvars
+import math
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, jsonify, make_response, request
+from flask_login import current_user
+
+TIERS = ('free', 'pro', 'agency')
+GLOBAL_PLACES_KEY = 'global:places'
+
+# Whose Places budget upstream calls in this context are charged to: (bucket key, tier limits).
+# Set by @rate_limited; copied into helper threads by metrics.bind(), handed to search jobs by enqueue().
+_upstream_owner = contextvars.ContextVar('leaddawg_upstream_owner', default=None)
+
+
+def _clear_upstream_owner():
+    # Request threads are reused; a request that isn't @rate_limited must not bill the previous caller.
+    _upstream_owner.set(None)
+
+
+class SQLiteBucketStore:
+    """Token buckets in one SQLite table. Each take is a single atomic UPSERT ... RETURNING, so
+    concurrent workers never double-spend. The file holds nothing worth keeping across a crash,
+    hence WAL with synchronous=OFF: no fsync on the request path.
+
+    An admit+charge is ~100 us at p50 (benchmarks/bench_rate_limit.py, 1 CPU). With 4-8 threads
+    of one process checking at once, p50 and throughput hold but p99 is 12-16 ms: every statement
+    gives up the GIL and has to win it back from the other threads. Where that tail matters, run
+    more processes with fewer threads; MemoryBucketStore (per process) stays under 50 us p99."""
+
+    SCHEMA = """CREATE TABLE IF NOT EXISTS rate_limit_bucket (
+                    key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL, allowed INTEGER NOT NULL
+                ) WITHOUT ROWID"""
+    REFILLED = "min(:capacity, tokens + max(0, :now - updated_at) * :rate)"
+    TAKE = f"""INSERT INTO rate_limit_bucket (key, tokens, updated_at, allowed) VALUES (:key, :capacity - :cost, :now, 1)
+               ON CONFLICT(key) DO UPDATE SET
+                   tokens = CASE WHEN {REFILLED} >= :cost THEN {REFILLED} - :cost ELSE {REFILLED} END,
+                   allowed = {REFILLED} >= :cost,
+                   updated_at = :now
+               RETURNING tokens, allowed"""
+    PEEK = f"SELECT {REFILLED} FROM rate_limit_bucket WHERE key = :key"
+    GIVE = f"UPDATE rate_limit_bucket SET tokens = min(:capacity, {REFILLED} + :amount), updated_at = :now WHERE key = :key"
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        # Threads of one process queue here rather than in SQLite's busy handler, which sleeps in
+        # millisecond steps; only other processes ever contend for the write lock.
+        self._write_lock = threading.Lock()
+        conn = self._connect()
+        conn.execute(self.SCHEMA)
+        conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        return conn
+
+    @property
+    def conn(self):
+        # One connection per thread, and never one inherited across a gunicorn fork.
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.conn, local.pid = self._connect(), os.getpid()
+        return local.conn
+
+    def take(self, key, cost, rate, capacity):
+        """Takes `cost` tokens if the bucket has them. Returns (allowed, tokens left)."""
+        conn = self.conn
+        with self._write_lock:
+            tokens, allowed = conn.execute(self.TAKE, {'key': key, 'cost': cost, 'rate': rate, 'capacity': capacity,
+                                                       'now': time.time()}).fetchone()
+        return bool(allowed), tokens
+
+    def give(self, key, amount, rate, capacity):
+        """Returns `amount` tokens taken for work that then didn't happen (never above capacity)."""
+        conn = self.conn
+        with self._write_lock:
+            conn.execute(self.GIVE, {'key': key, 'amount': amount, 'rate': rate, 'capacity': capacity, 'now': time.time()})
+
+    def peek(self, key, rate, capacity):
+        row = self.conn.execute(self.PEEK, {'key': key, 'rate': rate, 'capacity': capacity, 'now': time.time()}).fetchone()
+        return capacity if row is None else row[0]
+
+    def clear(self):
+        self.conn.execute("DELETE FROM rate_limit_bucket")
+
+
+class MemoryBucketStore:
+    """Same interface, per process. For single-worker deployments and local runs."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _refilled(self, key, rate, capacity, now):
+        tokens, updated_at = self._buckets.get(key, (capacity, now))
+        return min(capacity, tokens + max(0, now - updated_at) * rate)
+
+    def take(self, key, cost, rate, capacity):
+        with self._lock:
+            now = time.time()
+            tokens = self._refilled(key, rate, capacity, now)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            return allowed, tokens
+
+    def give(self, key, amount, rate, capacity):
+        with self._lock:
+            now = time.time()
+            self._buckets[key] = (min(capacity, self._refilled(key, rate, capacity, now) + amount), now)
+
+    def peek(self, key, rate, capacity):
+        with self._lock:
+            return self._refilled(key, rate, capacity, time.time())
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class TierLimits:
+    """Request bucket (requests_per_minute, refilling continuously, up to `burst`) and hourly Places budget for one plan."""
+
+    def __init__(self, name, requests_per_minute, burst, places_per_hour):
+        self.name = name
+        self.request_rate, self.request_capacity = requests_per_minute / 60.0, float(max(1, burst))
+        self.places_rate, self.places_capacity = places_per_hour / 3600.0, float(max(1, places_per_hour))
+
+
+class RateLimitDecision:
+    def __init__(self, allowed, status=200, message=None, retry_after=None, headers=None):
+        self.allowed, self.status, self.message, self.retry_after = allowed, status, message, retry_after
+        self.headers = headers or {}
+
+
+class RateLimiter:
+    """Admission control for the search API (see @rate_limited) and upstream budget accounting
+    for PlacesClient.
+
+    Each user (anonymous callers: each IP, on free-tier limits) has a request bucket sized by
+    their plan, and an hourly budget of Google Places calls. Every Places call also draws from
+    PLACES_GLOBAL_BUDGET_PER_MINUTE, shared by all users and background jobs, so no single
+    account can burn the whole quota. Cached searches cost no Places budget at all.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self.store = None
+        self.tiers = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        self.app = app
+        self.enabled = config.get('RATE_LIMIT_ENABLED', True)
+        self.tiers = {tier: TierLimits(tier, config.get(f'RATE_LIMIT_{tier.upper()}_PER_MINUTE', 20),
+                                       config.get(f'RATE_LIMIT_{tier.upper()}_BURST', 10),
+                                       config.get(f'RATE_LIMIT_{tier.upper()}_PLACES_PER_HOUR', 300)) for tier in TIERS}
+        global_per_minute = config.get('PLACES_GLOBAL_BUDGET_PER_MINUTE', 0)
+        self.global_rate, self.global_capacity = global_per_minute / 60.0, float(global_per_minute)
+        if self.enabled:
+            if config.get('RATE_LIMIT_STORAGE', 'sqlite') == 'memory':
+                self.store = MemoryBucketStore()
+            else:
+                self.store = SQLiteBucketStore(config.get('RATE_LIMIT_DB_PATH') or os.path.join(app.instance_path, 'rate_limits.sqlite'))
+        app.before_request(_clear_upstream_owner)
+        app.extensions['rate_limiter'] = self
+
+    def _identity(self):
+        if current_user.is_authenticated:
+            tier = current_user.tier if current_user.tier in self.tiers else 'free'
+            return f"user:{current_user.id}", self.tiers[tier]
+        return f"ip:{request.remote_addr}", self.tiers['free']
+
+    def admit(self, cost=1):
+        """Checks the Places budgets have room, then charges `cost` requests to the caller's bucket.
+        Must run in a request context; also makes the caller the owner of this context's upstream calls."""
+        key, limits = self._identity()
+        cost = min(cost, limits.request_capacity) # A batch bigger than the burst still gets through, just slowly
+        places_remaining = self.store.peek(f"{key}:places", limits.places_rate, limits.places_capacity)
+        headers = {'X-RateLimit-Limit': str(int(limits.request_capacity)), 'X-RateLimit-Tier': limits.name,
+                   'X-Places-Quota-Remaining': str(int(max(0, places_remaining)))}
+        # Refused requests don't spend request tokens, so they are checked before the take.
+        if cost > 0 and places_remaining < 1:
+            headers['X-RateLimit-Remaining'] = str(int(self.store.peek(f"{key}:requests", limits.request_rate, limits.request_capacity)))
+            retry_after = (1 - places_remaining) / limits.places_rate if limits.places_rate else 3600
+            return RateLimitDecision(False, 429, f"Hourly Google Places quota used up for the {limits.name} plan", retry_after, headers)
+        if cost > 0 and self.global_capacity and self.store.peek(GLOBAL_PLACES_KEY, self.global_rate, self.global_capacity) < 1:
+            headers['X-RateLimit-Remaining'] = str(int(self.store.peek(f"{key}:requests", limits.request_rate, limits.request_capacity)))
+            return RateLimitDecision(False, 503, "Search capacity is temporarily exhausted", 60.0 / max(1, self.global_capacity), headers)
+        if cost > 0:
+            allowed, remaining = self.store.take(f"{key}:requests", cost, limits.request_rate, limits.request_capacity)
+        else:
+            allowed, remaining = True, self.store.peek(f"{key}:requests", limits.request_rate, limits.request_capacity)
+        headers['X-RateLimit-Remaining'] = str(int(max(0, remaining)))
+        if not allowed:
+            retry_after = (cost - remaining) / limits.request_rate if limits.request_rate else 3600
+            return RateLimitDecision(False, 429, f"Rate limit exceeded for the {limits.name} plan", retry_after, headers)
+        _upstream_owner.set((key, limits))
+        return RateLimitDecision(True, headers=headers)
+
+    def places_remaining(self):
+        """This context's owner's remaining hourly Places calls, or None if nobody owns it."""
+        owner = _upstream_owner.get()
+        if not self.enabled or owner is None:
+            return None
+        key, limits = owner
+        try:
+            return self.store.peek(f"{key}:places", limits.places_rate, limits.places_capacity)
+        except sqlite3.Error:
+            return None # Only feeds a response header; admit() already logged any outage
+
+    def charge_upstream(self, calls=1):
+        """Charges `calls` Places calls to this context's owner, if any, and to the global budget.
+        Returns None if allowed, else a reason string (the caller must not make the call)."""
+        if not self.enabled:
+            return None
+        # Owner first, so a caller who is out of quota is refused without touching the shared budget;
+        # if the global budget then refuses, the owner's tokens go back.
+        owner = _upstream_owner.get()
+        bucket = None
+        try:
+            if owner is not None:
+                key, limits = owner
+                bucket = (f"{key}:places", calls, limits.places_rate, limits.places_capacity)
+                if not self.store.take(*bucket)[0]:
+                    return f"hourly Google Places quota used up for the {limits.name} plan"
+            if self.global_capacity and not self.store.take(GLOBAL_PLACES_KEY, calls, self.global_rate, self.global_capacity)[0]:
+                if bucket is not None:
+                    self.store.give(*bucket)
+                return "global Google Places budget exhausted"
+        except sqlite3.Error as e:
+            # Fail open, as admission does. Runs on helper threads too, hence self.app rather than current_app.
+            self.app.logger.error(f"Rate limiter unavailable, allowing upstream call: {e}")
+        return None
+
+
+rate_limiter = RateLimiter()
+
+
+def rate_limited(cost=1):
+    """Route decorator: admits the request through rate_limiter or answers 429/503 with Retry-After.
+    `cost` is a number of requests, or a callable of no arguments computing it from the request.
+    cost=0 only attributes the route's upstream calls; each is still refused once a Places budget runs out."""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if not rate_limiter.enabled:
+                return view(*args, **kwargs)
+            try:
+                decision = rate_limiter.admit(cost() if callable(cost) else cost)
+            except sqlite3.Error as e:
+                # The limiter must never take search down with it: fail open.
+                current_app.logger.error(f"Rate limiter unavailable, admitting request: {e}")
+                return view(*args, **kwargs)
+            if not decision.allowed:
+                response = make_response(jsonify(message=decision.message), decision.status)
+                response.headers['Retry-After'] = str(max(1, math.ceil(decision.retry_after)))
+            else:
+                response = make_response(view(*args, **kwargs))
+                if not response.is_streamed: # Report the quota after this request's own upstream calls
+                    remaining = rate_limiter.places_remaining()
+                    if remaining is not None: decision.headers['X-Places-Quota-Remaining'] = str(int(max(0, remaining)))
+            response.headers.update(decision.headers)
+            return response
+        return wrapped
+    return decorator
@@ -1,8 +1,19 @@
 # app/routes.py
-from flask import Blueprint, request, jsonify, current_app, Response, send_file # Added Response, send_file
+from flask import Blueprint, request, jsonify, current_app, Response, send_file, stream_with_context
 from app import db
-from app.models import User, SavedLead 
+from app.models import User, SavedLead, SearchJob 
+from app.cache import place_details_cache, text_search_cache
+from app.search_jobs import search_job_runner
+from app.image_cache import image_cache
+from app.places_client import places_client
+from app import lead_search
+from app.password_hashing import PasswordHasherBusy
+from app.metrics import metrics
+from app.enrichment import website_enricher, apply_to_record, enrich_saved_leads
+from app.rate_limit import rate_limited
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import and_, or_, insert
+from sqlalchemy.exc import IntegrityError
 from flask_login import login_user, logout_user, login_required, current_user
 
 # --- Imports for Search Blueprint & Image Proxy ---
@@ -10,10 +21,20 @@ import requests
 import time     
 import os       
 import io # For image proxy stream
+import csv # For bulk lead import
+from urllib.parse import urlparse, parse_qs # For image proxy cache keys
+import json # For streaming search events
+import base64 # For leads pagination cursors
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED # Bounded fan-out for Place Details
 
 # --- Authentication Blueprint ---
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
+def _auth_busy_response():
+    # Password hashing pool is saturated or restarting: shed load fast rather than queue behind it.
+    return jsonify(message="Server is busy, please try again shortly"), 503, {'Retry-After': '1'}
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     data = request.get_json()
@@ -26,7 +47,8 @@ def register():
     if User.query.filter_by(email=email).first(): return jsonify(message="Email already registered"), 409
     if len(password) < 8: return jsonify(message="Password must be at least 8 characters long"), 400
     new_user = User(username=username, email=email)
-    new_user.set_password(password)
+    try: new_user.set_password(password)
+    except PasswordHasherBusy: return _auth_busy_response()
     try:
         db.session.add(new_user)
         db.session.commit()
@@ -45,7 +67,17 @@ def login():
     password = data.get('password')
     if not identifier or not password: return jsonify(message="Username/email and password are required"), 400
     user = User.query.filter((User.username == identifier) | (User.email == identifier)).first()
-    if user and user.check_password(password):
+    try: password_ok = bool(user) and user.check_password(password)
+    except PasswordHasherBusy: return _auth_busy_response()
+    if password_ok:
+        if user.password_needs_rehash():
+            # Hash parameters changed since this hash was made; upgrade it while we have the plaintext.
+            try:
+                user.set_password(password)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.warning(f"Password rehash for user {user.id} skipped: {e}")
         login_user(user, remember=data.get('remember', False))
         return jsonify(message="Login successful", user={'id': current_user.id, 'username': current_user.username, 'email': current_user.email, 'tier': current_user.tier }), 200
     else:
@@ -80,33 +112,348 @@ def save_new_lead():
         place_id_google=google_place_id, name_at_save=name,
         address_at_save=data.get('address'), phone_at_save=data.get('phone'),
         website_at_save=data.get('website'), user_id=current_user.id,
-        user_status=data.get('status', 'New')
+        user_status=data.get('status', 'New'),
+        # Carried over from an enriched search result (?enrich=1), if the card had them
+        email=data.get('email'), social_links=json.dumps(data['social_links']) if isinstance(data.get('social_links'), dict) and data['social_links'] else None
     )
     try:
         db.session.add(new_lead)
         db.session.commit()
         return jsonify(message="Lead saved successfully", lead=new_lead.to_dict()), 201
+    except IntegrityError:
+        # Lost a race with a concurrent save of the same place (uq_saved_lead_user_place)
+        db.session.rollback()
+        existing_saved_lead = SavedLead.query.filter_by(user_id=current_user.id, place_id_google=google_place_id).first()
+        return jsonify(message="Lead already saved by this user", lead=existing_saved_lead.to_dict() if existing_saved_lead else None), 409
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Error saving lead: {e}")
         return jsonify(message="Failed to save lead due to an internal error"), 500
     
+VALID_STATUSES = ["New", "Contacted", "Followed Up", "Interested", "Booked", "Not Interested", "Pending"]
+
+class LeadQueryError(ValueError):
+    # Bad filter/paging/projection input on a leads endpoint; the message is safe to return as a 400.
+    pass
+
+def _encode_leads_cursor(saved_at, lead_id):
+    raw = json.dumps([saved_at.isoformat() if saved_at else None, lead_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def _decode_leads_cursor(cursor):
+    try:
+        saved_at, lead_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return (datetime.fromisoformat(saved_at) if saved_at else None), int(lead_id)
+    except (ValueError, TypeError):
+        raise LeadQueryError("Invalid 'cursor' parameter")
+
+def _parse_lead_status_filter(args):
+    # ?status=New,Contacted -> ["New", "Contacted"]; validated against VALID_STATUSES
+    raw = args.get('status') or args.get('user_status')
+    if not raw: return None
+    statuses = [status.strip() for status in raw.split(',') if status.strip()]
+    invalid = [status for status in statuses if status not in VALID_STATUSES]
+    if invalid: raise LeadQueryError(f"Invalid status. Must be one of: {', '.join(VALID_STATUSES)}")
+    return statuses
+
+def _parse_lead_fields(args):
+    raw = args.get('fields')
+    if not raw: return list(SavedLead.SERIALIZABLE_FIELDS)
+    fields = list(dict.fromkeys(field.strip() for field in raw.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in SavedLead.SERIALIZABLE_FIELDS]
+    if unknown or not fields: raise LeadQueryError(f"Invalid fields. Choose from: {', '.join(SavedLead.SERIALIZABLE_FIELDS)}")
+    return fields
+
+def _saved_leads_query(user_id, args, fields):
+    # Ownership-scoped, filtered SELECT of just the requested columns (plus saved_at/id for ordering),
+    # newest first. Rows come back as lightweight tuples, not SavedLead instances.
+    columns = [getattr(SavedLead, field) for field in dict.fromkeys(list(fields) + ['saved_at', 'id'])]
+    query = db.session.query(*columns).filter(SavedLead.user_id == user_id)
+    statuses = _parse_lead_status_filter(args)
+    if statuses: query = query.filter(SavedLead.user_status.in_(statuses))
+    return query.order_by(SavedLead.saved_at.desc(), SavedLead.id.desc())
+
 @leads_bp.route('', methods=['GET'])
 @login_required
 def get_saved_leads():
-    user_leads = SavedLead.query.filter_by(user_id=current_user.id).order_by(SavedLead.saved_at.desc()).all()
-    leads_list = [lead.to_dict() for lead in user_leads]
-    return jsonify(leads=leads_list), 200
+    # Keyset-paginated once a client asks for it with ?limit= or ?cursor=: pass the returned next_cursor
+    # back as ?cursor= until it comes back null. Without either, every lead comes back, as it always has.
+    try:
+        fields = _parse_lead_fields(request.args)
+        query = _saved_leads_query(current_user.id, request.args, fields)
+        if 'limit' not in request.args and 'cursor' not in request.args:
+            return jsonify(leads=[SavedLead.row_to_dict(row, fields) for row in query.all()], next_cursor=None), 200
+        limit = request.args.get('limit', current_app.config.get('LEADS_PAGE_DEFAULT_LIMIT', 100), type=int)
+        limit = max(1, min(limit, current_app.config.get('LEADS_PAGE_MAX_LIMIT', 1000)))
+        cursor = request.args.get('cursor')
+        if cursor:
+            cursor_saved_at, cursor_id = _decode_leads_cursor(cursor)
+            query = query.filter(or_(SavedLead.saved_at < cursor_saved_at,
+                                     and_(SavedLead.saved_at == cursor_saved_at, SavedLead.id < cursor_id)))
+    except LeadQueryError as e:
+        return jsonify(message=str(e)), 400
+    rows = query.limit(limit + 1).all()
+    next_cursor = _encode_leads_cursor(rows[limit - 1].saved_at, rows[limit - 1].id) if len(rows) > limit else None
+    leads_list = [SavedLead.row_to_dict(row, fields) for row in rows[:limit]]
+    return jsonify(leads=leads_list, next_cursor=next_cursor), 200
+
+@leads_bp.route('/export', methods=['GET'])
+@login_required
+def export_saved_leads():
+    # Streams every matching lead as CSV (default) or NDJSON. Takes the same status/fields filters as
+    # GET /api/leads; rows are pulled through a server-side cursor in chunks, so memory stays flat.
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in ('csv', 'ndjson'): return jsonify(message="Invalid format. Must be one of: csv, ndjson"), 400
+    try:
+        fields = _parse_lead_fields(request.args)
+        query = _saved_leads_query(current_user.id, request.args, fields)
+    except LeadQueryError as e:
+        return jsonify(message=str(e)), 400
+    chunk_size = current_app.config.get('LEADS_EXPORT_CHUNK_SIZE', 1000)
+
+    def generate():
+        rows = query.execution_options(yield_per=chunk_size) # stream_results + fetchmany(chunk_size)
+        if export_format == 'ndjson':
+            for row in rows: yield json.dumps(SavedLead.row_to_dict(row, fields)) + "\n"
+            return
+        buffer = io.StringIO(); writer = csv.writer(buffer)
+        writer.writerow(fields)
+        for row in rows:
+            record = SavedLead.row_to_dict(row, fields)
+            writer.writerow([json.dumps(record[field]) if isinstance(record[field], dict) else record[field] for field in fields])
+            if buffer.tell() >= 64 * 1024: yield buffer.getvalue(); buffer.seek(0); buffer.truncate()
+        yield buffer.getvalue()
+
+    mimetype = 'application/x-ndjson' if export_format == 'ndjson' else 'text/csv'
+    filename = f"leads-{datetime.utcnow():%Y%m%d-%H%M%S}.{'ndjson' if export_format == 'ndjson' else 'csv'}"
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"', 'X-Accel-Buffering': 'no'})
+
+@leads_bp.route('/search', methods=['GET'])
+@login_required
+def search_saved_leads():
+    # Ranked full-text search over name, address and notes; paginate with ?offset= / ?limit=.
+    query = (request.args.get('q') or '').strip()
+    if not query: return jsonify(message="Missing 'q' parameter"), 400
+    limit = max(1, min(request.args.get('limit', 20, type=int), current_app.config.get('LEADS_PAGE_MAX_LIMIT', 1000)))
+    offset = max(0, request.args.get('offset', 0, type=int))
+    try:
+        leads, has_more = lead_search.search_leads(current_user.id, query, limit=limit, offset=offset)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error searching leads: {e}", exc_info=True)
+        return jsonify(message="Lead search failed due to an internal error"), 500
+    return jsonify(leads=[lead.to_dict() for lead in leads], next_offset=offset + limit if has_more else None), 200
+
+# Accepted column names for bulk rows: the POST /api/leads keys, or the SavedLead.to_dict() keys
+BULK_LEAD_COLUMNS = {
+    'google_place_id': 'place_id_google', 'place_id_google': 'place_id_google',
+    'name': 'name_at_save', 'name_at_save': 'name_at_save',
+    'address': 'address_at_save', 'address_at_save': 'address_at_save',
+    'phone': 'phone_at_save', 'phone_at_save': 'phone_at_save',
+    'website': 'website_at_save', 'website_at_save': 'website_at_save',
+    'status': 'user_status', 'user_status': 'user_status',
+    'notes': 'user_notes', 'user_notes': 'user_notes',
+}
+
+def _read_bulk_lead_rows():
+    # JSON array (or {"leads": [...]}), a multipart CSV upload in "file", or a raw text/csv body.
+    upload = request.files.get('file')
+    if upload is not None or request.mimetype == 'text/csv':
+        text = upload.read().decode('utf-8-sig') if upload is not None else request.get_data(as_text=True)
+        return list(csv.DictReader(io.StringIO(text)))
+    data = request.get_json(silent=True)
+    if isinstance(data, dict): data = data.get('leads')
+    return data if isinstance(data, list) else None
+
+def _normalize_bulk_lead_row(raw):
+    # Returns (values, None) for a usable row or (None, error message)
+    if not isinstance(raw, dict): return None, "Row must be an object"
+    values = dict.fromkeys(set(BULK_LEAD_COLUMNS.values())) # Same keys on every row for executemany
+    for key, value in raw.items():
+        column = BULK_LEAD_COLUMNS.get(key.strip() if isinstance(key, str) else '')
+        if column is None: continue
+        if value is not None and not isinstance(value, str): return None, f"'{key}' must be a string"
+        value = value.strip() if value is not None else None
+        max_length = SavedLead.__table__.c[column].type.length
+        if value and max_length and len(value) > max_length: return None, f"'{key}' is too long (max {max_length} characters)"
+        values[column] = value or None
+    if not values.get('place_id_google') or not values.get('name_at_save'): return None, "Google Place ID and Name are required"
+    values['user_status'] = values.get('user_status') or 'New'
+    if values['user_status'] not in VALID_STATUSES: return None, f"Invalid status. Must be one of: {', '.join(VALID_STATUSES)}"
+    return values, None
+
+def _existing_place_ids(user_id, place_ids, chunk_size=500):
+    # One set-based query per chunk (keeps us under SQLite's bound-parameter limit)
+    existing = set()
+    for start in range(0, len(place_ids), chunk_size):
+        chunk = place_ids[start:start + chunk_size]
+        existing.update(place_id for (place_id,) in db.session.query(SavedLead.place_id_google).filter(
+            SavedLead.user_id == user_id, SavedLead.place_id_google.in_(chunk)))
+    return existing
+
+def _insert_leads_ignoring_duplicates(rows):
+    # Bulk INSERT ... ON CONFLICT DO NOTHING RETURNING, so rows a concurrent save got to first are skipped
+    # instead of failing the batch. Returns {place_id_google: new id} for the rows actually inserted.
+    if not rows: return {}
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql': from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite': from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else: dialect_insert = None
+    if dialect_insert is not None:
+        stmt = dialect_insert(SavedLead).on_conflict_do_nothing(index_elements=['user_id', 'place_id_google'])
+        result = db.session.execute(stmt.returning(SavedLead.id, SavedLead.place_id_google, sort_by_parameter_order=True), rows)
+        return {place_id: lead_id for lead_id, place_id in result}
+    db.session.execute(insert(SavedLead), rows)
+    user_id = rows[0]['user_id']
+    inserted_ids = {}
+    for start in range(0, len(rows), 500):
+        chunk = [row['place_id_google'] for row in rows[start:start + 500]]
+        inserted_ids.update({place_id: lead_id for lead_id, place_id in db.session.query(SavedLead.id, SavedLead.place_id_google).filter(
+            SavedLead.user_id == user_id, SavedLead.place_id_google.in_(chunk))})
+    return inserted_ids
+
+@leads_bp.route('/bulk', methods=['POST'])
+@login_required
+def bulk_save_leads():
+    raw_rows = _read_bulk_lead_rows()
+    if raw_rows is None: return jsonify(message="Expected a JSON array of leads or a CSV upload"), 400
+    if not raw_rows: return jsonify(message="No input data provided"), 400
+    max_rows = current_app.config.get('LEADS_BULK_MAX_ROWS', 5000)
+    if len(raw_rows) > max_rows: return jsonify(message=f"Too many leads in one request (max {max_rows})"), 413
+
+    outcomes = [None] * len(raw_rows)
+    candidates = {} # place_id_google -> (row index, values); first occurrence wins
+    for index, raw in enumerate(raw_rows):
+        values, error = _normalize_bulk_lead_row(raw)
+        if error: outcomes[index] = {"row": index, "status": "invalid", "message": error}; continue
+        if values['place_id_google'] in candidates:
+            outcomes[index] = {"row": index, "status": "duplicate", "google_place_id": values['place_id_google'], "message": "Duplicate of an earlier row"}; continue
+        values['user_id'] = current_user.id
+        candidates[values['place_id_google']] = (index, values)
+
+    try:
+        existing = _existing_place_ids(current_user.id, list(candidates))
+        to_insert = [values for place_id, (_, values) in candidates.items() if place_id not in existing]
+        inserted_ids = _insert_leads_ignoring_duplicates(to_insert)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error bulk saving leads: {e}", exc_info=True)
+        return jsonify(message="Failed to save leads due to an internal error"), 500
+
+    for place_id, (index, _) in candidates.items():
+        if place_id in inserted_ids: outcomes[index] = {"row": index, "status": "created", "google_place_id": place_id, "id": inserted_ids[place_id]}
+        else: outcomes[index] = {"row": index, "status": "duplicate", "google_place_id": place_id, "message": "Lead already saved by this user"}
+    summary = {status: sum(1 for outcome in outcomes if outcome["status"] == status) for status in ("created", "duplicate", "invalid")}
+    return jsonify(message="Bulk save complete", summary=summary, results=outcomes), 201 if summary["created"] else 200
+
+def _bulk_lead_selector(data):
+    # Builds the ownership-scoped WHERE clause for bulk update/delete from {"ids": [...]} and/or
+    # {"filter": {"status": "New" | [...]}}. One of them is required so nothing is ever applied to "all leads" by accident.
+    ids = data.get('ids')
+    lead_filter = data.get('filter') or {}
+    if ids is None and not lead_filter: raise LeadQueryError("Provide 'ids' or a 'filter'")
+    conditions = [SavedLead.user_id == current_user.id]
+    if ids is not None:
+        # bool is an int subclass: {"ids": [true]} would otherwise mean lead 1
+        if not isinstance(ids, list) or not all(isinstance(lead_id, int) and not isinstance(lead_id, bool) for lead_id in ids): raise LeadQueryError("'ids' must be a list of integers")
+        max_rows = current_app.config.get('LEADS_BULK_MAX_ROWS', 5000)
+        if len(ids) > max_rows: raise LeadQueryError(f"Too many ids in one request (max {max_rows})")
+        conditions.append(SavedLead.id.in_(ids))
+    if lead_filter:
+        if not isinstance(lead_filter, dict) or set(lead_filter) - {'status'}: raise LeadQueryError("'filter' supports only 'status'")
+        statuses = lead_filter['status'] if isinstance(lead_filter['status'], list) else [lead_filter['status']]
+        if not statuses or any(status not in VALID_STATUSES for status in statuses):
+            raise LeadQueryError(f"Invalid status. Must be one of: {', '.join(VALID_STATUSES)}")
+        conditions.append(SavedLead.user_status.in_(statuses))
+    return conditions, (len(set(ids)) if ids is not None else None)
+
+@leads_bp.route('/bulk', methods=['PATCH'])
+@login_required
+def bulk_update_leads():
+    # One UPDATE ... WHERE user_id = :me AND <selector>; leads owned by someone else are simply not matched.
+    data = request.get_json(silent=True)
+    if not data: return jsonify(message="No update data provided"), 400
+    changes = {}
+    if 'user_status' in data:
+        if data['user_status'] not in VALID_STATUSES:
+            return jsonify(message=f"Invalid status. Must be one of: {', '.join(VALID_STATUSES)}"), 400
+        changes[SavedLead.user_status] = data['user_status']
+    if 'user_notes' in data: changes[SavedLead.user_notes] = data['user_notes']
+    if not changes: return jsonify(message="Nothing to update: provide 'user_status' and/or 'user_notes'"), 400
+    try:
+        conditions, requested = _bulk_lead_selector(data)
+    except LeadQueryError as e:
+        return jsonify(message=str(e)), 400
+    changes[SavedLead.updated_at] = datetime.utcnow()
+    try:
+        updated = db.session.query(SavedLead).filter(*conditions).update(changes, synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error bulk updating leads: {e}", exc_info=True)
+        return jsonify(message="Failed to update leads due to an internal error"), 500
+    response = {"message": "Leads updated successfully", "updated": updated}
+    if requested is not None: response["not_found"] = requested - updated
+    return jsonify(response), 200
+
+@leads_bp.route('/bulk', methods=['DELETE'])
+@login_required
+def bulk_delete_leads():
+    data = request.get_json(silent=True)
+    if not data: return jsonify(message="No input data provided"), 400
+    try:
+        conditions, requested = _bulk_lead_selector(data)
+    except LeadQueryError as e:
+        return jsonify(message=str(e)), 400
+    try:
+        deleted = db.session.query(SavedLead).filter(*conditions).delete(synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error bulk deleting leads: {e}", exc_info=True)
+        return jsonify(message="Failed to delete leads due to an internal error"), 500
+    response = {"message": "Leads deleted successfully", "deleted": deleted}
+    if requested is not None: response["not_found"] = requested - deleted
+    return jsonify(response), 200
+
+@leads_bp.route('/enrich', methods=['POST'])
+@login_required
+def enrich_leads():
+    # Crawls the websites of the selected leads ({"ids": [...]} and/or {"filter": {"status": ...}}, as for the
+    # bulk routes) for contact emails and social links. At most LEADS_ENRICH_MAX_ROWS per call; "remaining"
+    # says how many matching leads are still due. Pass "force": true to re-crawl recently enriched leads.
+    data = request.get_json(silent=True) or {}
+    try:
+        conditions, _ = _bulk_lead_selector(data)
+    except LeadQueryError as e:
+        return jsonify(message=str(e)), 400
+    max_rows = current_app.config.get('LEADS_ENRICH_MAX_ROWS', 50)
+    force = bool(data.get('force'))
+    started_at = datetime.utcnow()
+    due_before = started_at if force else started_at - timedelta(seconds=website_enricher.cache.ttl)
+    try:
+        enriched = enrich_saved_leads(conditions, batch_size=max_rows, limit=max_rows, force=force)
+        leads = SavedLead.query.filter(*conditions, SavedLead.enriched_at >= started_at).order_by(SavedLead.id).all()
+        # Transient crawl failures stay due, so this counts them too
+        remaining = SavedLead.query.filter(
+            *conditions, SavedLead.website_at_save.isnot(None), SavedLead.website_at_save != '',
+            or_(SavedLead.enriched_at.is_(None), SavedLead.enriched_at < due_before)).count()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error enriching leads: {e}", exc_info=True)
+        return jsonify(message="Failed to enrich leads due to an internal error"), 500
+    return jsonify(message="Leads enriched", enriched=enriched, remaining=remaining, leads=[lead.to_dict() for lead in leads]), 200
 
 @leads_bp.route('/<int:lead_id>', methods=['PUT'])
 @login_required
 def update_saved_lead(lead_id):
     lead_to_update = SavedLead.query.get_or_404(lead_id)
-    if lead_to_update.owner != current_user: return jsonify(message="Unauthorized to update this lead"), 403
+    if lead_to_update.user_id != current_user.id: return jsonify(message="Unauthorized to update this lead"), 403
     data = request.get_json()
     if not data: return jsonify(message="No update data provided"), 400
     if 'user_status' in data:
-        VALID_STATUSES = ["New", "Contacted", "Followed Up", "Interested", "Booked", "Not Interested", "Pending"] 
         if data['user_status'] not in VALID_STATUSES:
             return jsonify(message=f"Invalid status. Must be one of: {', '.join(VALID_STATUSES)}"), 400
         lead_to_update.user_status = data['user_status']
@@ -123,7 +470,7 @@ def update_saved_lead(lead_id):
 @login_required
 def delete_saved_lead(lead_id):
     lead_to_delete = SavedLead.query.get_or_404(lead_id)
-    if lead_to_delete.owner != current_user: return jsonify(message="Unauthorized to delete this lead"), 403
+    if lead_to_delete.user_id != current_user.id: return jsonify(message="Unauthorized to delete this lead"), 403
     try:
         db.session.delete(lead_to_delete)
         db.session.commit()
@@ -140,57 +487,345 @@ search_bp = Blueprint('search', __name__, url_prefix='/api/search')
 GOOGLE_PLACES_API_KEY_FOR_PRO = os.getenv("GOOGLE_PLACES_API_KEY_PRO") 
 PLACES_API_URL = "https://maps.googleapis.com/maps/api/place/textsearch/json"
 PLACE_DETAILS_API_URL = "https://maps.googleapis.com/maps/api/place/details/json"
+PLACE_PHOTO_API_URL = "https://maps.googleapis.com/maps/api/place/photo"
+PAGE_TOKEN_DELAY = 2 # Seconds; Google rejects a next_page_token used before it becomes valid
+
+PLACE_DETAILS_FIELDS = "name,formatted_address,website,formatted_phone_number,types,rating,user_ratings_total,business_status,opening_hours,url,place_id,photos"
+
+def _build_place_record(basic_place_info, details_result):
+    # Turns a text-search hit plus its Place Details response into the lead card the frontend expects.
+    # Falls back to the basic text-search data whenever the details lookup did not come back OK.
+    place_id = basic_place_info.get("place_id")
+    if details_result.get("status") == "OK" and "result" in details_result:
+        place_data = details_result["result"]
+        photo_url = _photo_url(place_data.get("photos"))
+        return {"google_place_id": place_id, "name": place_data.get("name"), "address": place_data.get("formatted_address"), "website": place_data.get("website"), "phone_number": place_data.get("formatted_phone_number"), "photo_url": photo_url, "email": None, "types": place_data.get("types", []), "rating": place_data.get("rating"), "user_ratings_total": place_data.get("user_ratings_total"), "business_status": place_data.get("business_status"), "opening_hours": place_data.get("opening_hours", {}).get("weekday_text"), "google_maps_url": place_data.get("url")}
+    return {"google_place_id": place_id, "name": basic_place_info.get("name", "Unknown"), "address": basic_place_info.get("formatted_address"), "website": None, "phone_number": None, "email": None, "photo_url": None, "types": basic_place_info.get("types", []), "rating": basic_place_info.get("rating"), "user_ratings_total": basic_place_info.get("user_ratings_total"), "business_status": basic_place_info.get("business_status"), "opening_hours": None, "google_maps_url": None, "error_details_fetch": details_result.get('status')}
+
+def _photo_url(photos):
+    photo_ref = photos[0].get("photo_reference") if photos else None
+    return f"{PLACE_PHOTO_API_URL}?maxwidth=800&photoreference={photo_ref}&key={GOOGLE_PLACES_API_KEY_FOR_PRO}" if photo_ref else None
+
+def _build_summary_record(basic_place_info):
+    # Lead card from text-search data alone (?mode=summary). The frontend fetches the rest from
+    # GET /places/details/<place_id> when the card is opened; "details_loaded" tells it whether it needs to.
+    return {"google_place_id": basic_place_info.get("place_id"), "name": basic_place_info.get("name", "Unknown"), "address": basic_place_info.get("formatted_address"), "website": None, "phone_number": None, "email": None, "photo_url": _photo_url(basic_place_info.get("photos")), "types": basic_place_info.get("types", []), "rating": basic_place_info.get("rating"), "user_ratings_total": basic_place_info.get("user_ratings_total"), "business_status": basic_place_info.get("business_status"), "opening_hours": None, "google_maps_url": None, "details_loaded": False}
+
+def _request_place_details(place_id):
+    # Runs on a worker thread: no request/app context here, only plain HTTP.
+    details_params = {"place_id": place_id, "fields": PLACE_DETAILS_FIELDS, "key": GOOGLE_PLACES_API_KEY_FOR_PRO}
+    try:
+        return places_client.get_json('details', PLACE_DETAILS_API_URL, params=details_params)
+    except (requests.exceptions.RequestException, ValueError):
+        # One bad details call should not sink the whole search; the caller falls back to the basic record.
+        return {"status": "REQUEST_FAILED"}
+
+def _fetch_details_concurrently(raw_places):
+    # Serves what it can from the Place Details cache, then fans the remaining lookups out over a
+    # bounded thread pool. Output order always matches the text-search order.
+    place_ids = [p.get("place_id") for p in raw_places if p.get("place_id")]
+    details_by_place_id = {place_id: {"status": "OK", "result": result}
+                           for place_id, result in place_details_cache.get_many(place_ids, PLACE_DETAILS_FIELDS).items()}
+    to_fetch = list(dict.fromkeys(place_id for place_id in place_ids if place_id not in details_by_place_id))
+    if to_fetch:
+        max_workers = max(1, min(current_app.config.get('PLACES_DETAILS_MAX_WORKERS', 8), len(to_fetch)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            fetched = dict(zip(to_fetch, executor.map(metrics.bind(_request_place_details), to_fetch)))
+        details_by_place_id.update(fetched)
+        place_details_cache.set_many({place_id: details["result"] for place_id, details in fetched.items()
+                                      if details.get("status") == "OK" and "result" in details}, PLACE_DETAILS_FIELDS)
+    detailed_places_list = []
+    for basic_place_info in raw_places:
+        place_id = basic_place_info.get("place_id")
+        if not place_id: detailed_places_list.append({"name": basic_place_info.get("name", "Unknown"), "error_message": "Missing Place ID"}); continue
+        detailed_places_list.append(_build_place_record(basic_place_info, details_by_place_id[place_id]))
+    return detailed_places_list
+
+def _summarize_places(raw_places):
+    # Summary cards for a text-search result, upgraded to full records for places whose details are
+    # already cached (free: no upstream call). Nothing here ever calls Place Details.
+    place_ids = [p.get("place_id") for p in raw_places if p.get("place_id")]
+    cached_details = place_details_cache.get_many(place_ids, PLACE_DETAILS_FIELDS)
+    places = []
+    for basic_place_info in raw_places:
+        place_id = basic_place_info.get("place_id")
+        if not place_id: places.append({"name": basic_place_info.get("name", "Unknown"), "error_message": "Missing Place ID"}); continue
+        if place_id in cached_details: places.append({**_build_place_record(basic_place_info, {"status": "OK", "result": cached_details[place_id]}), "details_loaded": True})
+        else: places.append(_build_summary_record(basic_place_info))
+    return places
+
+def _enrich_place_records(records):
+    # ?enrich=1: crawls every distinct website concurrently and fills email/social_links in place.
+    results = website_enricher.enrich_many(record.get("website") for record in records)
+    for record in records:
+        if record.get("website"): apply_to_record(record, results[record["website"]])
+    return records
+
+class PlacesAPIError(Exception):
+    # Google answered, but with an error status and nothing usable.
+    pass
+
+def _iter_text_search_pages(query):
+    # Walks up to 3 pages of Text Search, yielding each page's raw results as soon as it arrives.
+    # Yields nothing for ZERO_RESULTS; raises PlacesAPIError if Google errors before any results.
+    max_pages = 3; current_page_count = 0; next_page_token = None; got_results = False
+    while current_page_count < max_pages:
+        current_page_count += 1; api_params = { "query": query, "key": GOOGLE_PLACES_API_KEY_FOR_PRO }
+        if next_page_token: api_params["pagetoken"] = next_page_token; time.sleep(PAGE_TOKEN_DELAY); metrics.record_wait('page_token', PAGE_TOKEN_DELAY)
+        results_json = places_client.get_json('textsearch', PLACES_API_URL, params=api_params)
+        if results_json.get("status") == "OK":
+            page_results = results_json.get("results", []); next_page_token = results_json.get("next_page_token")
+            if page_results: got_results = True; yield page_results
+            if not next_page_token: break
+        elif results_json.get("status") == "ZERO_RESULTS" and current_page_count == 1: return
+        else:
+            error_msg = results_json.get('error_message', 'Unknown Google API error')
+            if not got_results: raise PlacesAPIError(error_msg)
+            break
+
+def _fetch_text_search_results(query):
+    # All pages of Text Search flattened into one list (empty list for ZERO_RESULTS).
+    return [place for page in _iter_text_search_pages(query) for place in page]
+
+def _stream_format():
+    # Streaming is opt-in: ?stream=ndjson|sse, or an Accept header asking for either format.
+    requested = request.args.get('stream', '').lower()
+    if requested in ('ndjson', 'sse'): return requested
+    best = request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson', 'text/event-stream'])
+    return {'application/x-ndjson': 'ndjson', 'text/event-stream': 'sse'}.get(best)
+
+def _stream_search_events(query, enrich=False):
+    # Yields a ("page", {...}) event per text-search page and ("place", {...}) events in completion order
+    # while the next page (and its page-token delay) is fetched on a side thread, then ("done", {...}).
+    # Each place event carries "index", its position in the non-streaming response. With enrich=True, places
+    # with a website are also crawled (app/enrichment.py) and an ("enrichment", {"index", "email", ...}) event follows.
+    enriching = {}
+    def place_event(index, record):
+        if enrich and record.get("website"): enriching[website_enricher.submit(record["website"])] = index
+        return ("place", {"index": index, "place": record})
+
+    cached_results = text_search_cache.peek(query)
+    if cached_results is not None: pages = iter([cached_results] if cached_results else [])
+    else: pages = _iter_text_search_pages(query)
+    all_raw_places = []; fetched_details = {}; next_index = 0
+    max_workers = max(1, current_app.config.get('PLACES_DETAILS_MAX_WORKERS', 8))
+    try:
+        with ThreadPoolExecutor(max_workers=1) as page_pool, ThreadPoolExecutor(max_workers=max_workers) as details_pool:
+            page_future = page_pool.submit(metrics.bind(next), pages, None); pending = {}
+            while page_future is not None or pending or enriching:
+                waiting_on = list(pending) + list(enriching) + ([page_future] if page_future is not None else [])
+                done, _ = wait(waiting_on, return_when=FIRST_COMPLETED)
+                if page_future in done:
+                    page = page_future.result(); page_future = None
+                    if page is not None:
+                        all_raw_places.extend(page)
+                        yield ("page", {"places_found": len(all_raw_places)})
+                        place_ids = [p.get("place_id") for p in page if p.get("place_id")]
+                        cached_details = place_details_cache.get_many(place_ids, PLACE_DETAILS_FIELDS)
+                        for basic_place_info in page:
+                            index = next_index; next_index += 1
+                            place_id = basic_place_info.get("place_id")
+                            if not place_id: yield place_event(index, {"name": basic_place_info.get("name", "Unknown"), "error_message": "Missing Place ID"})
+                            elif place_id in cached_details: yield place_event(index, _build_place_record(basic_place_info, {"status": "OK", "result": cached_details[place_id]}))
+                            else: pending[details_pool.submit(metrics.bind(_request_place_details), place_id)] = (index, basic_place_info)
+                        page_future = page_pool.submit(metrics.bind(next), pages, None)
+                for future in done:
+                    if future in enriching: yield ("enrichment", apply_to_record({"index": enriching.pop(future)}, future.result())); continue
+                    if future not in pending: continue
+                    index, basic_place_info = pending.pop(future)
+                    details_result = future.result(); fetched_details[basic_place_info["place_id"]] = details_result
+                    yield place_event(index, _build_place_record(basic_place_info, details_result))
+    except PlacesAPIError as e:
+        yield ("error", {"message": f"Google API error: {e}"}); return
+    except requests.exceptions.RequestException as e:
+        yield ("error", {"message": f"Error calling Google Places API: {str(e)}"}); return
+    if cached_results is None: text_search_cache.store(query, all_raw_places)
+    place_details_cache.set_many({place_id: details["result"] for place_id, details in fetched_details.items()
+                                  if details.get("status") == "OK" and "result" in details}, PLACE_DETAILS_FIELDS)
+    yield ("done", {"status": "OK" if next_index else "ZERO_RESULTS", "count": next_index})
+
+def _streaming_search_response(query, stream_format, enrich=False):
+    def generate():
+        try:
+            for event_type, payload in _stream_search_events(query, enrich=enrich):
+                if stream_format == 'sse': yield f"event: {event_type}\ndata: {json.dumps(payload)}\n\n"
+                else: yield json.dumps({"type": event_type, **payload}) + "\n"
+        except Exception as e:
+            current_app.logger.error(f"Unexpected error in streaming search: {e}", exc_info=True)
+            if stream_format == 'sse': yield f"event: error\ndata: {json.dumps({'message': f'Server error: {str(e)}'})}\n\n"
+            else: yield json.dumps({"type": "error", "message": f"Server error: {str(e)}"}) + "\n"
+    mimetype = 'text/event-stream' if stream_format == 'sse' else 'application/x-ndjson'
+    # X-Accel-Buffering stops nginx from holding the stream back until it completes.
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @search_bp.route('/places', methods=['GET'])
+@rate_limited()
 def search_places_route():
-    # ... (Your existing search_places_route logic for fetching from Google, 
-    #      including photo_url generation, is already here and correct from your provided block) ...
-    # ... (No changes needed inside this function from your provided block) ...
     query = request.args.get('query')
     if not query: return jsonify(message="Missing 'query' parameter"), 400
     if not GOOGLE_PLACES_API_KEY_FOR_PRO:
         current_app.logger.error("GOOGLE_PLACES_API_KEY_PRO not configured.")
         return jsonify(message="API key for places search not configured"), 500
-    all_raw_places_from_textsearch = []
-    max_pages = 3; current_page_count = 0; next_page_token = None
-    try:
-        while current_page_count < max_pages:
-            current_page_count += 1; api_params = { "query": query, "key": GOOGLE_PLACES_API_KEY_FOR_PRO }
-            if next_page_token: api_params["pagetoken"] = next_page_token; time.sleep(2)
-            response = requests.get(PLACES_API_URL, params=api_params); response.raise_for_status()
-            results_json = response.json()
-            if results_json.get("status") == "OK":
-                all_raw_places_from_textsearch.extend(results_json.get("results", [])); next_page_token = results_json.get("next_page_token")
-                if not next_page_token: break
-            elif results_json.get("status") == "ZERO_RESULTS" and current_page_count == 1: return jsonify(status="ZERO_RESULTS", places=[]), 200
-            elif results_json.get("status") != "OK":
-                error_msg = results_json.get('error_message', 'Unknown Google API error')
-                if not all_raw_places_from_textsearch: return jsonify(message=f"Google API error: {error_msg}"), 500
-                else: break
-            else: break
+    summary_mode = request.args.get('mode', '').lower() == 'summary'
+    stream_format = None if summary_mode else _stream_format()
+    enrich = request.args.get('enrich', '').lower() in ('1', 'true', 'yes')
+    if stream_format: return _streaming_search_response(query, stream_format, enrich=enrich)
+    try:
+        all_raw_places_from_textsearch = text_search_cache.get_or_fetch(query, lambda: _fetch_text_search_results(query))
         if not all_raw_places_from_textsearch: return jsonify(status="ZERO_RESULTS", places=[]), 200
-        detailed_places_list = []
-        for basic_place_info in all_raw_places_from_textsearch:
-            place_id = basic_place_info.get("place_id")
-            place_name_for_log = basic_place_info.get("name", "Unknown")
-            if not place_id: detailed_places_list.append({ "name": place_name_for_log, "error_message": "Missing Place ID" }); continue
-            details_params = {"place_id": place_id, "fields": "name,formatted_address,website,formatted_phone_number,types,rating,user_ratings_total,business_status,opening_hours,url,place_id,photos", "key": GOOGLE_PLACES_API_KEY_FOR_PRO}
-            details_response = requests.get(PLACE_DETAILS_API_URL, params=details_params); details_result = details_response.json()
-            photo_url = None
-            if details_result.get("status") == "OK" and "result" in details_result:
-                place_data = details_result["result"]
-                if place_data.get("photos") and len(place_data["photos"]) > 0:
-                    photo_ref = place_data["photos"][0].get("photo_reference")
-                    if photo_ref: photo_url = f"https://maps.googleapis.com/maps/api/place/photo?maxwidth=800&photoreference={photo_ref}&key={GOOGLE_PLACES_API_KEY_FOR_PRO}"
-                detailed_places_list.append({"google_place_id": place_id, "name": place_data.get("name"), "address": place_data.get("formatted_address"), "website": place_data.get("website"), "phone_number": place_data.get("formatted_phone_number"), "photo_url": photo_url, "email": None, "types": place_data.get("types", []), "rating": place_data.get("rating"), "user_ratings_total": place_data.get("user_ratings_total"), "business_status": place_data.get("business_status"), "opening_hours": place_data.get("opening_hours", {}).get("weekday_text"), "google_maps_url": place_data.get("url")})
-            else: detailed_places_list.append({"google_place_id": place_id, "name": place_name_for_log, "address": basic_place_info.get("formatted_address"), "website": None, "phone_number": None, "email": None, "photo_url": None, "types": basic_place_info.get("types", []), "rating": basic_place_info.get("rating"), "user_ratings_total": basic_place_info.get("user_ratings_total"), "business_status": basic_place_info.get("business_status"), "opening_hours": None, "google_maps_url": None, "error_details_fetch": details_result.get('status')})
+        if summary_mode: return jsonify(status="OK", places=_summarize_places(all_raw_places_from_textsearch)), 200
+        detailed_places_list = _fetch_details_concurrently(all_raw_places_from_textsearch)
+        if enrich: _enrich_place_records(detailed_places_list)
         return jsonify(status="OK", places=detailed_places_list), 200
+    except PlacesAPIError as e: return jsonify(message=f"Google API error: {e}"), 500
     except requests.exceptions.RequestException as e: return jsonify(message=f"Error calling Google Places API: {str(e)}"), 503
     except Exception as e: current_app.logger.error(f"Unexpected error in search: {e}", exc_info=True); return jsonify(message=f"Server error: {str(e)}"), 500
 
 
+def _run_text_searches(queries):
+    # Text searches for several queries at once (their page-token sleeps overlap instead of adding up).
+    # Returns {query: raw results | PlacesAPIError | RequestException | ValueError}, in input order; one bad query never sinks the rest.
+    max_workers = max(1, min(current_app.config.get('SEARCH_BATCH_MAX_WORKERS', 4), len(queries)))
+    def run(query):
+        try: return text_search_cache.get_or_fetch(query, lambda: _fetch_text_search_results(query))
+        except (PlacesAPIError, requests.exceptions.RequestException, ValueError) as e: return e
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(queries, executor.map(metrics.bind(run), queries)))
+
+def _batch_search_cost():
+    # A batch is charged like one search per query (malformed bodies are rejected by the view itself).
+    queries = (request.get_json(silent=True) or {}).get('queries')
+    return max(1, len(queries)) if isinstance(queries, list) else 1
+
+@search_bp.route('/places/batch', methods=['POST'])
+@rate_limited(cost=_batch_search_cost)
+def batch_search_places_route():
+    # Several related queries ("roofers Dallas", "roof repair Dallas", ...) in one call. Place Details are
+    # fetched once per unique place_id across all queries; each place lists the queries that found it.
+    data = request.get_json(silent=True) or {}
+    raw_queries = data.get('queries')
+    if not isinstance(raw_queries, list) or not all(isinstance(q, str) for q in raw_queries):
+        return jsonify(message="'queries' must be a list of strings"), 400
+    queries = []; seen = set()
+    for query in raw_queries: # Drop blanks and repeats that normalize to the same cache key
+        key = text_search_cache.normalize(query)
+        if key and key not in seen: seen.add(key); queries.append(query.strip())
+    if not queries: return jsonify(message="Missing 'queries'"), 400
+    max_queries = current_app.config.get('SEARCH_BATCH_MAX_QUERIES', 10)
+    if len(queries) > max_queries: return jsonify(message=f"Too many queries (max {max_queries})"), 400
+    if not GOOGLE_PLACES_API_KEY_FOR_PRO:
+        current_app.logger.error("GOOGLE_PLACES_API_KEY_PRO not configured.")
+        return jsonify(message="API key for places search not configured"), 500
+    try:
+        results_by_query = _run_text_searches(queries)
+        query_summaries = []; unique_places = {}; matched_queries = {}; total_hits = 0
+        for query, results in results_by_query.items():
+            if isinstance(results, PlacesAPIError): query_summaries.append({"query": query, "status": "ERROR", "message": f"Google API error: {results}"}); continue
+            if isinstance(results, Exception): query_summaries.append({"query": query, "status": "ERROR", "message": f"Error calling Google Places API: {str(results)}"}); continue
+            query_summaries.append({"query": query, "status": "OK" if results else "ZERO_RESULTS", "count": len(results)})
+            total_hits += len(results)
+            for basic_place_info in results:
+                place_id = basic_place_info.get("place_id")
+                if not place_id: continue # Nothing to dedupe on or look up
+                unique_places.setdefault(place_id, basic_place_info)
+                place_queries = matched_queries.setdefault(place_id, [])
+                if query not in place_queries: place_queries.append(query) # A place can show up on several pages of one query
+        if not any(summary["status"] != "ERROR" for summary in query_summaries):
+            return jsonify(message="All queries failed", queries=query_summaries), 503
+        detailed_places_list = _fetch_details_concurrently(list(unique_places.values()))
+        for place_id, record in zip(unique_places, detailed_places_list): record["matched_queries"] = matched_queries[place_id]
+        return jsonify(status="OK" if detailed_places_list else "ZERO_RESULTS", places=detailed_places_list, queries=query_summaries,
+                       total_results=total_hits, unique_places=len(detailed_places_list)), 200
+    except Exception as e: current_app.logger.error(f"Unexpected error in batch search: {e}", exc_info=True); return jsonify(message=f"Server error: {str(e)}"), 500
+
+
+PLACE_DETAILS_NOT_FOUND_STATUSES = ("NOT_FOUND", "INVALID_REQUEST")
+
+@search_bp.route('/places/details/<place_id>', methods=['GET'])
+@rate_limited()
+def get_place_details_route(place_id):
+    # Full lead card for one place, for when a summary card is opened. Served from the Place Details cache when possible.
+    if not GOOGLE_PLACES_API_KEY_FOR_PRO:
+        current_app.logger.error("GOOGLE_PLACES_API_KEY_PRO not configured.")
+        return jsonify(message="API key for places search not configured"), 500
+    cached = place_details_cache.get_many([place_id], PLACE_DETAILS_FIELDS)
+    if place_id in cached: details_result = {"status": "OK", "result": cached[place_id]}
+    else:
+        details_result = _request_place_details(place_id)
+        if details_result.get("status") == "OK" and "result" in details_result: place_details_cache.set_many({place_id: details_result["result"]}, PLACE_DETAILS_FIELDS)
+        elif details_result.get("status") in PLACE_DETAILS_NOT_FOUND_STATUSES: return jsonify(message="Place not found"), 404
+        else: return jsonify(message=f"Failed to fetch place details: {details_result.get('status')}"), 502
+    return jsonify(status="OK", place={**_build_place_record({"place_id": place_id}, details_result), "details_loaded": True}), 200
+
+@search_bp.route('/places/details', methods=['POST'])
+@rate_limited()
+def prefetch_place_details_route():
+    # Batch variant of GET /places/details/<place_id> for the rows currently on screen: {"place_ids": [...]}.
+    # Cached places cost nothing; the rest share one bounded fan-out. Failed lookups come back with error_details_fetch.
+    data = request.get_json(silent=True) or {}
+    place_ids = data.get('place_ids')
+    if not isinstance(place_ids, list) or not all(isinstance(place_id, str) and place_id for place_id in place_ids):
+        return jsonify(message="'place_ids' must be a list of place id strings"), 400
+    place_ids = list(dict.fromkeys(place_ids))
+    max_ids = current_app.config.get('SEARCH_DETAILS_PREFETCH_MAX', 20)
+    if len(place_ids) > max_ids: return jsonify(message=f"Too many place_ids (max {max_ids})"), 400
+    if not GOOGLE_PLACES_API_KEY_FOR_PRO:
+        current_app.logger.error("GOOGLE_PLACES_API_KEY_PRO not configured.")
+        return jsonify(message="API key for places search not configured"), 500
+    records = _fetch_details_concurrently([{"place_id": place_id} for place_id in place_ids])
+    for record in records: record["details_loaded"] = "error_details_fetch" not in record
+    return jsonify(status="OK", places=records), 200
+
+
+@search_bp.route('/jobs', methods=['POST'])
+@rate_limited()
+def create_search_job():
+    # Same search as GET /places, run on the background worker pool. Poll GET /jobs/<id> for progress.
+    data = request.get_json(silent=True) or {}
+    query = data.get('query') or request.args.get('query')
+    if not query: return jsonify(message="Missing 'query' parameter"), 400
+    if not GOOGLE_PLACES_API_KEY_FOR_PRO:
+        current_app.logger.error("GOOGLE_PLACES_API_KEY_PRO not configured.")
+        return jsonify(message="API key for places search not configured"), 500
+    try:
+        job = search_job_runner.enqueue(query, user_id=current_user.id if current_user.is_authenticated else None)
+        return jsonify(message="Search job queued", job_id=job.id, status=job.status), 202, {'Location': f"{search_bp.url_prefix}/jobs/{job.id}"}
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error queueing search job: {e}", exc_info=True)
+        return jsonify(message="Failed to queue search job due to an internal error"), 500
+
+@search_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_search_job(job_id):
+    job = db.session.get(SearchJob, job_id)
+    if job is None: return jsonify(message="Search job not found"), 404
+    if job.user_id is not None and (not current_user.is_authenticated or job.user_id != current_user.id):
+        return jsonify(message="Unauthorized to view this search job"), 403
+    return jsonify(job=job.to_dict()), 200
+
+
 # --- NEW IMAGE PROXY ROUTE (added to search_bp) ---
+def _photo_cache_key(photo_url):
+    # Only genuine Places Photo URLs are cached, keyed on the photo reference and requested size
+    # (never the API key). Anything else is proxied straight through as before.
+    if not photo_url.startswith(PLACE_PHOTO_API_URL): return None
+    params = parse_qs(urlparse(photo_url).query)
+    photo_ref = (params.get('photoreference') or params.get('photo_reference') or [None])[0]
+    if not photo_ref: return None
+    return image_cache.make_key(photo_ref, (params.get('maxwidth') or [None])[0], (params.get('maxheight') or [None])[0])
+
+def _send_cached_image(cached):
+    # send_file streams from disk and handles If-None-Match / If-Modified-Since (304) and Range (206).
+    response = send_file(cached['path'], mimetype=cached['content_type'], conditional=True,
+                         etag=cached['sha256'], last_modified=cached['mtime'], max_age=current_app.config.get('IMAGE_CACHE_MAX_AGE', 2592000))
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers.pop('Content-Disposition', None) # send_file would name the image after its blob's sha256
+    return response
+
 @search_bp.route('/image-proxy', methods=['GET'])
+@rate_limited(cost=0) # Photos don't count as requests, but uncached ones draw on the Places budget
 def image_proxy():
     photo_url_to_fetch = request.args.get('url') 
 
@@ -198,22 +833,36 @@ def image_proxy():
         return jsonify(error="Missing image URL parameter ('url')"), 400
 
     # Basic validation (optional but good)
-    if not photo_url_to_fetch.startswith("https://maps.googleapis.com/maps/api/place/photo"):
+    if not photo_url_to_fetch.startswith(PLACE_PHOTO_API_URL):
         current_app.logger.warning(f"Image proxy received potentially invalid URL: {photo_url_to_fetch}")
         # Allow it to proceed for now, Google will error out if it's truly invalid
         # return jsonify(error="Invalid image URL for proxy, must be a Google Places Photo API URL"), 400
 
+    cache_key = _photo_cache_key(photo_url_to_fetch) if image_cache.enabled else None
+    if cache_key:
+        cached = image_cache.get(cache_key)
+        if cached: return _send_cached_image(cached)
+
     try:
         current_app.logger.info(f"Proxying image from: {photo_url_to_fetch}")
         
         # It's critical that your GOOGLE_PLACES_API_KEY_FOR_PRO is part of photo_url_to_fetch
         # (which it is, because your search_places_route constructed it that way)
         # So, no need to add the key again here.
-        image_response = requests.get(photo_url_to_fetch, stream=True)
+        if photo_url_to_fetch.startswith(PLACE_PHOTO_API_URL):
+            image_response = places_client.get('photo', photo_url_to_fetch, stream=True)
+        else:
+            # Not Google: keep it off the Places circuit breaker and quota budgets
+            image_response = requests.get(photo_url_to_fetch, stream=True, timeout=places_client.timeouts['photo'])
         image_response.raise_for_status() 
 
         content_type = image_response.headers.get('Content-Type', 'image/jpeg')
-        
+
+        if cache_key:
+            # Spool to the disk cache chunk by chunk, then serve the cached file like any other hit.
+            cached = image_cache.put_stream(cache_key, image_response.iter_content(chunk_size=8192), content_type)
+            return _send_cached_image(cached)
+
         # Use iter_content to stream. Important for larger images.
         def generate():
             for chunk in image_response.iter_content(chunk_size=8192): # Read in 8KB chunks
@@ -229,4 +878,4 @@ def image_proxy():
         return jsonify(error=f"Failed to fetch image due to network issue: {str(e)}"), 502
     except Exception as e:
         current_app.logger.error(f"Unexpected error in image_proxy for {photo_url_to_fetch}: {e}", exc_info=True)
-        return jsonify(error="Server error during image proxying"), 500
\ No newline at end of file
+        return jsonify(error="Server error during image proxying"), 500
@@ -0,0 +1,151 @@
+# app/search_jobs.py
+# Runs /api/search/places searches in the background so request threads return immediately.
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import db
+from app.models import SearchJob
+from app.rate_limit import _upstream_owner
+
+
+class SearchJobRunner:
+    """In-process worker pool for search jobs.
+
+    Job state (status, progress, partial results) is written to the SearchJob table as
+    the search streams in, so a GET handled by any gunicorn worker can report on a job
+    started by another one.
+
+    Jobs live in process threads, so a restart orphans whatever was queued or running. sweep()
+    marks jobs that haven't been touched for SEARCH_JOB_ORPHAN_TIMEOUT seconds as failed, and
+    deletes finished jobs older than SEARCH_JOB_RETENTION. It runs at startup, then at most
+    every SEARCH_JOB_SWEEP_INTERVAL from enqueue(); `flask sweep-search-jobs` runs it by hand.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._executor = None
+        self._next_sweep = 0
+        self._sweep_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.max_workers = app.config.get('SEARCH_JOB_WORKERS', 4)
+        self.flush_interval = app.config.get('SEARCH_JOB_FLUSH_INTERVAL', 0.5)
+        self.orphan_timeout = app.config.get('SEARCH_JOB_ORPHAN_TIMEOUT', 300)
+        self.retention = app.config.get('SEARCH_JOB_RETENTION', 86400)
+        self.sweep_interval = app.config.get('SEARCH_JOB_SWEEP_INTERVAL', 300)
+        app.extensions['search_jobs'] = self
+        if not app.config.get('TESTING'):
+            with app.app_context():
+                try:
+                    self.sweep()
+                except SQLAlchemyError as e: # e.g. the table doesn't exist yet; enqueue() will try again
+                    db.session.rollback()
+                    app.logger.warning(f"Search job sweep at startup failed: {e}")
+
+        @app.cli.command('sweep-search-jobs')
+        def sweep_search_jobs_command():
+            """Fail orphaned search jobs and delete expired ones."""
+            orphaned, purged = self.sweep()
+            click.echo(f"Marked {orphaned} orphaned search job(s) failed, deleted {purged} expired job(s).")
+
+    def sweep(self):
+        """Fails queued/running jobs idle for orphan_timeout and deletes jobs finished more than
+        `retention` seconds ago. Returns (orphaned, purged)."""
+        now = datetime.utcnow()
+        orphaned = db.session.query(SearchJob).filter(SearchJob.status.in_(('queued', 'running')),
+                                                      SearchJob.updated_at < now - timedelta(seconds=self.orphan_timeout)).update(
+            {SearchJob.status: 'failed', SearchJob.error_message: "Search was interrupted by a server restart",
+             SearchJob.finished_at: now}, synchronize_session=False)
+        purged = db.session.query(SearchJob).filter(SearchJob.finished_at < now - timedelta(seconds=self.retention)).delete(synchronize_session=False)
+        db.session.commit()
+        self._next_sweep = time.monotonic() + self.sweep_interval
+        return orphaned, purged
+
+    def _maybe_sweep(self):
+        if time.monotonic() < self._next_sweep or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self.sweep()
+        except SQLAlchemyError as e: # Housekeeping must never fail a search
+            db.session.rollback()
+            self.app.logger.error(f"Search job sweep failed: {e}")
+        finally:
+            self._sweep_lock.release()
+
+    @property
+    def executor(self):
+        # Created on first use so forked gunicorn workers each get their own threads.
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='search-job')
+        return self._executor
+
+    def enqueue(self, query, user_id=None):
+        self._maybe_sweep()
+        job = SearchJob(id=uuid.uuid4().hex, query=query, user_id=user_id, status='queued')
+        db.session.add(job)
+        db.session.commit()
+        # Only the rate-limit owner crosses over, so the job's Places calls keep counting against the
+        # enqueuing user's quota (app/rate_limit.py); the rest of the request context stays behind.
+        self.executor.submit(self._run, job.id, _upstream_owner.get())
+        return job
+
+    def _run(self, job_id, upstream_owner=None):
+        from app.routes import _stream_search_events # Deferred: app.routes imports this module
+        _upstream_owner.set(upstream_owner) # Pool threads are reused: always overwrite the previous job's owner
+        with self.app.app_context():
+            job = db.session.get(SearchJob, job_id)
+            if job is None or job.status != 'queued': # Deleted, or given up on by sweep() while it waited
+                return
+            job.status = 'running'
+            db.session.commit()
+            places_by_index = {}
+            last_flush = time.monotonic()
+            try:
+                for event_type, payload in _stream_search_events(job.query):
+                    if event_type == 'page':
+                        job.places_found = payload['places_found']
+                    elif event_type == 'place':
+                        places_by_index[payload['index']] = payload['place']
+                        # Save at most every flush_interval, but always once a page is fully enriched,
+                        # so pollers see it while we wait out the next page token.
+                        caught_up = len(places_by_index) == job.places_found
+                        if caught_up or time.monotonic() - last_flush >= self.flush_interval:
+                            self._flush(job, places_by_index)
+                            last_flush = time.monotonic()
+                    elif event_type == 'error':
+                        job.status = 'failed'
+                        job.error_message = payload['message']
+                    elif event_type == 'done':
+                        job.status = 'completed'
+                job.finished_at = datetime.utcnow()
+                self._flush(job, places_by_index)
+            except Exception as e:
+                db.session.rollback()
+                self.app.logger.error(f"Search job {job_id} crashed: {e}", exc_info=True)
+                job = db.session.get(SearchJob, job_id)
+                job.status = 'failed'
+                job.error_message = f"Server error: {str(e)}"
+                job.finished_at = datetime.utcnow()
+                db.session.commit()
+            finally:
+                db.session.remove()
+
+    @staticmethod
+    def _flush(job, places_by_index):
+        # Partial results are kept in search order; indexes still in flight are skipped.
+        job.results = json.dumps([places_by_index[i] for i in sorted(places_by_index)])
+        job.places_done = len(places_by_index)
+        db.session.commit()
+
+
+search_job_runner = SearchJobRunner()
@@ -0,0 +1,137 @@
+# app/stripe_events.py
+# Background processing of stored Stripe webhook events. The webhook route only verifies
+# and records each event (StripeEvent, keyed by Stripe's event id); this worker drains them.
+import json
+import threading
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import or_
+
+from app import db
+from app.models import StripeEvent
+
+
+class StripeEventWorker:
+    """Drains pending StripeEvent rows in batches on a daemon thread, one per process,
+    started with the app (except under TESTING, where the first webhook starts it).
+
+    Rows are claimed with a conditional UPDATE (pending -> processing), so several
+    gunicorn workers can drain concurrently without double-processing. A claim older
+    than STRIPE_EVENT_CLAIM_TIMEOUT (a worker died mid-batch) is reclaimed. A failed
+    event goes back to 'pending' with next_attempt_at pushed out exponentially from
+    STRIPE_EVENT_RETRY_BACKOFF seconds (capped at STRIPE_EVENT_RETRY_BACKOFF_MAX); after
+    STRIPE_EVENT_MAX_ATTEMPTS attempts it is dead-lettered as 'dead' and left for
+    `flask drain-stripe-events --retry-dead` once the cause is fixed.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.batch_size = app.config.get('STRIPE_EVENT_BATCH_SIZE', 50)
+        self.poll_interval = app.config.get('STRIPE_EVENT_POLL_INTERVAL', 5)
+        self.claim_timeout = app.config.get('STRIPE_EVENT_CLAIM_TIMEOUT', 300)
+        self.max_attempts = app.config.get('STRIPE_EVENT_MAX_ATTEMPTS', 5)
+        self.retry_backoff = app.config.get('STRIPE_EVENT_RETRY_BACKOFF', 30)
+        self.retry_backoff_max = app.config.get('STRIPE_EVENT_RETRY_BACKOFF_MAX', 3600)
+        app.extensions['stripe_event_worker'] = self
+        if not app.config.get('TESTING'):
+            # Drains events left over from before a restart (and reclaims stale claims) without waiting for a webhook.
+            self.start()
+
+        @app.cli.command('drain-stripe-events')
+        @click.option('--retry-dead', is_flag=True, help="Give dead-lettered events another round of attempts first.")
+        def drain_stripe_events_command(retry_dead):
+            """Process every pending Stripe webhook event now."""
+            if retry_dead:
+                revived = StripeEvent.query.filter_by(status='dead').update(
+                    {StripeEvent.status: 'pending', StripeEvent.attempts: 0, StripeEvent.next_attempt_at: None}, synchronize_session=False)
+                db.session.commit()
+                click.echo(f"Requeued {revived} dead Stripe event(s).")
+            processed = 0
+            while True:
+                count = self.drain_once()
+                processed += count
+                if count == 0:
+                    break
+            click.echo(f"Processed {processed} Stripe event(s).")
+
+    def start(self):
+        """Starts this process's worker thread unless it is running (threads don't survive a fork).
+        Its first sweep comes after STRIPE_EVENT_POLL_INTERVAL, once the app has finished starting."""
+        if self._thread is None or not self._thread.is_alive():
+            with self._start_lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._loop, name='stripe-events', daemon=True)
+                    self._thread.start()
+
+    def notify(self):
+        """Wakes the worker, starting it if needed."""
+        self.start()
+        self._wakeup.set()
+
+    def _loop(self):
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            try:
+                with self.app.app_context():
+                    while self.drain_once() == self.batch_size:
+                        pass
+            except Exception as e:
+                self.app.logger.error(f"Stripe event worker error: {e}", exc_info=True)
+
+    def _claim_batch(self):
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=self.claim_timeout)
+        claimable = or_((StripeEvent.status == 'pending') & or_(StripeEvent.next_attempt_at.is_(None), StripeEvent.next_attempt_at <= now),
+                        (StripeEvent.status == 'processing') & (StripeEvent.claimed_at < stale))
+        candidate_ids = [event_id for (event_id,) in db.session.query(StripeEvent.id).filter(claimable)
+                         .order_by(StripeEvent.received_at).limit(self.batch_size)]
+        claimed = []
+        for event_id in candidate_ids:
+            won = db.session.query(StripeEvent).filter(StripeEvent.id == event_id, claimable).update({StripeEvent.status: 'processing', StripeEvent.claimed_at: now,
+                      StripeEvent.attempts: StripeEvent.attempts + 1}, synchronize_session=False)
+            if won:
+                claimed.append(event_id)
+        db.session.commit()
+        return claimed
+
+    def drain_once(self):
+        """Claims and processes one batch. Returns how many events were claimed."""
+        from app.payment_routes import STRIPE_EVENT_HANDLERS # Deferred: payment_routes imports this module
+        claimed = self._claim_batch()
+        for event_id in claimed:
+            stored = db.session.get(StripeEvent, event_id)
+            try:
+                event = json.loads(stored.payload)
+                handler = STRIPE_EVENT_HANDLERS.get(event.get('type'))
+                if handler is not None:
+                    handler(event)
+                stored.status = 'processed'
+                stored.processed_at = datetime.utcnow()
+                stored.last_error = None
+                stored.next_attempt_at = None
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                self.app.logger.error(f"Stripe event {event_id} failed (attempt {stored.attempts}): {e}", exc_info=True)
+                stored = db.session.get(StripeEvent, event_id)
+                if stored.attempts >= self.max_attempts:
+                    stored.status, stored.next_attempt_at = 'dead', None
+                else:
+                    delay = min(self.retry_backoff_max, self.retry_backoff * 2 ** (stored.attempts - 1))
+                    stored.status, stored.next_attempt_at = 'pending', datetime.utcnow() + timedelta(seconds=delay)
+                stored.last_error = str(e)
+                db.session.commit()
+        return len(claimed)
+
+
+stripe_event_worker = StripeEventWorker()
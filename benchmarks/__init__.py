@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# Local benchmark harness: fake upstream servers plus scripted workloads against create_app.
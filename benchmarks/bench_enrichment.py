@@ -0,0 +1,73 @@
+# benchmarks/bench_enrichment.py
+# Website enrichment (app/enrichment.py) against FakeWebsiteServer: pages/sec, accuracy and
+# peak Python heap per worker, for a few pool sizes; then a batch of saved leads end to end.
+#
+#   python -m benchmarks.bench_enrichment --sites 200 --latency 0.05 --workers 1 8 16 32
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.common import make_app
+from benchmarks.fake_websites import FakeWebsiteServer
+
+
+def run_pool(app, fake, workers):
+    from app.enrichment import WebsiteEnricher
+    enricher = WebsiteEnricher()
+    app.config['ENRICH_MAX_WORKERS'] = workers
+    enricher.init_app(app)  # fresh pool and empty cache for each run
+    requests_before = fake.request_count
+    tracemalloc.start()
+    start = time.perf_counter()
+    results = enricher.enrich_many(fake.urls())
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    enricher.executor.shutdown()
+    pages = fake.request_count - requests_before
+    correct = sum((results[fake.site_url(n)]['emails'] or [None])[0] == fake.expected_email(n) for n in range(fake.sites))
+    with_social = sum(bool(result['social_links']) for result in results.values())
+    print(f"workers={workers:>3}  {elapsed * 1000:8.1f} ms  pages={pages:>4}  {pages / elapsed:7.1f} pages/s  "
+          f"emails correct {correct}/{fake.sites}  social {with_social}/{fake.sites}  peak heap/worker {peak / workers / 1024:7.1f} KiB")
+
+
+def run_saved_leads(app, fake, batch_size):
+    from sqlalchemy import insert
+    from app import db
+    from app.enrichment import enrich_saved_leads
+    from app.models import User, SavedLead
+    with app.app_context():
+        user = User(username="enrich-bench", email="enrich-bench@example.com")
+        user.set_password("benchmark-password")
+        db.session.add(user); db.session.commit()
+        db.session.execute(insert(SavedLead), [{"user_id": user.id, "place_id_google": f"place-{n}", "name_at_save": f"Business {n}",
+                                                "website_at_save": url, "user_status": "New"} for n, url in enumerate(fake.urls())])
+        db.session.commit()
+        start = time.perf_counter()
+        enriched = enrich_saved_leads(batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        with_email = SavedLead.query.filter(SavedLead.email.isnot(None)).count()
+        again = enrich_saved_leads(batch_size=batch_size)
+        print(f"saved leads  {enriched} enriched in {elapsed * 1000:.1f} ms ({enriched / elapsed:.1f} leads/s), "
+              f"{with_email} with email; second pass re-crawled {again}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sites', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.05, help="fake per-page latency, seconds")
+    parser.add_argument('--page-bytes', type=int, default=32768)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 8, 16, 32])
+    parser.add_argument('--batch-size', type=int, default=50, help="saved leads per enrichment batch")
+    args = parser.parse_args()
+    tmp_dir = tempfile.mkdtemp(prefix="leaddawg-bench-")
+    app = make_app(os.path.join(tmp_dir, "bench.db"), ENRICH_ALLOW_PRIVATE_HOSTS=True)
+    with FakeWebsiteServer(sites=args.sites, latency=args.latency, page_bytes=args.page_bytes) as fake:
+        for workers in args.workers:
+            run_pool(app, fake, workers)
+        app.config['ENRICH_MAX_WORKERS'] = max(args.workers)
+        from app.enrichment import website_enricher
+        website_enricher.init_app(app)
+        run_saved_leads(app, fake, args.batch_size)
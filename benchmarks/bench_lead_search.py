@@ -0,0 +1,69 @@
+# benchmarks/bench_lead_search.py
+# Query latency of GET /api/leads/search on a large pipeline.
+#
+#   python -m benchmarks.bench_lead_search --leads 100000 --other-users 4
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks.common import make_app
+
+WORDS = ("plumbing roofing electric hvac dental salon bakery auto repair law landscaping cleaning pest control "
+         "austin dallas houston denver phoenix seattle portland boston main oak elm pine cedar maple").split()
+QUERIES = ["plumbing", "austin", "roofing dallas", "main st", "call back", "pest", "mapl", "zzzz-no-match"]
+
+
+def seed(app, leads, other_users):
+    from sqlalchemy import insert
+    from app import db
+    from app.models import User, SavedLead
+    rng = random.Random(42)
+    with app.app_context():
+        users = []
+        for n in range(other_users + 1):
+            user = User(username=f"bench{n}", email=f"bench{n}@example.com")
+            user.set_password("benchmark-password")
+            db.session.add(user); users.append(user)
+        db.session.commit()
+        for user in users:
+            rows = [{"user_id": user.id, "place_id_google": f"place-{user.id}-{i}",
+                     "name_at_save": " ".join(rng.choice(WORDS) for _ in range(3)).title(),
+                     "address_at_save": f"{rng.randint(1, 9999)} {rng.choice(WORDS).title()} St, {rng.choice(WORDS).title()}",
+                     "user_notes": rng.choice(["", "call back next week", "left voicemail", "interested in quote"]),
+                     "user_status": "New"} for i in range(leads)]
+            for start in range(0, len(rows), 5000):
+                db.session.execute(insert(SavedLead), rows[start:start + 5000])
+            db.session.commit()
+
+
+def run(leads, other_users, repeat):
+    tmp_dir = tempfile.mkdtemp(prefix="leaddawg-bench-")
+    app = make_app(os.path.join(tmp_dir, "bench.db"))
+    start = time.perf_counter()
+    seed(app, leads, other_users)
+    print(f"seeded {leads * (other_users + 1)} leads ({leads} per user) in {time.perf_counter() - start:.1f}s")
+    client = app.test_client()
+    client.post('/api/auth/login', json={'identifier': 'bench0', 'password': 'benchmark-password'})
+    for query in QUERIES:
+        timings = []
+        for _ in range(repeat):
+            t = time.perf_counter()
+            resp = client.get('/api/leads/search', query_string={'q': query, 'limit': 20})
+            timings.append(time.perf_counter() - t)
+            assert resp.status_code == 200, resp.get_data(as_text=True)
+        count = len(resp.get_json()['leads'])
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(f"{query!r:>18}  hits/page={count:>2}  p50={statistics.median(timings) * 1000:7.2f} ms  p95={p95 * 1000:7.2f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--leads', type=int, default=100000, help="leads per user")
+    parser.add_argument('--other-users', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    run(args.leads, args.other_users, args.repeat)
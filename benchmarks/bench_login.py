@@ -0,0 +1,57 @@
+# benchmarks/bench_login.py
+# Login latency under concurrency, with password hashing on the process pool.
+#
+#   python -m benchmarks.bench_login --concurrency 1 4 16 64 --requests 64 --workers 2
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import make_app, percentile
+
+PASSWORD = "benchmark-password"
+
+
+def run(concurrency_levels, n_requests, workers, max_pending, method):
+    tmp_dir = tempfile.mkdtemp(prefix="leaddawg-bench-")
+    app = make_app(os.path.join(tmp_dir, "bench.db"), PASSWORD_HASH_WORKERS=workers,
+                   PASSWORD_HASH_MAX_PENDING=max_pending, PASSWORD_HASH_METHOD=method)
+    from app import db
+    from app.models import User
+    with app.app_context():
+        user = User(username="loadtest", email="loadtest@example.com")
+        user.set_password(PASSWORD)
+        db.session.add(user); db.session.commit()
+
+    def login(_):
+        client = app.test_client()
+        start = time.perf_counter()
+        resp = client.post('/api/auth/login', json={'identifier': 'loadtest', 'password': PASSWORD})
+        return resp.status_code, time.perf_counter() - start
+
+    login(None) # warm the pool (spawned workers import Werkzeug on first use)
+    print(f"method={method} hash workers={workers} max pending={max_pending or 'default'}")
+    for concurrency in concurrency_levels:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(login, range(n_requests)))
+        elapsed = time.perf_counter() - start
+        ok = sorted(latency for status, latency in results if status == 200)
+        shed = sum(1 for status, _ in results if status == 503)
+        line = f"concurrency={concurrency:>3}  ok={len(ok):>4}  503={shed:>4}  throughput={len(results) / elapsed:6.1f} req/s"
+        if ok:
+            line += f"  p50={statistics.median(ok) * 1000:7.1f} ms  p99={percentile(ok, 0.99) * 1000:7.1f} ms"
+        print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 64])
+    parser.add_argument('--requests', type=int, default=64, help="logins per concurrency level")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="PASSWORD_HASH_WORKERS (0 = inline)")
+    parser.add_argument('--max-pending', type=int, default=0, help="PASSWORD_HASH_MAX_PENDING (0 = 4 x workers)")
+    parser.add_argument('--method', default='scrypt:32768:8:1')
+    args = parser.parse_args()
+    run(args.concurrency, args.requests, args.workers, args.max_pending, args.method)
@@ -0,0 +1,78 @@
+# benchmarks/bench_rate_limit.py
+# Overhead of the rate limiter (app/rate_limit.py): the admission check alone, per store, from
+# several threads at once; then a cached search with the limiter on vs. off.
+#
+#   python -m benchmarks.bench_rate_limit --iterations 5000 --threads 1 8
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from benchmarks.common import make_app, percentile, point_routes_at
+from benchmarks.fake_places import FakePlacesServer
+
+
+def time_admissions(app, threads, iterations):
+    from app.rate_limit import rate_limiter
+    latencies, lock = [], threading.Lock()
+
+    def worker(n):
+        local = []
+        with app.test_request_context('/api/search/places', environ_base={'REMOTE_ADDR': f"10.0.{n}.1"}):
+            for _ in range(iterations):
+                start = time.perf_counter()
+                rate_limiter.admit(1)
+                rate_limiter.charge_upstream()
+                local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for thread in pool: thread.start()
+    for thread in pool: thread.join()
+    elapsed = time.perf_counter() - start
+    ordered = sorted(latencies)
+    # With several threads, per-call tails mostly measure GIL hand-offs; throughput shows the real cost.
+    return statistics.median(ordered) * 1e6, percentile(ordered, 0.99) * 1e6, len(ordered) / elapsed
+
+
+def time_cached_search(app, repeat):
+    client = app.test_client()
+    client.get('/api/search/places', query_string={"query": "limiter bench"})  # warm both caches
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        resp = client.get('/api/search/places', query_string={"query": "limiter bench"})
+        timings.append(time.perf_counter() - start)
+        assert resp.status_code == 200, resp.get_data(as_text=True)
+    return statistics.median(timings) * 1e6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=5000, help="admission checks per thread")
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--repeat', type=int, default=500, help="cached searches per configuration")
+    args = parser.parse_args()
+    tmp_dir = tempfile.mkdtemp(prefix="leaddawg-bench-")
+    # Budgets far above what the benchmark can spend, so every check takes the normal "allowed" path.
+    generous = {f"RATE_LIMIT_FREE_{k}": v for k, v in (("PER_MINUTE", 10 ** 9), ("BURST", 10 ** 9), ("PLACES_PER_HOUR", 10 ** 9))}
+    for storage in ('sqlite', 'memory'):
+        app = make_app(os.path.join(tmp_dir, f"{storage}.db"), RATE_LIMIT_ENABLED=True, RATE_LIMIT_STORAGE=storage,
+                       RATE_LIMIT_DB_PATH=os.path.join(tmp_dir, "rate_limits.sqlite"), PLACES_GLOBAL_BUDGET_PER_MINUTE=10 ** 9, **generous)
+        for threads in args.threads:
+            p50, p99, per_second = time_admissions(app, threads, args.iterations)
+            print(f"{storage:<6} threads={threads:>2}  admit+charge p50 {p50:7.1f} us  p99 {p99:8.1f} us  "
+                  f"{per_second:8.0f} checks/s ({1e6 / per_second:6.1f} us each)")
+    with FakePlacesServer(places_per_page=20, pages=1, latency=0.0) as fake:
+        point_routes_at(fake)
+        results = {}
+        for enabled in (False, True):
+            app = make_app(os.path.join(tmp_dir, f"search-{enabled}.db"), RATE_LIMIT_ENABLED=enabled,
+                           RATE_LIMIT_DB_PATH=os.path.join(tmp_dir, "search-limits.sqlite"), PLACES_GLOBAL_BUDGET_PER_MINUTE=10 ** 9, **generous)
+            results[enabled] = time_cached_search(app, args.repeat)
+        print(f"cached search p50: limiter off {results[False]:7.1f} us, on {results[True]:7.1f} us, "
+              f"overhead {results[True] - results[False]:6.1f} us")
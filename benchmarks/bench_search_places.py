@@ -0,0 +1,120 @@
+# benchmarks/bench_search_places.py
+# Measures /api/search/places against FakePlacesServer.
+#
+#   python -m benchmarks.bench_search_places --places 20 --latency 0.05 --workers 1 8 16
+#   python -m benchmarks.bench_search_places --cache     # cold vs. warm Place Details cache
+#   python -m benchmarks.bench_search_places --stream    # time-to-first-result, NDJSON vs. JSON
+#   python -m benchmarks.bench_search_places --batch 5 --distinct 40   # 5 overlapping queries: batch vs. one by one
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.common import make_app, point_routes_at
+from benchmarks.fake_places import FakePlacesServer
+
+
+def timed_search(client, query, expected):
+    start = time.perf_counter()
+    resp = client.get('/api/search/places', query_string={"query": query})
+    elapsed = time.perf_counter() - start
+    assert resp.status_code == 200, resp.get_data(as_text=True)
+    assert len(resp.get_json()["places"]) == expected
+    return elapsed
+
+
+def run_workers(places, latency, workers_list, repeat):
+    tmp_dir = tempfile.mkdtemp(prefix="leaddawg-bench-")
+    app = make_app(os.path.join(tmp_dir, "bench.db"), PLACE_DETAILS_CACHE_TTL=0)
+    with FakePlacesServer(places_per_page=places, pages=1, latency=latency) as fake:
+        point_routes_at(fake)
+        client = app.test_client()
+        baseline = None
+        for workers in workers_list:
+            app.config['PLACES_DETAILS_MAX_WORKERS'] = workers
+            timings = [timed_search(client, f"plumbers bench {workers} {i}", places) for i in range(repeat)]
+            median = statistics.median(timings)
+            baseline = baseline or median
+            print(f"workers={workers:>3}  median={median * 1000:8.1f} ms  speedup={baseline / median:5.2f}x")
+
+
+def run_cache(places, latency, repeat):
+    tmp_dir = tempfile.mkdtemp(prefix="leaddawg-bench-")
+    app = make_app(os.path.join(tmp_dir, "bench.db"))
+    with FakePlacesServer(places_per_page=places, pages=1, latency=latency) as fake:
+        point_routes_at(fake)
+        client = app.test_client()
+        from app.cache import place_details_cache
+        cold = timed_search(client, "plumbers in Austin", places)
+        cold_calls = fake.request_counts["details"]
+        warm = statistics.median(timed_search(client, "Austin plumbers", places) for _ in range(repeat))
+        print(f"cold  {cold * 1000:8.1f} ms  details calls={cold_calls}")
+        print(f"warm  {warm * 1000:8.1f} ms  details calls={fake.request_counts['details'] - cold_calls}")
+        place_details_cache.memory.clear()  # what another worker process would see: DB tier only
+        shared = timed_search(client, "Austin plumbers", places)
+        print(f"db    {shared * 1000:8.1f} ms  details calls={fake.request_counts['details'] - cold_calls}")
+        print(f"stats {place_details_cache.stats()}")
+
+
+def run_stream(places, latency, pages):
+    tmp_dir = tempfile.mkdtemp(prefix="leaddawg-bench-")
+    app = make_app(os.path.join(tmp_dir, "bench.db"), PLACE_DETAILS_CACHE_TTL=0, TEXT_SEARCH_CACHE_TTL=0)
+    with FakePlacesServer(places_per_page=places, pages=pages, latency=latency) as fake:
+        point_routes_at(fake)
+        client = app.test_client()
+        blocking = timed_search(client, "plumbers json", places * pages)
+        print(f"json    first result {blocking * 1000:8.1f} ms  total {blocking * 1000:8.1f} ms")
+        start = time.perf_counter()
+        resp = client.get('/api/search/places', query_string={"query": "plumbers stream", "stream": "ndjson"}, buffered=False)
+        first = None
+        for _ in resp.response:
+            first = first or time.perf_counter() - start
+        total = time.perf_counter() - start
+        resp.close()
+        print(f"ndjson  first result {first * 1000:8.1f} ms  total {total * 1000:8.1f} ms")
+
+
+def run_batch(places, latency, n_queries, distinct):
+    tmp_dir = tempfile.mkdtemp(prefix="leaddawg-bench-")
+    app = make_app(os.path.join(tmp_dir, "bench.db"), PLACE_DETAILS_CACHE_TTL=0, TEXT_SEARCH_CACHE_TTL=0)
+    queries = [f"roofers Dallas variant {i}" for i in range(n_queries)]
+    with FakePlacesServer(places_per_page=places, pages=1, latency=latency, distinct_places=distinct) as fake:
+        point_routes_at(fake)
+        client = app.test_client()
+        start = time.perf_counter()
+        for query in queries:
+            timed_search(client, query, places)
+        one_by_one = time.perf_counter() - start
+        separate_calls = dict(fake.request_counts)
+        start = time.perf_counter()
+        resp = client.post('/api/search/places/batch', json={"queries": queries})
+        batch = time.perf_counter() - start
+        assert resp.status_code == 200, resp.get_data(as_text=True)
+        batch_calls = {k: fake.request_counts[k] - separate_calls[k] for k in separate_calls}
+        body = resp.get_json()
+        print(f"one by one  {one_by_one * 1000:8.1f} ms  textsearch={separate_calls['textsearch']} details={separate_calls['details']}")
+        print(f"batch       {batch * 1000:8.1f} ms  textsearch={batch_calls['textsearch']} details={batch_calls['details']}"
+              f"  ({body['total_results']} hits, {body['unique_places']} unique places)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--places', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.05, help="fake upstream latency per call, seconds")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8, 16])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--pages', type=int, default=2, help="text-search pages for --stream")
+    parser.add_argument('--cache', action='store_true', help="benchmark the Place Details cache instead")
+    parser.add_argument('--stream', action='store_true', help="benchmark time-to-first-result of streaming mode")
+    parser.add_argument('--batch', type=int, default=0, metavar='N', help="benchmark a batch search of N overlapping queries")
+    parser.add_argument('--distinct', type=int, default=40, help="size of the shared place pool for --batch")
+    args = parser.parse_args()
+    if args.batch:
+        run_batch(args.places, args.latency, args.batch, args.distinct)
+    elif args.stream:
+        run_stream(args.places, args.latency, args.pages)
+    elif args.cache:
+        run_cache(args.places, args.latency, args.repeat)
+    else:
+        run_workers(args.places, args.latency, args.workers, args.repeat)
@@ -0,0 +1,140 @@
+# benchmarks/bench_webhook_replay.py
+# Replay storm against /api/payments/webhook: every event is delivered many times, concurrently.
+# Checks that each event is stored and applied exactly once, and reports fast-path latency; then
+# checks that a failing event backs off and is dead-lettered. This is the verification harness for
+# webhook idempotency: it exits non-zero if any check fails, and run_suite.py runs it too.
+#
+#   python -m benchmarks.bench_webhook_replay --events 50 --replays 20 --threads 16
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import make_app
+from benchmarks.stripe_signing import make_event, sign_payload
+
+SECRET = "whsec_benchmark"
+
+
+def build_events(user_ids, price_id):
+    events = []
+    for n, user_id in enumerate(user_ids):
+        customer = f"cus_{user_id}"
+        events.append(make_event(f"evt_checkout_{n}", "checkout.session.completed", {
+            "id": f"cs_{n}", "object": "checkout.session", "client_reference_id": str(user_id), "customer": customer,
+            "subscription": f"sub_{user_id}", "metadata": {"user_id": str(user_id), "selected_price_id": price_id}}))
+        events.append(make_event(f"evt_invoice_{n}", "invoice.payment_succeeded", {
+            "id": f"in_{n}", "object": "invoice", "customer": customer, "subscription": f"sub_{user_id}",
+            "lines": {"data": [{"price": {"id": price_id}, "period": {"start": 1700000000, "end": 1893456000}}]}}))
+    return events
+
+
+def report(failed, name, ok, detail):
+    print(f"{'PASS' if ok else 'FAIL'}  {name:<20} {detail}")
+    if not ok:
+        failed.append(name)
+
+
+def check_dead_letter(app, failed, max_attempts=3):
+    # A handler that always raises: each retry waits longer, then the event is parked as 'dead'.
+    from app import db, payment_routes
+    from app.models import StripeEvent
+    from app.stripe_events import stripe_event_worker
+    payment_routes.STRIPE_EVENT_HANDLERS['bench.poison'] = lambda event: 1 / 0
+    saved = stripe_event_worker.max_attempts, stripe_event_worker.retry_backoff, stripe_event_worker.poll_interval
+    # Park the background thread the storm started, so only this check claims the event
+    stripe_event_worker.max_attempts, stripe_event_worker.retry_backoff, stripe_event_worker.poll_interval = max_attempts, 0.05, 3600
+    time.sleep(saved[2] + 0.1)
+    delays, claimed_early = [], 0
+    try:
+        with app.app_context():
+            db.session.add(StripeEvent(id='evt_poison', type='bench.poison', payload=json.dumps({'id': 'evt_poison', 'type': 'bench.poison'})))
+            db.session.commit()
+            for _ in range(max_attempts):
+                stored = db.session.get(StripeEvent, 'evt_poison')
+                if stored.next_attempt_at is not None:
+                    claimed_early += stripe_event_worker.drain_once() # still backing off: must claim nothing
+                    delays.append((stored.next_attempt_at - stored.claimed_at).total_seconds())
+                    time.sleep(delays[-1] + 0.05)
+                stripe_event_worker.drain_once()
+                db.session.expire_all()
+            stored = db.session.get(StripeEvent, 'evt_poison')
+            status, attempts = stored.status, stored.attempts
+            claimed_after = stripe_event_worker.drain_once()
+    finally:
+        stripe_event_worker.max_attempts, stripe_event_worker.retry_backoff, stripe_event_worker.poll_interval = saved
+        payment_routes.STRIPE_EVENT_HANDLERS.pop('bench.poison', None)
+    report(failed, "dead_letter", status == 'dead' and attempts == max_attempts and not claimed_early and not claimed_after
+           and len(delays) == max_attempts - 1 and all(later > earlier for earlier, later in zip(delays, delays[1:])),
+           f"status {status} after {attempts} attempt(s), retry delays {[round(d, 2) for d in delays]} s, "
+           f"claimed while backing off {claimed_early}, after dead-lettering {claimed_after}")
+
+
+def run(n_events, replays, threads):
+    """Runs the storm and the dead-letter check; returns the names of failed checks."""
+    failed = []
+    tmp_dir = tempfile.mkdtemp(prefix="leaddawg-bench-")
+    app = make_app(os.path.join(tmp_dir, "bench.db"), STRIPE_WEBHOOK_SECRET=SECRET, STRIPE_EVENT_POLL_INTERVAL=0.2)
+    from app import db, payment_routes
+    from app.models import User, StripeEvent
+    from app.stripe_events import stripe_event_worker
+    payment_routes.PRICE_ID_PRO_MONTHLY = payment_routes.PRICE_ID_PRO_MONTHLY or "price_pro_bench"
+    with app.app_context():
+        users = [User(username=f"payer{n}", email=f"payer{n}@example.com") for n in range(max(1, n_events // 2))]
+        for user in users: user.set_password("benchmark-password")
+        db.session.add_all(users); db.session.commit()
+        user_ids = [user.id for user in users]
+    events = build_events(user_ids, payment_routes.PRICE_ID_PRO_MONTHLY)[:n_events]
+    deliveries = [payload for payload in events for _ in range(replays)]
+
+    def deliver(payload):
+        client = app.test_client()
+        start = time.perf_counter()
+        resp = client.post('/api/payments/webhook', data=payload, content_type='application/json',
+                           headers={'Stripe-Signature': sign_payload(payload, SECRET)})
+        return resp.status_code, bool(resp.get_json().get('duplicate')), time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(deliver, deliveries))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latency for _, _, latency in results)
+    statuses = {status for status, _, _ in results}
+    report(failed, "all_acknowledged", statuses == {200}, f"response statuses {sorted(statuses)}")
+    duplicates = sum(1 for _, duplicate, _ in results if duplicate)
+
+    with app.app_context():
+        # The app's own drainer thread may still be mid-batch once nothing is left to claim: wait it out
+        # (bounded) rather than count its events as unprocessed.
+        deadline = time.monotonic() + 30
+        while StripeEvent.query.filter(StripeEvent.status.in_(('pending', 'processing'))).count() and time.monotonic() < deadline:
+            if not stripe_event_worker.drain_once():
+                db.session.rollback() # End the read so the next count sees the other thread's commits
+                time.sleep(0.05)
+        stored = StripeEvent.query.count()
+        processed = StripeEvent.query.filter_by(status='processed').count()
+        max_attempts = db.session.query(db.func.max(StripeEvent.attempts)).scalar()
+        upgraded = User.query.filter(User.tier == 'pro', User.subscription_active_until.isnot(None)).count()
+    report(failed, "stored_once", stored == len(events), f"{stored} stored rows for {len(events)} distinct events")
+    report(failed, "duplicates_no_op", duplicates == len(deliveries) - len(events),
+           f"{duplicates} of {len(deliveries) - len(events)} replays acknowledged as duplicates")
+    report(failed, "applied_once", processed == len(events) and max_attempts == 1, f"{processed} processed, max attempts {max_attempts}")
+    print(f"deliveries={len(deliveries)} distinct={len(events)} duplicates acknowledged as no-ops={duplicates}")
+    print(f"stored={stored} processed={processed} max attempts={max_attempts} users upgraded={upgraded}")
+    print(f"throughput={len(deliveries) / elapsed:7.1f} req/s  p50={statistics.median(latencies) * 1000:6.2f} ms  "
+          f"p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:6.2f} ms")
+    check_dead_letter(app, failed)
+    return failed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--events', type=int, default=50, help="distinct events")
+    parser.add_argument('--replays', type=int, default=20, help="deliveries per event")
+    parser.add_argument('--threads', type=int, default=16)
+    args = parser.parse_args()
+    sys.exit(1 if run(args.events, args.replays, args.threads) else 0)
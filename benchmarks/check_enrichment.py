@@ -0,0 +1,111 @@
+# benchmarks/check_enrichment.py
+# Verification harness for app/enrichment.py against FakeWebsiteServer: extraction accuracy,
+# private-host and DNS-rebinding refusal, the byte cap, redirects and the per-host limit.
+# Prints one line per check and exits non-zero if any fails; run_suite.py runs it too.
+#
+#   python -m benchmarks.check_enrichment
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import make_app
+from benchmarks.fake_websites import FakeWebsiteServer
+
+
+def make_enricher(app, **config):
+    from app.enrichment import WebsiteEnricher
+    app.config.update({'ENRICH_ALLOW_PRIVATE_HOSTS': True, **config})
+    return WebsiteEnricher(app)
+
+
+def fetch_status(enricher, url):
+    from app.enrichment import EnrichmentError
+    try:
+        return 'OK', enricher.fetch_page(url)
+    except EnrichmentError as e:
+        return e.status, None
+
+
+def check_extraction(app, fake):
+    results = make_enricher(app).enrich_many(fake.urls())
+    wrong = [n for n in range(fake.sites) if (results[fake.site_url(n)]['emails'] or [None])[0] != fake.expected_email(n)]
+    expected_social = {'facebook', 'instagram'}
+    bad_social = [n for n in range(fake.sites) if set(results[fake.site_url(n)]['social_links']) != expected_social
+                  or any('sharer' in link for link in results[fake.site_url(n)]['social_links'].values())]
+    return not wrong and not bad_social, f"emails wrong for {len(wrong)}/{fake.sites}, social links wrong for {len(bad_social)}/{fake.sites}"
+
+
+def check_private_hosts(app, fake):
+    enricher = make_enricher(app, ENRICH_ALLOW_PRIVATE_HOSTS=False)
+    before = fake.request_count
+    result = enricher.lookup(fake.site_url(0))
+    return result['status'] == 'BLOCKED_HOST' and fake.request_count == before, \
+        f"status {result['status']}, {fake.request_count - before} request(s) reached the server"
+
+
+def check_dns_rebinding(app, fake):
+    # The pre-flight resolution said "public"; the connection then lands on loopback.
+    enricher = make_enricher(app, ENRICH_ALLOW_PRIVATE_HOSTS=False)
+    enricher._check_host = lambda host: None
+    before = fake.request_count
+    status, _ = fetch_status(enricher, fake.site_url(1))
+    return status == 'BLOCKED_HOST' and fake.request_count == before, \
+        f"status {status}, {fake.request_count - before} request(s) reached the server"
+
+
+def check_byte_cap(app, fake):
+    max_bytes = 65536
+    enricher = make_enricher(app, ENRICH_MAX_BYTES=max_bytes)
+    sent_before = fake.bytes_sent
+    status, page = fetch_status(enricher, fake.site_url(2) + 'big')
+    time.sleep(0.2)  # let the server notice the hang-up; loopback socket buffers still absorb a few MB
+    sent = fake.bytes_sent - sent_before
+    text = page[1] if page else ''
+    ok = status == 'OK' and len(text) == max_bytes and fake.expected_email(0) not in text and sent < fake.big_bytes // 2
+    return ok, f"status {status}, kept {len(text)} bytes (cap {max_bytes}), server sent {sent} of {fake.big_bytes}"
+
+
+def check_redirects(app, fake):
+    from app.enrichment import MAX_REDIRECTS
+    enricher = make_enricher(app)
+    status, page = fetch_status(enricher, f"{fake.site_url(3)}hop/{MAX_REDIRECTS}")
+    too_many, _ = fetch_status(enricher, f"{fake.site_url(3)}hop/{MAX_REDIRECTS + 1}")
+    ok = status == 'OK' and page[0] == fake.site_url(3) and too_many == 'TOO_MANY_REDIRECTS'
+    return ok, f"{MAX_REDIRECTS} hops: {status} at {page[0] if page else None}; {MAX_REDIRECTS + 1} hops: {too_many}"
+
+
+def check_per_host_limit(app, fake, per_host_limit=2, requests=8):
+    enricher = make_enricher(app, ENRICH_PER_HOST_LIMIT=per_host_limit, ENRICH_MAX_WORKERS=requests)
+    fake.max_in_flight = 0
+    latency, fake.latency = fake.latency, max(fake.latency, 0.1)
+    try:
+        with ThreadPoolExecutor(max_workers=requests) as pool:
+            statuses = list(pool.map(lambda i: fetch_status(enricher, f"{fake.site_url(4)}?page={i}")[0], range(requests)))
+    finally:
+        fake.latency = latency
+    ok = statuses == ['OK'] * requests and fake.max_in_flight == per_host_limit and not enricher._host_slots
+    return ok, (f"{statuses.count('OK')}/{requests} OK, at most {fake.max_in_flight} in flight (limit {per_host_limit}), "
+                f"{len(enricher._host_slots)} host slot(s) left over")
+
+
+CHECKS = (check_extraction, check_private_hosts, check_dns_rebinding, check_byte_cap, check_redirects, check_per_host_limit)
+
+
+def run_checks(sites=30):
+    """Runs every check; returns the names of the ones that failed."""
+    tmp_dir = tempfile.mkdtemp(prefix="leaddawg-check-")
+    app = make_app(os.path.join(tmp_dir, "check.db"))
+    failed = []
+    with FakeWebsiteServer(sites=sites, latency=0.01, page_bytes=4096) as fake:
+        for check in CHECKS:
+            ok, detail = check(app, fake)
+            print(f"{'PASS' if ok else 'FAIL'}  {check.__name__:<24} {detail}")
+            if not ok:
+                failed.append(check.__name__)
+    return failed
+
+
+if __name__ == '__main__':
+    sys.exit(1 if run_checks() else 0)
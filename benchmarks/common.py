@@ -0,0 +1,49 @@
+# benchmarks/common.py
+# Shared helpers: a throwaway app on a temp SQLite DB, pointing the app at fake upstreams, stats.
+import statistics
+
+
+def make_app(db_path, **overrides):
+    """create_app() with a throwaway SQLite database (tables created) and config overrides."""
+    from app import create_app, db
+    from config import Config
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + db_path
+        TESTING = True
+        RATE_LIMIT_ENABLED = False  # benchmarks measure the app, not the limiter (see bench_rate_limit)
+
+    for key, value in overrides.items():
+        setattr(BenchConfig, key, value)
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def point_routes_at(fake, page_token_delay=None):
+    """Sends the search routes' Google Places traffic to a FakePlacesServer."""
+    from app import routes
+    routes.PLACES_API_URL = fake.textsearch_url
+    routes.PLACE_DETAILS_API_URL = fake.details_url
+    routes.PLACE_PHOTO_API_URL = fake.photo_url
+    routes.GOOGLE_PLACES_API_KEY_FOR_PRO = routes.GOOGLE_PLACES_API_KEY_FOR_PRO or "bench-key"
+    if page_token_delay is not None:
+        routes.PAGE_TOKEN_DELAY = page_token_delay
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct))]
+
+
+def summarize(latencies, errors, elapsed):
+    """Throughput and latency percentiles (ms) for one workload."""
+    ordered = sorted(latencies)
+    total = len(latencies) + errors
+    summary = {"requests": total, "errors": errors, "elapsed_s": round(elapsed, 3),
+               "throughput_rps": round(total / elapsed, 2) if elapsed else None}
+    if ordered:
+        summary.update({"p50_ms": round(statistics.median(ordered) * 1000, 2),
+                        "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+                        "p99_ms": round(percentile(ordered, 0.99) * 1000, 2)})
+    return summary
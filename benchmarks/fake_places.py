@@ -0,0 +1,142 @@
+# benchmarks/fake_places.py
+# A tiny stand-in for the Google Places web service, good enough to drive
+# search_places_route and image_proxy without touching the real API.
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class FakePlacesServer:
+    """Serves textsearch/details/photo endpoints on localhost with a configurable per-call latency.
+
+    `places_per_page` and `pages` shape the text search result; `latency` (seconds, plus up to
+    `jitter` more) is slept on every request so concurrency effects show up the way they would
+    against Google. `error_rate` is the fraction of calls answered with an HTTP 500 (photos) or
+    an UNKNOWN_ERROR status (JSON endpoints). `distinct_places` > 0 makes text searches draw
+    their place ids from a shared pool of that size, so different queries overlap.
+    """
+
+    def __init__(self, places_per_page=20, pages=1, latency=0.05, jitter=0.0, error_rate=0.0, distinct_places=0, seed=None):
+        self.places_per_page = places_per_page
+        self.pages = pages
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.distinct_places = distinct_places
+        self._random = random.Random(seed)
+        self.request_counts = {"textsearch": 0, "details": 0, "photo": 0}
+        self.error_counts = {"textsearch": 0, "details": 0, "photo": 0}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def textsearch_url(self):
+        return f"{self.base_url}/maps/api/place/textsearch/json"
+
+    @property
+    def details_url(self):
+        return f"{self.base_url}/maps/api/place/details/json"
+
+    @property
+    def photo_url(self):
+        return f"{self.base_url}/maps/api/place/photo"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, endpoint):
+        """Records a call; returns True if this call should fail (per error_rate)."""
+        with self._lock:
+            self.request_counts[endpoint] += 1
+            failed = self.error_rate > 0 and self._random.random() < self.error_rate
+            if failed:
+                self.error_counts[endpoint] += 1
+            return failed
+
+    def _delay(self):
+        with self._lock:
+            extra = self._random.uniform(0, self.jitter) if self.jitter else 0
+        time.sleep(self.latency + extra)
+
+    # --- Response bodies ---
+    def textsearch_body(self, query, page):
+        results = []
+        offset = (sum(map(ord, query)) * 7) % self.distinct_places if self.distinct_places else 0
+        for i in range(self.places_per_page):
+            n = page * self.places_per_page + i
+            if self.distinct_places:
+                n = (offset + n) % self.distinct_places
+            results.append({"place_id": f"place-{n}", "name": f"{query} #{n}", "formatted_address": f"{n} Main St",
+                            "types": ["establishment"], "rating": 4.5, "user_ratings_total": 10 + n, "business_status": "OPERATIONAL"})
+        body = {"status": "OK", "results": results}
+        if page + 1 < self.pages:
+            body["next_page_token"] = f"page-{page + 1}"
+        return body
+
+    def details_body(self, place_id):
+        return {"status": "OK", "result": {
+            "place_id": place_id, "name": f"Business {place_id}", "formatted_address": f"{place_id} Main St",
+            "website": f"https://{place_id}.example.com", "formatted_phone_number": "(555) 010-0000",
+            "types": ["establishment"], "rating": 4.5, "user_ratings_total": 42, "business_status": "OPERATIONAL",
+            "opening_hours": {"weekday_text": ["Monday: 9AM-5PM"]}, "url": f"https://maps.google.com/?cid={place_id}",
+            "photos": [{"photo_reference": f"photo-{place_id}"}]}}
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):  # keep benchmark output clean
+                pass
+
+            def _send(self, status, body, content_type="application/json"):
+                payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                fake._delay()
+                if parsed.path.endswith("/textsearch/json"):
+                    if fake._count("textsearch"):
+                        return self._send(200, {"status": "UNKNOWN_ERROR", "error_message": "Injected failure"})
+                    token = params.get("pagetoken")
+                    page = int(token.split("-")[1]) if token else 0
+                    self._send(200, fake.textsearch_body(params.get("query", ""), page))
+                elif parsed.path.endswith("/details/json"):
+                    if fake._count("details"):
+                        return self._send(200, {"status": "UNKNOWN_ERROR"})
+                    self._send(200, fake.details_body(params.get("place_id", "")))
+                elif parsed.path.endswith("/place/photo"):
+                    if fake._count("photo"):
+                        return self._send(500, b"Injected failure", "text/plain")
+                    self._send(200, b"\xff\xd8\xff" + params.get("photoreference", "").encode() * 512, "image/jpeg")
+                else:
+                    self._send(404, {"status": "NOT_FOUND"})
+
+        return Handler
@@ -0,0 +1,95 @@
+# benchmarks/fake_stripe.py
+# Minimal stand-in for the Stripe REST API (just what the app calls), for use with stripe.api_base.
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class FakeStripeServer:
+    """Answers GET /v1/prices/<id> and POST /v1/checkout/sessions with Stripe-shaped JSON.
+
+    `latency` (+ up to `jitter`) is slept per call; `error_rate` of calls get a 500 api_error.
+    Point the library at it with `stripe.api_base = server.base_url`.
+    """
+
+    def __init__(self, latency=0.1, jitter=0.0, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self.request_counts = {"prices": 0, "checkout_sessions": 0}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _call(self, endpoint):
+        with self._lock:
+            self.request_counts[endpoint] += 1
+            extra = self._random.uniform(0, self.jitter) if self.jitter else 0
+            failed = self.error_rate > 0 and self._random.random() < self.error_rate
+        time.sleep(self.latency + extra)
+        return failed
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.send_header("Request-Id", f"req_{uuid.uuid4().hex[:14]}")
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _error(self):
+                self._send(500, {"error": {"type": "api_error", "message": "Injected failure"}})
+
+            def do_GET(self):
+                if self.path.startswith("/v1/prices/"):
+                    if fake._call("prices"):
+                        return self._error()
+                    price_id = self.path.rsplit("/", 1)[-1].split("?")[0]
+                    return self._send(200, {"id": price_id, "object": "price", "active": True, "type": "recurring",
+                                            "currency": "usd", "unit_amount": 4900, "recurring": {"interval": "month"}})
+                self._send(404, {"error": {"type": "invalid_request_error", "message": "Unknown path"}})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                form = parse_qs(self.rfile.read(length).decode())
+                if self.path.startswith("/v1/checkout/sessions"):
+                    if fake._call("checkout_sessions"):
+                        return self._error()
+                    session_id = f"cs_test_{uuid.uuid4().hex}"
+                    return self._send(200, {"id": session_id, "object": "checkout.session", "mode": form.get("mode", [None])[0],
+                                            "url": f"{fake.base_url}/pay/{session_id}", "status": "open"})
+                self._send(404, {"error": {"type": "invalid_request_error", "message": "Unknown path"}})
+
+        return Handler
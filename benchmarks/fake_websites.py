@@ -0,0 +1,136 @@
+# benchmarks/fake_websites.py
+# Local stand-in for lead websites, for driving app/enrichment.py without crawling the internet.
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeWebsiteServer:
+    """Serves many small business sites from one port. Site n is http://127.0.0.<n+1>:<port>/
+    (all of 127.0.0.0/8 is loopback on Linux), so the enricher sees a distinct host per site.
+
+    Sites come in three kinds, by n % 3: email on the home page, email only on a /contact page
+    linked from the home page, and no email at all. Every page links a couple of social profiles
+    and carries `page_bytes` of filler markup; `latency` is slept on every request.
+
+    For the enrichment checks (benchmarks/check_enrichment.py) every site also serves /big
+    (`big_bytes` of filler with an email only at the very end), and /hop/<k>, which redirects
+    k times before landing on the home page. max_in_flight records the most concurrent
+    requests any one host has seen.
+    """
+
+    def __init__(self, sites=100, latency=0.05, page_bytes=32768, big_bytes=32 * 1024 * 1024):
+        self.sites = sites
+        self.latency = latency
+        self.page_bytes = page_bytes
+        self.big_bytes = big_bytes
+        self.request_count = 0
+        self.bytes_sent = 0
+        self.max_in_flight = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        # Bound to every local address so 127.0.0.2, 127.0.0.3, ... reach it too.
+        self._server = ThreadingHTTPServer(("", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def site_url(self, n):
+        return f"http://127.0.0.{n % 250 + 1}:{self.port}/" if n < 250 else f"http://127.0.{n // 250}.{n % 250 + 1}:{self.port}/"
+
+    def urls(self):
+        return [self.site_url(n) for n in range(self.sites)]
+
+    def expected_email(self, n):
+        return None if n % 3 == 2 else f"owner{n}@business{n}.test"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def page(self, n, path):
+        filler = ('<p>' + 'Family owned and operated since 1987. ' * 4 + '</p>\n') * max(1, self.page_bytes // 170)
+        social = (f'<a href="https://www.facebook.com/business{n}">Facebook</a> '
+                  f'<a href="https://instagram.com/business{n}/">Instagram</a> '
+                  f'<a href="https://www.facebook.com/sharer/sharer.php?u=x">Share</a>')
+        if path == '/contact':
+            body = f'<h1>Contact</h1><a href="mailto:{self.expected_email(n)}">Email us</a>' if n % 3 == 1 else '<h1>Contact</h1>'
+        else:
+            body = (f'<h1>Business {n}</h1><a href="/contact">Contact us</a> <img src="/logo@2x.png">'
+                    + (f'<p>Write to {self.expected_email(n)}</p>' if n % 3 == 0 else ''))
+        return f'<html><body>{body}{social}{filler}</body></html>'.encode()
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):  # keep benchmark output clean
+                pass
+
+            def do_GET(self):
+                host = self.headers.get('Host', '127.0.0.1').split(':', 1)[0]
+                with fake._lock:
+                    fake.request_count += 1
+                    fake._in_flight[host] = fake._in_flight.get(host, 0) + 1
+                    fake.max_in_flight = max(fake.max_in_flight, fake._in_flight[host])
+                try:
+                    time.sleep(fake.latency)
+                    self.respond(host)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the enricher hung up after its byte cap
+                finally:
+                    with fake._lock:
+                        fake._in_flight[host] -= 1
+
+            def respond(self, host):
+                octets = host.split('.')
+                n = int(octets[2]) * 250 + int(octets[3]) - 1 if len(octets) == 4 and all(o.isdigit() for o in octets) else 0
+                path = self.path.split('?', 1)[0]
+                if path.startswith('/hop/') and path[5:].isdigit():
+                    hops = int(path[5:])
+                    self.send_response(302)
+                    self.send_header("Location", f"/hop/{hops - 1}" if hops > 1 else "/")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if path == '/big':
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                    self.send_header("Content-Length", str(fake.big_bytes))
+                    self.end_headers()
+                    tail = f'<p>{fake.expected_email(0)}</p></body></html>'.encode()
+                    chunk = b'<p>' + b'x' * 1020 + b'</p>'
+                    remaining = fake.big_bytes - len(tail)
+                    while remaining > 0:
+                        part = chunk[:remaining]
+                        self.wfile.write(part)
+                        remaining -= len(part)
+                        with fake._lock:
+                            fake.bytes_sent += len(part)
+                    self.wfile.write(tail)
+                    return
+                if path not in ('/', '/contact'):
+                    self.send_response(404); self.send_header("Content-Length", "0"); self.end_headers()
+                    return
+                payload = fake.page(n, path)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
@@ -0,0 +1,267 @@
+# benchmarks/run_suite.py
+# End-to-end load run: the real app (create_app + throwaway SQLite DB) served over HTTP, with
+# FakePlacesServer and FakeStripeServer standing in for Google and Stripe. Each workload is
+# driven by a thread pool of keep-alive clients; results are written as JSON for comparison.
+#
+#   python -m benchmarks.run_suite                                   # writes benchmarks/results/<time>-<commit>.json
+#   python -m benchmarks.run_suite --compare benchmarks/results/<baseline>.json --threshold 15
+#   python -m benchmarks.run_suite --workloads search leads --requests 200 --concurrency 16 --error-rate 0.02
+#
+# The verification harnesses in CHECKS run first, each in its own process; the run exits
+# non-zero if any of them fails (skip them with --checks and no names).
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+from werkzeug.serving import make_server
+
+from benchmarks.common import make_app, point_routes_at, summarize
+from benchmarks.fake_places import FakePlacesServer
+from benchmarks.fake_stripe import FakeStripeServer
+from benchmarks.stripe_signing import make_event, sign_payload
+
+WEBHOOK_SECRET = "whsec_bench_suite"
+PASSWORD = "benchmark-password"
+WORKLOADS = ("search", "image", "leads", "webhook", "checkout")
+CHECKS = {
+    "webhook_replay": ["benchmarks.bench_webhook_replay", "--events", "20", "--replays", "10", "--threads", "8"],
+    "enrichment": ["benchmarks.check_enrichment"],
+}
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class Suite:
+    def __init__(self, args):
+        self.args = args
+        self.tmp_dir = tempfile.mkdtemp(prefix="leaddawg-suite-")
+        self.places = FakePlacesServer(places_per_page=args.places_per_page, pages=args.pages, latency=args.latency,
+                                       jitter=args.jitter, error_rate=args.error_rate, distinct_places=args.distinct_places, seed=1)
+        self.stripe = FakeStripeServer(latency=args.stripe_latency, error_rate=args.error_rate, seed=2)
+        self.server = None
+        self.base_url = None
+        self._local = threading.local()
+
+    # --- Setup / teardown ---
+    def start(self):
+        import stripe
+        self.places.start()
+        self.stripe.start()
+        stripe.api_base = self.stripe.base_url
+        app = make_app(os.path.join(self.tmp_dir, "suite.db"),
+                       STRIPE_SECRET_KEY="sk_test_bench", STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET,
+                       STRIPE_PRICE_ID_PRO_MONTHLY="price_pro_bench", STRIPE_PRICE_ID_AGENCY_MONTHLY="price_agency_bench",
+                       IMAGE_CACHE_DIR=os.path.join(self.tmp_dir, "image_cache"), PASSWORD_HASH_WORKERS=0,
+                       STRIPE_EVENT_POLL_INTERVAL=0.5)
+        stripe.api_key = "sk_test_bench"
+        from app import payment_routes
+        payment_routes.PRICE_ID_PRO_MONTHLY = "price_pro_bench"
+        payment_routes.PRICE_ID_AGENCY_MONTHLY = "price_agency_bench"
+        point_routes_at(self.places, page_token_delay=self.args.page_token_delay)
+        self._seed(app)
+        logging.getLogger("werkzeug").setLevel(logging.WARNING) # no per-request access log
+        self.server = make_server("127.0.0.1", 0, app, threaded=True)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+        self.places.stop()
+        self.stripe.stop()
+
+    def _seed(self, app):
+        from sqlalchemy import insert
+        from app import db
+        from app.models import User, SavedLead
+        with app.app_context():
+            user = User(username="suite", email="suite@example.com")
+            user.set_password(PASSWORD)
+            db.session.add(user); db.session.commit()
+            rows = [{"user_id": user.id, "place_id_google": f"seed-{i}", "name_at_save": f"Seed Lead {i}",
+                     "address_at_save": f"{i} Main St", "user_status": "New"} for i in range(self.args.seed_leads)]
+            for start in range(0, len(rows), 5000):
+                db.session.execute(insert(SavedLead), rows[start:start + 5000])
+            db.session.commit()
+            self.user_id = user.id
+
+    # --- Clients ---
+    def session(self, logged_in=False):
+        # One keep-alive session per driver thread (and a separate logged-in one when needed).
+        key = "auth" if logged_in else "anon"
+        sess = getattr(self._local, key, None)
+        if sess is None:
+            sess = requests.Session()
+            if logged_in:
+                sess.post(f"{self.base_url}/api/auth/login", json={"identifier": "suite", "password": PASSWORD}).raise_for_status()
+            setattr(self._local, key, sess)
+        return sess
+
+    # --- Workloads: each takes the request number and returns an HTTP status ---
+    def search(self, i):
+        # A few queries repeat (cache hits, coalescing); most are distinct.
+        query = f"plumbers {i % max(1, self.args.requests // 4)}"
+        return self.session().get(f"{self.base_url}/api/search/places", params={"query": query}, timeout=120).status_code
+
+    def image(self, i):
+        url = f"{self.places.photo_url}?maxwidth=800&photoreference=suite-{i % 50}&key=bench-key"
+        resp = self.session().get(f"{self.base_url}/api/search/image-proxy", params={"url": url}, timeout=60)
+        return resp.status_code
+
+    def leads(self, i):
+        return self.session(logged_in=True).get(f"{self.base_url}/api/leads", params={"limit": 100}, timeout=60).status_code
+
+    def webhook(self, i):
+        # Every event is delivered twice, like a Stripe retry.
+        n = i // 2
+        payload = make_event(f"evt_suite_{n}", "invoice.payment_succeeded", {
+            "id": f"in_{n}", "object": "invoice", "customer": "cus_suite", "subscription": "sub_suite",
+            "lines": {"data": [{"price": {"id": "price_pro_bench"}, "period": {"start": 1700000000, "end": 1893456000}}]}})
+        resp = self.session().post(f"{self.base_url}/api/payments/webhook", data=payload, timeout=60,
+                                   headers={"Content-Type": "application/json", "Stripe-Signature": sign_payload(payload, WEBHOOK_SECRET)})
+        return resp.status_code
+
+    def checkout(self, i):
+        resp = self.session(logged_in=True).post(f"{self.base_url}/api/payments/create-checkout-session",
+                                                 json={"priceId": "price_pro_bench"}, timeout=60)
+        return resp.status_code
+
+    def run_workload(self, name):
+        fn = getattr(self, name)
+        latencies, errors = [], 0
+        lock = threading.Lock()
+
+        def drive(i):
+            nonlocal errors
+            start = time.perf_counter()
+            try:
+                ok = fn(i) < 400
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok: latencies.append(elapsed)
+                else: errors += 1
+
+        # Warm-up: log in / open connections outside the measured window.
+        if name in ("leads", "checkout"):
+            with ThreadPoolExecutor(max_workers=self.args.concurrency) as pool:
+                list(pool.map(lambda _: self.session(logged_in=True), range(self.args.concurrency)))
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.args.concurrency) as pool:
+            list(pool.map(drive, range(self.args.requests)))
+        return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def run_checks(names):
+    """Runs the named verification harnesses; returns {name: passed}."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    outcome = {}
+    for name in names:
+        print(f"--- check: {name}")
+        outcome[name] = subprocess.run([sys.executable, "-m", *CHECKS[name]], cwd=root).returncode == 0
+    return outcome
+
+
+def compare(current, baseline, threshold):
+    """Prints per-workload deltas; returns the list of regressions beyond `threshold` percent."""
+    regressions = []
+    print(f"\ncompared with {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):")
+    for name, now in current["workloads"].items():
+        before = baseline.get("workloads", {}).get(name)
+        if not before:
+            continue
+        parts = []
+        for metric, higher_is_worse in (("p50_ms", True), ("p95_ms", True), ("p99_ms", True), ("throughput_rps", False)):
+            if not before.get(metric) or now.get(metric) is None:
+                continue
+            change = (now[metric] - before[metric]) / before[metric] * 100
+            worse = change > threshold if higher_is_worse else change < -threshold
+            parts.append(f"{metric} {change:+6.1f}%{' !' if worse else ''}")
+            if worse:
+                regressions.append(f"{name}.{metric}")
+        print(f"  {name:<9} " + "  ".join(parts))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workloads', nargs='+', choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument('--requests', type=int, default=100, help="requests per workload")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.05, help="fake Places latency per call, seconds")
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--stripe-latency', type=float, default=0.1)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of upstream calls that fail")
+    parser.add_argument('--places-per-page', type=int, default=20)
+    parser.add_argument('--pages', type=int, default=1)
+    parser.add_argument('--distinct-places', type=int, default=200, help="size of the shared place-id pool (0 = no overlap)")
+    parser.add_argument('--page-token-delay', type=float, default=0.1, help="replaces the 2s production delay")
+    parser.add_argument('--seed-leads', type=int, default=5000)
+    parser.add_argument('--output', help="result file (default benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument('--compare', help="earlier result file to compare against")
+    parser.add_argument('--threshold', type=float, default=10.0, help="percent change counted as a regression")
+    parser.add_argument('--checks', nargs='*', choices=list(CHECKS), default=list(CHECKS), help="verification harnesses to run first")
+    args = parser.parse_args()
+
+    checks = run_checks(args.checks)
+
+    suite = Suite(args)
+    suite.start()
+    try:
+        results = {}
+        for name in args.workloads:
+            results[name] = suite.run_workload(name)
+            r = results[name]
+            print(f"{name:<9} {r['requests']:>5} req  {r['errors']:>4} err  {r['throughput_rps'] or 0:8.1f} req/s  "
+                  f"p50={r.get('p50_ms', '-'):>8} ms  p95={r.get('p95_ms', '-'):>8} ms  p99={r.get('p99_ms', '-'):>8} ms")
+    finally:
+        suite.stop()
+
+    commit = git_commit()
+    report = {
+        "meta": {"commit": commit, "timestamp": datetime.utcnow().isoformat() + "Z", "python": platform.python_version(),
+                 "params": vars(args)},
+        "checks": checks,
+        "workloads": results,
+        "upstream": {"places": suite.places.request_counts, "places_errors": suite.places.error_counts,
+                     "stripe": suite.stripe.request_counts},
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.utcnow():%Y%m%d-%H%M%S}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"upstream calls: {report['upstream']}")
+    print(f"results written to {output}")
+
+    failed_checks = [name for name, passed in checks.items() if not passed]
+    if failed_checks:
+        print(f"failed checks: {', '.join(failed_checks)}")
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"regressions beyond {args.threshold}%: {', '.join(regressions)}")
+    if failed_checks or regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -21,4 +21,115 @@ class Config:
     STRIPE_PRICE_ID_AGENCY_MONTHLY = os.environ.get('STRIPE_PRICE_ID_AGENCY_MONTHLY')
     
     # --- ADD FRONTEND URL CONFIG ---
-    FRONTEND_URL = os.environ.get('FRONTEND_URL') or 'http://localhost:5174' 
\ No newline at end of file
+    FRONTEND_URL = os.environ.get('FRONTEND_URL') or 'http://localhost:5174' 
+
+    # --- GOOGLE PLACES SEARCH TUNING ---
+    # Max Place Details requests in flight per search (text search returns up to 60 places)
+    PLACES_DETAILS_MAX_WORKERS = int(os.environ.get('PLACES_DETAILS_MAX_WORKERS') or 8)
+    # Place Details cache: per-process LRU size and TTL (seconds) shared with the DB tier. TTL 0 disables it.
+    PLACE_DETAILS_CACHE_SIZE = int(os.environ.get('PLACE_DETAILS_CACHE_SIZE') or 5000)
+    PLACE_DETAILS_CACHE_TTL = int(os.environ.get('PLACE_DETAILS_CACHE_TTL') or 86400)
+    PLACE_DETAILS_CACHE_PURGE_INTERVAL = int(os.environ.get('PLACE_DETAILS_CACHE_PURGE_INTERVAL') or 3600) # seconds between deletes of expired rows
+    # Text-search result cache (normalized query -> raw results across all pages). TTL 0 disables it.
+    TEXT_SEARCH_CACHE_SIZE = int(os.environ.get('TEXT_SEARCH_CACHE_SIZE') or 512)
+    TEXT_SEARCH_CACHE_TTL = int(os.environ.get('TEXT_SEARCH_CACHE_TTL') or 300)
+    # Background search jobs (/api/search/jobs): worker threads per process, and how often partial results are saved
+    SEARCH_JOB_WORKERS = int(os.environ.get('SEARCH_JOB_WORKERS') or 4)
+    SEARCH_JOB_FLUSH_INTERVAL = float(os.environ.get('SEARCH_JOB_FLUSH_INTERVAL') or 0.5)
+    SEARCH_JOB_ORPHAN_TIMEOUT = int(os.environ.get('SEARCH_JOB_ORPHAN_TIMEOUT') or 300) # queued/running jobs idle this long are failed
+    SEARCH_JOB_RETENTION = int(os.environ.get('SEARCH_JOB_RETENTION') or 86400) # finished jobs are deleted after this many seconds
+    SEARCH_JOB_SWEEP_INTERVAL = int(os.environ.get('SEARCH_JOB_SWEEP_INTERVAL') or 300)
+    # Batch search (POST /api/search/places/batch): queries per call, and text searches run at once
+    SEARCH_BATCH_MAX_QUERIES = int(os.environ.get('SEARCH_BATCH_MAX_QUERIES') or 10)
+    SEARCH_BATCH_MAX_WORKERS = int(os.environ.get('SEARCH_BATCH_MAX_WORKERS') or 4)
+    # Max place ids per POST /api/search/places/details prefetch (summary mode fills cards on demand)
+    SEARCH_DETAILS_PREFETCH_MAX = int(os.environ.get('SEARCH_DETAILS_PREFETCH_MAX') or 20)
+
+    # --- IMAGE PROXY CACHE ---
+    # Defaults to <instance>/image_cache. Set IMAGE_CACHE_MAX_BYTES=0 to disable the disk cache.
+    IMAGE_CACHE_DIR = os.environ.get('IMAGE_CACHE_DIR')
+    IMAGE_CACHE_MAX_BYTES = int(os.environ.get('IMAGE_CACHE_MAX_BYTES') or 512 * 1024 * 1024)
+    IMAGE_CACHE_MAX_AGE = int(os.environ.get('IMAGE_CACHE_MAX_AGE') or 30 * 24 * 3600) # Cache-Control max-age, seconds
+
+    # --- GOOGLE PLACES HTTP CLIENT (app/places_client.py) ---
+    PLACES_HTTP_POOL_SIZE = int(os.environ.get('PLACES_HTTP_POOL_SIZE') or 0) # 0 = size from PLACES_DETAILS_MAX_WORKERS
+    PLACES_CONNECT_TIMEOUT = float(os.environ.get('PLACES_CONNECT_TIMEOUT') or 3.05)
+    PLACES_TEXTSEARCH_TIMEOUT = float(os.environ.get('PLACES_TEXTSEARCH_TIMEOUT') or 10)
+    PLACES_DETAILS_TIMEOUT = float(os.environ.get('PLACES_DETAILS_TIMEOUT') or 8)
+    PLACES_PHOTO_TIMEOUT = float(os.environ.get('PLACES_PHOTO_TIMEOUT') or 15)
+    PLACES_MAX_RETRIES = int(os.environ.get('PLACES_MAX_RETRIES') or 2)
+    PLACES_RETRY_BACKOFF = float(os.environ.get('PLACES_RETRY_BACKOFF') or 0.2) # seconds, doubled per attempt, jittered
+    PLACES_QPS = float(os.environ.get('PLACES_QPS') or 50) # Keep at or below the Google Cloud quota, divided by process count
+    PLACES_QPS_BURST = float(os.environ.get('PLACES_QPS_BURST') or 0) or None # Defaults to PLACES_QPS
+    PLACES_RATE_LIMIT_MAX_WAIT = float(os.environ.get('PLACES_RATE_LIMIT_MAX_WAIT') or 5)
+    PLACES_CIRCUIT_FAILURES = int(os.environ.get('PLACES_CIRCUIT_FAILURES') or 5)
+    PLACES_CIRCUIT_RESET = float(os.environ.get('PLACES_CIRCUIT_RESET') or 30)
+
+    # --- SAVED LEADS LIST ---
+    LEADS_PAGE_DEFAULT_LIMIT = int(os.environ.get('LEADS_PAGE_DEFAULT_LIMIT') or 100) # When ?cursor= comes without ?limit=; no paging params at all returns every lead
+    LEADS_PAGE_MAX_LIMIT = int(os.environ.get('LEADS_PAGE_MAX_LIMIT') or 1000)
+    LEADS_BULK_MAX_ROWS = int(os.environ.get('LEADS_BULK_MAX_ROWS') or 5000) # Per POST /api/leads/bulk
+    LEADS_EXPORT_CHUNK_SIZE = int(os.environ.get('LEADS_EXPORT_CHUNK_SIZE') or 1000) # Rows fetched per cursor round trip
+
+    # --- AUTH ---
+    # Per-process cache of the logged-in user behind login_manager.user_loader. TTL 0 disables it.
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE') or 10000)
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 30)
+
+    # --- STRIPE WEBHOOK PROCESSING (app/stripe_events.py) ---
+    STRIPE_EVENT_BATCH_SIZE = int(os.environ.get('STRIPE_EVENT_BATCH_SIZE') or 50)
+    STRIPE_EVENT_POLL_INTERVAL = float(os.environ.get('STRIPE_EVENT_POLL_INTERVAL') or 5) # seconds between sweeps when idle
+    STRIPE_EVENT_CLAIM_TIMEOUT = int(os.environ.get('STRIPE_EVENT_CLAIM_TIMEOUT') or 300) # reclaim events stuck in 'processing'
+    STRIPE_EVENT_MAX_ATTEMPTS = int(os.environ.get('STRIPE_EVENT_MAX_ATTEMPTS') or 5) # then dead-lettered ('dead')
+    STRIPE_EVENT_RETRY_BACKOFF = float(os.environ.get('STRIPE_EVENT_RETRY_BACKOFF') or 30) # seconds before the first retry; doubles per attempt
+    STRIPE_EVENT_RETRY_BACKOFF_MAX = float(os.environ.get('STRIPE_EVENT_RETRY_BACKOFF_MAX') or 3600)
+    PRICE_CATALOG_REFRESH_INTERVAL = int(os.environ.get('PRICE_CATALOG_REFRESH_INTERVAL') or 3600) # seconds; price.* webhooks update it sooner
+    # Password hashing (app/password_hashing.py). Method string goes straight to Werkzeug, e.g. scrypt:32768:8:1 or pbkdf2:sha256:600000.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or 1) # Processes per web process (x gunicorn workers; keep 1-2); 0 hashes in the request thread
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING') or 0) # 0 = 4 x PASSWORD_HASH_WORKERS; beyond this, 503
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT') or 10)
+
+    # --- METRICS (app/metrics.py) ---
+    # GET /metrics serves Prometheus text format. If METRICS_AUTH_TOKEN is set, scrapers must send "Authorization: Bearer <token>".
+    METRICS_AUTH_TOKEN = os.environ.get('METRICS_AUTH_TOKEN')
+    SLOW_REQUEST_THRESHOLD_MS = int(os.environ.get('SLOW_REQUEST_THRESHOLD_MS') or 0) # 0 disables the slow-request log
+
+    # --- WEBSITE ENRICHMENT (app/enrichment.py) ---
+    # Crawls lead websites for contact emails and social links (?enrich=1 on search, POST /api/leads/enrich, flask enrich-saved-leads)
+    ENRICH_MAX_WORKERS = int(os.environ.get('ENRICH_MAX_WORKERS') or 16) # Pages in flight per process
+    ENRICH_PER_HOST_LIMIT = int(os.environ.get('ENRICH_PER_HOST_LIMIT') or 2) # Pages in flight per website host
+    ENRICH_CONNECT_TIMEOUT = float(os.environ.get('ENRICH_CONNECT_TIMEOUT') or 3)
+    ENRICH_READ_TIMEOUT = float(os.environ.get('ENRICH_READ_TIMEOUT') or 5)
+    ENRICH_MAX_BYTES = int(os.environ.get('ENRICH_MAX_BYTES') or 262144) # Body bytes read per page
+    ENRICH_MAX_PAGES = int(os.environ.get('ENRICH_MAX_PAGES') or 2) # Home page + one contact/about page
+    ENRICH_CACHE_SIZE = int(os.environ.get('ENRICH_CACHE_SIZE') or 5000)
+    ENRICH_CACHE_TTL = int(os.environ.get('ENRICH_CACHE_TTL') or 604800) # Per site, seconds; also how soon a saved lead is re-crawled
+    ENRICH_RETRY_TTL = int(os.environ.get('ENRICH_RETRY_TTL') or 600) # Per site, seconds, for timeouts/busy hosts/5xx
+    ENRICH_USER_AGENT = os.environ.get('ENRICH_USER_AGENT')
+    ENRICH_ALLOW_PRIVATE_HOSTS = (os.environ.get('ENRICH_ALLOW_PRIVATE_HOSTS') or '').lower() in ('1', 'true', 'yes') # Only for local testing
+    LEADS_ENRICH_MAX_ROWS = int(os.environ.get('LEADS_ENRICH_MAX_ROWS') or 50) # Per POST /api/leads/enrich
+
+    # --- SAVED LEAD SNAPSHOT REFRESH (app/lead_refresh.py, run from cron: flask refresh-stale-leads) ---
+    LEAD_REFRESH_MAX_AGE_DAYS = float(os.environ.get('LEAD_REFRESH_MAX_AGE_DAYS') or 30) # Snapshots older than this are re-checked
+    LEAD_REFRESH_BATCH_SIZE = int(os.environ.get('LEAD_REFRESH_BATCH_SIZE') or 200) # Leads per keyset step / commit
+    LEAD_REFRESH_WORKERS = int(os.environ.get('LEAD_REFRESH_WORKERS') or 4) # Place Details requests in flight
+    LEAD_REFRESH_QPS = float(os.environ.get('LEAD_REFRESH_QPS') or 5) # Upstream lookups per second, below PLACES_QPS
+    LEAD_REFRESH_MAX_PLACES = int(os.environ.get('LEAD_REFRESH_MAX_PLACES') or 0) # Per run; 0 = until the stale window is empty
+
+    # --- RATE LIMITING (app/rate_limit.py) ---
+    # Per-plan request buckets on the search API and hourly Google Places call budgets per user (anonymous: per IP, free limits).
+    # Buckets live in a SQLite file shared by all workers (RATE_LIMIT_STORAGE=memory keeps them per process).
+    RATE_LIMIT_ENABLED = (os.environ.get('RATE_LIMIT_ENABLED') or 'true').lower() in ('1', 'true', 'yes')
+    RATE_LIMIT_STORAGE = os.environ.get('RATE_LIMIT_STORAGE') or 'sqlite'
+    RATE_LIMIT_DB_PATH = os.environ.get('RATE_LIMIT_DB_PATH') # Default: instance/rate_limits.sqlite
+    RATE_LIMIT_FREE_PER_MINUTE = int(os.environ.get('RATE_LIMIT_FREE_PER_MINUTE') or 10)
+    RATE_LIMIT_FREE_BURST = int(os.environ.get('RATE_LIMIT_FREE_BURST') or 5)
+    RATE_LIMIT_FREE_PLACES_PER_HOUR = int(os.environ.get('RATE_LIMIT_FREE_PLACES_PER_HOUR') or 300)
+    RATE_LIMIT_PRO_PER_MINUTE = int(os.environ.get('RATE_LIMIT_PRO_PER_MINUTE') or 60)
+    RATE_LIMIT_PRO_BURST = int(os.environ.get('RATE_LIMIT_PRO_BURST') or 20)
+    RATE_LIMIT_PRO_PLACES_PER_HOUR = int(os.environ.get('RATE_LIMIT_PRO_PLACES_PER_HOUR') or 3000)
+    RATE_LIMIT_AGENCY_PER_MINUTE = int(os.environ.get('RATE_LIMIT_AGENCY_PER_MINUTE') or 240)
+    RATE_LIMIT_AGENCY_BURST = int(os.environ.get('RATE_LIMIT_AGENCY_BURST') or 60)
+    RATE_LIMIT_AGENCY_PLACES_PER_HOUR = int(os.environ.get('RATE_LIMIT_AGENCY_PLACES_PER_HOUR') or 15000)
+    PLACES_GLOBAL_BUDGET_PER_MINUTE = int(os.environ.get('PLACES_GLOBAL_BUDGET_PER_MINUTE') or 3000) # All users and jobs together; 0 = unlimited
@@ -0,0 +1,108 @@
+"""baseline: user, saved_lead, place_details_cache, search_job
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+
+Databases created with db.create_all() before migrations existed already have some or
+all of this, so each table and index is only created when it's missing.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _create_index(inspector, name, table, columns, unique=False):
+    if name not in {index['name'] for index in inspector.get_indexes(table)}:
+        op.create_index(name, table, columns, unique=unique)
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    if 'user' not in tables:
+        op.create_table(
+            'user',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.String(length=64), nullable=False),
+            sa.Column('email', sa.String(length=120), nullable=False),
+            sa.Column('password_hash', sa.String(length=256), nullable=True),
+            sa.Column('tier', sa.String(length=50), nullable=False),
+            sa.Column('stripe_customer_id', sa.String(length=120), nullable=True),
+            sa.Column('stripe_subscription_id', sa.String(length=120), nullable=True),
+            sa.Column('subscription_active_until', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+        )
+    _create_index(inspector, 'ix_user_username', 'user', ['username'], unique=True)
+    _create_index(inspector, 'ix_user_email', 'user', ['email'], unique=True)
+    _create_index(inspector, 'ix_user_stripe_customer_id', 'user', ['stripe_customer_id'], unique=True)
+    _create_index(inspector, 'ix_user_stripe_subscription_id', 'user', ['stripe_subscription_id'], unique=True)
+
+    if 'saved_lead' not in tables:
+        op.create_table(
+            'saved_lead',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('place_id_google', sa.String(length=255), nullable=False),
+            sa.Column('name_at_save', sa.String(length=255), nullable=False),
+            sa.Column('address_at_save', sa.String(length=500), nullable=True),
+            sa.Column('phone_at_save', sa.String(length=50), nullable=True),
+            sa.Column('website_at_save', sa.String(length=500), nullable=True),
+            sa.Column('user_status', sa.String(length=50), nullable=False),
+            sa.Column('user_notes', sa.Text(), nullable=True),
+            sa.Column('saved_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+    _create_index(inspector, 'ix_saved_lead_place_id_google', 'saved_lead', ['place_id_google'])
+    _create_index(inspector, 'ix_saved_lead_user_saved_at_id', 'saved_lead', ['user_id', 'saved_at', 'id'])
+    _create_index(inspector, 'ix_saved_lead_user_status_saved_at_id', 'saved_lead', ['user_id', 'user_status', 'saved_at', 'id'])
+
+    if 'place_details_cache' not in tables:
+        op.create_table(
+            'place_details_cache',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('place_id', sa.String(length=255), nullable=False),
+            sa.Column('fields', sa.String(length=500), nullable=False),
+            sa.Column('payload', sa.Text(), nullable=False),
+            sa.Column('fetched_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('place_id', 'fields', name='uq_place_details_cache_place_fields'),
+        )
+    _create_index(inspector, 'ix_place_details_cache_place_id', 'place_details_cache', ['place_id'])
+    _create_index(inspector, 'ix_place_details_cache_fetched_at', 'place_details_cache', ['fetched_at'])
+
+    if 'search_job' not in tables:
+        op.create_table(
+            'search_job',
+            sa.Column('id', sa.String(length=36), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=True),
+            sa.Column('query', sa.String(length=500), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('places_found', sa.Integer(), nullable=False),
+            sa.Column('places_done', sa.Integer(), nullable=False),
+            sa.Column('results', sa.Text(), nullable=True),
+            sa.Column('error_message', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.Column('finished_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+    _create_index(inspector, 'ix_search_job_user_id', 'search_job', ['user_id'])
+
+
+def downgrade():
+    op.drop_table('search_job')
+    op.drop_table('place_details_cache')
+    op.drop_table('saved_lead')
+    op.drop_table('user')
@@ -0,0 +1,45 @@
+"""one saved lead per user and Google place
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:01
+
+Before the unique index can go on, earlier duplicate saves are dropped: the newest row
+(highest id) of each (user_id, place_id_google) pair is kept. A unique index rather than
+a table constraint so SQLite doesn't have to rebuild saved_lead (which would drop the
+full-text triggers); ON CONFLICT (user_id, place_id_google) uses either.
+
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.env')
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing = {index['name'] for index in inspector.get_indexes('saved_lead')} | \
+        {constraint['name'] for constraint in inspector.get_unique_constraints('saved_lead')}
+    if 'uq_saved_lead_user_place' in existing:
+        return
+
+    result = op.get_bind().execute(sa.text(
+        "DELETE FROM saved_lead WHERE id NOT IN "
+        "(SELECT MAX(id) FROM saved_lead GROUP BY user_id, place_id_google)"
+    ))
+    if result.rowcount:
+        logger.info(f"Removed {result.rowcount} duplicate saved lead(s)")
+    op.create_index('uq_saved_lead_user_place', 'saved_lead', ['user_id', 'place_id_google'], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_saved_lead_user_place', table_name='saved_lead')
@@ -0,0 +1,37 @@
+"""saved_lead columns filled by website enrichment
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:02
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def _columns():
+    # Fresh Column objects per call: op.add_column() attaches each one to a throwaway Table
+    return [
+        sa.Column('email', sa.String(length=255), nullable=True),
+        sa.Column('social_links', sa.Text(), nullable=True),
+        sa.Column('enriched_at', sa.DateTime(), nullable=True),
+    ]
+
+
+def upgrade():
+    existing = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('saved_lead')}
+    for column in _columns():
+        if column.name not in existing:
+            op.add_column('saved_lead', column)
+
+
+def downgrade():
+    for column in reversed(_columns()):
+        op.drop_column('saved_lead', column.name)
@@ -0,0 +1,67 @@
+"""full-text index over saved leads
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:03
+
+SQLite: the saved_lead_fts FTS5 table and its sync triggers, backfilled from saved_lead.
+Postgres: a GIN index on the tsvector app/lead_search.py queries. The statements are
+copied here rather than imported so this revision keeps meaning what it meant when written.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS saved_lead_fts USING fts5(
+        name_at_save, address_at_save, user_notes, owner_token,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS saved_lead_fts_ai AFTER INSERT ON saved_lead BEGIN
+        INSERT INTO saved_lead_fts(rowid, name_at_save, address_at_save, user_notes, owner_token)
+        VALUES (new.id, new.name_at_save, new.address_at_save, new.user_notes, 'u' || new.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS saved_lead_fts_ad AFTER DELETE ON saved_lead BEGIN
+        DELETE FROM saved_lead_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS saved_lead_fts_au AFTER UPDATE OF user_id, name_at_save, address_at_save, user_notes ON saved_lead BEGIN
+        UPDATE saved_lead_fts SET name_at_save = new.name_at_save, address_at_save = new.address_at_save,
+            user_notes = new.user_notes, owner_token = 'u' || new.user_id
+        WHERE rowid = old.id;
+    END""",
+]
+
+POSTGRES_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_saved_lead_fulltext ON saved_lead USING gin (to_tsvector('simple', "
+    "coalesce(name_at_save, '') || ' ' || coalesce(address_at_save, '') || ' ' || coalesce(user_notes, '')))",
+]
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        backfill = not sa.inspect(bind).has_table('saved_lead_fts')
+        for statement in SQLITE_DDL:
+            op.execute(statement)
+        if backfill:
+            op.execute("""INSERT INTO saved_lead_fts(rowid, name_at_save, address_at_save, user_notes, owner_token)
+                          SELECT id, name_at_save, address_at_save, user_notes, 'u' || user_id FROM saved_lead""")
+    elif bind.dialect.name == 'postgresql':
+        for statement in POSTGRES_DDL:
+            op.execute(statement)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        for trigger in ('saved_lead_fts_ai', 'saved_lead_fts_ad', 'saved_lead_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS saved_lead_fts")
+    elif bind.dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_saved_lead_fulltext")
@@ -0,0 +1,45 @@
+"""stripe_event: webhook idempotency record and work queue
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 00:00:04
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('stripe_event'):
+        op.create_table(
+            'stripe_event',
+            sa.Column('id', sa.String(length=255), nullable=False),
+            sa.Column('type', sa.String(length=100), nullable=False),
+            sa.Column('payload', sa.Text(), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('attempts', sa.Integer(), nullable=False),
+            sa.Column('last_error', sa.Text(), nullable=True),
+            sa.Column('next_attempt_at', sa.DateTime(), nullable=True),
+            sa.Column('received_at', sa.DateTime(), nullable=False),
+            sa.Column('claimed_at', sa.DateTime(), nullable=True),
+            sa.Column('processed_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+        )
+    elif 'next_attempt_at' not in {column['name'] for column in inspector.get_columns('stripe_event')}:
+        op.add_column('stripe_event', sa.Column('next_attempt_at', sa.DateTime(), nullable=True))
+    existing = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('stripe_event')}
+    for column in ('type', 'status', 'received_at'):
+        if f'ix_stripe_event_{column}' not in existing:
+            op.create_index(f'ix_stripe_event_{column}', 'stripe_event', [column])
+
+
+def downgrade():
+    op.drop_table('stripe_event')
@@ -0,0 +1,25 @@
+"""index for the stale saved-lead refresh walk
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 00:00:05
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'ix_saved_lead_updated_at_id' not in {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('saved_lead')}:
+        op.create_index('ix_saved_lead_updated_at_id', 'saved_lead', ['updated_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_saved_lead_updated_at_id', table_name='saved_lead')
@@ -1,6 +1,9 @@
-from app import create_app
+# Spawned multiprocessing children (the password hashing pool) re-import this file as __mp_main__;
+# they only run Werkzeug's hash functions and must not build a second app.
+if __name__ != '__mp_main__':
+    from app import create_app
 
-app = create_app()
+    app = create_app()
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5002) # Use a different port, e.g., 5002 for this new backend
\ No newline at end of file
+    app.run(debug=True, port=5002) # Use a different port, e.g., 5002 for this new backend